@@ -0,0 +1,349 @@
+"""
+LangGraph checkpointer 配置
+
+通过环境变量 CHECKPOINTER_BACKEND 选择 checkpoint 的存储方式：
+- memory（默认）：进程内存，进程重启后丢失
+- sqlite：本地 SQLite 文件（CHECKPOINTER_SQLITE_PATH），需要安装 langgraph-checkpoint-sqlite
+- module.path:factory：自定义后端，factory 无参调用，返回 checkpointer 或返回 checkpointer 的（异步）上下文管理器
+
+checkpoint 以会话的 thread_id 为 key，worker 重启后可以从最后一个完成的节点继续执行，
+已经完成的检索步骤不需要重新调用模型
+"""
+
+import os
+import time
+import logging
+import importlib
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = "checkpoints.sqlite"
+
+
+@dataclass
+class _ThreadEntry:
+    blob_keys: Set[Tuple[Any, ...]] = field(default_factory=set)
+    write_keys: Set[Tuple[str, str, str]] = field(default_factory=set)
+    bytes: int = 0
+    # 会话结束（中断或出错）的时间，之后只保留 inactive_ttl 秒以便恢复
+    released_at: Optional[float] = None
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    有界的 MemorySaver
+
+    - 默认每个 thread 只保留最新的 checkpoint（恢复会话只需要最新的 checkpoint），旧版本的 channel 数据随之释放
+    - 会话正常完成后立即删除其 checkpoint；中断或出错的会话保留 inactive_ttl 秒，期间仍可恢复
+    - 所有 thread 的 checkpoint 总字节数超过 max_bytes 时按 LRU 淘汰，已结束的会话优先淘汰
+
+    Args:
+        max_bytes: checkpoint 占用的最大字节数（序列化后的大小），0 表示不限制
+        inactive_ttl: 中断或出错的会话保留 checkpoint 的秒数
+        keep_history: 是否保留每个 thread 的全部历史 checkpoint
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024 * 1024,
+        inactive_ttl: float = 600,
+        keep_history: bool = False,
+    ):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.inactive_ttl = inactive_ttl
+        self.keep_history = keep_history
+
+        self._lock = threading.RLock()
+        # thread_id -> entry，顺序即 LRU 顺序（最近使用的在末尾）
+        self._threads: "OrderedDict[str, _ThreadEntry]" = OrderedDict()
+        self._bytes = 0
+        self.evicted_threads = 0
+
+    @property
+    def bytes_held(self) -> int:
+        return self._bytes
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            # storage 是 defaultdict，查询不存在的 thread 也会留下空的条目
+            if thread_id not in self.storage:
+                return None
+            checkpoint_tuple = super().get_tuple(config)
+            entry = self._threads.get(thread_id)
+            if entry is not None:
+                self._threads.move_to_end(thread_id)
+                # 读取 pending writes 时 writes（defaultdict）也会留下空的条目，记录下来以便删除
+                if checkpoint_tuple is not None:
+                    configurable = checkpoint_tuple.config["configurable"]
+                    entry.write_keys.add(
+                        (thread_id, configurable["checkpoint_ns"], configurable["checkpoint_id"])
+                    )
+            return checkpoint_tuple
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+
+        with self._lock:
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+
+            entry = self._touch_locked(thread_id)
+            for channel, version in new_versions.items():
+                entry.blob_keys.add((thread_id, checkpoint_ns, channel, version))
+
+            if not self.keep_history:
+                self._prune_locked(thread_id, checkpoint_ns, checkpoint, entry)
+
+            self._recount_locked(thread_id, entry)
+            self._evict_locked(current_thread_id=thread_id)
+
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+
+            entry = self._touch_locked(thread_id)
+            entry.write_keys.add((thread_id, checkpoint_ns, checkpoint_id))
+
+            self._recount_locked(thread_id, entry)
+            self._evict_locked(current_thread_id=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        """按记录的 key 删除 thread 的全部数据，不需要扫描其他 thread 的数据"""
+        with self._lock:
+            entry = self._threads.pop(thread_id, None)
+            self.storage.pop(thread_id, None)
+            if entry is None:
+                return
+
+            for key in entry.write_keys:
+                self.writes.pop(key, None)
+            for key in entry.blob_keys:
+                self.blobs.pop(key, None)
+            self._bytes -= entry.bytes
+
+    def release_thread(self, thread_id: str, finished: bool) -> None:
+        """
+        会话结束时调用
+
+        Args:
+            finished: 会话是否已正常完成，完成的会话不再需要恢复，立即删除
+        """
+        with self._lock:
+            if finished:
+                self.delete_thread(thread_id)
+                return
+
+            entry = self._threads.get(thread_id)
+            if entry is None:
+                return
+            entry.released_at = time.time()
+            self._threads.move_to_end(thread_id, last=False)
+            self._evict_locked()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threads": len(self._threads),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evicted_threads": self.evicted_threads,
+            }
+
+    # internals
+    def _touch_locked(self, thread_id: str) -> _ThreadEntry:
+        entry = self._threads.get(thread_id)
+        if entry is None:
+            entry = _ThreadEntry()
+            self._threads[thread_id] = entry
+        else:
+            entry.released_at = None
+            self._threads.move_to_end(thread_id)
+        return entry
+
+    def _prune_locked(
+        self, thread_id: str, checkpoint_ns: str, checkpoint: Checkpoint, entry: _ThreadEntry
+    ) -> None:
+        """只保留该 namespace 最新的 checkpoint，以及它引用的 channel 数据"""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in list(checkpoints):
+            if checkpoint_id == checkpoint["id"]:
+                continue
+            del checkpoints[checkpoint_id]
+            write_key = (thread_id, checkpoint_ns, checkpoint_id)
+            self.writes.pop(write_key, None)
+            entry.write_keys.discard(write_key)
+
+        live_blob_keys = {
+            (thread_id, checkpoint_ns, channel, version)
+            for channel, version in checkpoint["channel_versions"].items()
+        }
+        for key in [k for k in entry.blob_keys if k[1] == checkpoint_ns and k not in live_blob_keys]:
+            self.blobs.pop(key, None)
+            entry.blob_keys.discard(key)
+
+    def _recount_locked(self, thread_id: str, entry: _ThreadEntry) -> None:
+        size = 0
+        for checkpoints in self.storage.get(thread_id, {}).values():
+            for saved_checkpoint, saved_metadata, _ in checkpoints.values():
+                size += len(saved_checkpoint[1]) + len(saved_metadata[1])
+        for key in entry.blob_keys:
+            blob = self.blobs.get(key)
+            if blob is not None:
+                size += len(blob[1])
+        for key in entry.write_keys:
+            for _, _, value, _ in self.writes.get(key, {}).values():
+                size += len(value[1])
+
+        self._bytes += size - entry.bytes
+        entry.bytes = size
+
+    def _evict_locked(self, current_thread_id: Optional[str] = None) -> None:
+        now = time.time()
+        expired = [
+            thread_id
+            for thread_id, entry in self._threads.items()
+            if entry.released_at is not None and now - entry.released_at > self.inactive_ttl
+        ]
+        for thread_id in expired:
+            self.delete_thread(thread_id)
+
+        if self.max_bytes <= 0:
+            return
+
+        # 已结束的会话在 release_thread 时被移到了队首，因此会被优先淘汰
+        while self._bytes > self.max_bytes:
+            victim = next((t for t in self._threads if t != current_thread_id), None)
+            if victim is None:
+                break
+            logger.warning(f"Checkpoint memory over limit ({self._bytes} bytes), evicting thread {victim}")
+            self.delete_thread(victim)
+            self.evicted_threads += 1
+
+
+# memory 后端在进程内共享同一个实例，中断的会话可以在同一进程内恢复
+_memory_saver: Optional[BoundedMemorySaver] = None
+_memory_saver_lock = threading.Lock()
+
+
+def get_checkpointer_backend() -> str:
+    return os.getenv("CHECKPOINTER_BACKEND", "memory").strip() or "memory"
+
+
+def is_persistent_backend() -> bool:
+    """checkpoint 是否能在进程重启后保留"""
+    return get_checkpointer_backend() != "memory"
+
+
+def get_memory_saver() -> BoundedMemorySaver:
+    global _memory_saver
+    if _memory_saver is None:
+        with _memory_saver_lock:
+            if _memory_saver is None:
+                _memory_saver = BoundedMemorySaver(
+                    max_bytes=int(os.getenv("CHECKPOINT_MEMORY_MAX_BYTES", str(256 * 1024 * 1024))),
+                    inactive_ttl=float(os.getenv("CHECKPOINT_INACTIVE_TTL", "600")),
+                    keep_history=os.getenv("CHECKPOINT_KEEP_HISTORY", "false").lower() == "true",
+                )
+    return _memory_saver
+
+
+def release_thread(thread_id: str, finished: bool) -> None:
+    """
+    会话结束时释放进程内存中的 checkpoint，持久化后端的 checkpoint 不受影响
+
+    Args:
+        finished: 会话是否已正常完成；中断或出错的会话会再保留一段时间以便恢复
+    """
+    if get_checkpointer_backend() == "memory":
+        get_memory_saver().release_thread(thread_id, finished)
+
+
+@asynccontextmanager
+async def open_checkpointer() -> AsyncIterator[BaseCheckpointSaver]:
+    """
+    打开当前配置的 checkpointer
+
+    agent 运行在各自线程的事件循环中，而异步的 SQLite 连接会绑定到创建它的事件循环，
+    因此每次运行都在自己的事件循环内打开 checkpointer，运行结束后关闭
+    """
+    backend = get_checkpointer_backend()
+
+    if backend == "memory":
+        yield get_memory_saver()
+        return
+
+    if backend == "sqlite":
+        try:
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        except ImportError as e:
+            raise ImportError(
+                "CHECKPOINTER_BACKEND=sqlite requires the langgraph-checkpoint-sqlite package: "
+                "pip install langgraph-checkpoint-sqlite"
+            ) from e
+
+        path = os.getenv("CHECKPOINTER_SQLITE_PATH", DEFAULT_SQLITE_PATH)
+        async with AsyncSqliteSaver.from_conn_string(path) as saver:
+            yield saver
+        return
+
+    module_name, _, factory_name = backend.partition(":")
+    if not factory_name:
+        raise ValueError(
+            f"Unknown CHECKPOINTER_BACKEND '{backend}', expected 'memory', 'sqlite' or 'module.path:factory'"
+        )
+
+    factory = getattr(importlib.import_module(module_name), factory_name)
+    checkpointer: Any = factory()
+
+    if isinstance(checkpointer, BaseCheckpointSaver):
+        yield checkpointer
+    elif hasattr(checkpointer, "__aenter__"):
+        async with checkpointer as saver:
+            yield saver
+    elif hasattr(checkpointer, "__enter__"):
+        with checkpointer as saver:
+            yield saver
+    else:
+        raise TypeError(f"Checkpointer factory '{backend}' did not return a checkpointer")
+
+
+async def aget_latest_checkpoint(thread_id: str) -> Optional[CheckpointTuple]:
+    """读取某个 thread 的最新 checkpoint，不存在时返回 None"""
+    async with open_checkpointer() as checkpointer:
+        return await checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
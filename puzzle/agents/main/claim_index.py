@@ -0,0 +1,308 @@
+"""
+跨会话的核查点索引
+
+同一条说法经常在不同的新闻中以略有不同的措辞反复出现，每次都要为相同的核查点完整运行一次 search agent。
+ClaimIndex 持久化保存经过 main agent 复核认可的检索结论及其证据，
+invoke_search_agent 在检索前按核查点内容与检索目的查找近似重复的已核查条目，找到时直接复用其结论与证据。
+
+- 近似重复检测：文本规范化后按字符（中日韩文字）或单词（其他文字）切分，取相邻两个 token 组成 shingle，
+  计算 MinHash 签名并用 LSH 分桶召回候选，再以签名估计的 Jaccard 相似度筛选
+- 数字（年份、金额、人数等）改动很小却会改变说法的真假，候选与当前核查点中的数字必须完全一致
+- 否定说法（"X 没有 Y" 与 "X Y"）几乎保留了所有 shingle，候选与当前核查点中的否定词也必须完全一致
+- 新鲜度：按新闻类型设置复用窗口，时效性强的新闻类型可以设置更短的窗口
+"""
+
+import os
+import re
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from pydantic import BaseModel
+
+from .states import RetrievalResult
+from ..searcher.states import Evidence
+
+
+DEFAULT_CLAIM_INDEX_PATH = "claim_index.sqlite"
+
+# MinHash 签名长度与 LSH 分桶：16 个 band，每个 band 4 行，相似度约 0.6 以上的条目大概率被召回
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# 固定种子，签名在进程重启后保持一致
+_rng = random.Random(20250101)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+CJK_RANGES = r"぀-ヿ㐀-䶿一-鿿가-힯"
+TOKEN_PATTERN = re.compile(rf"[{CJK_RANGES}]|[^\W_{CJK_RANGES}]+")
+NEGATION_PATTERN = re.compile(
+    r"并非|绝非|[不没未无否勿莫]|n't\b|\b(?:not|no|never|none|nobody|nothing|neither|nor|without|cannot)\b"
+)
+# 缩写与合写的否定按 not 计数，"did not" 与 "didn't" 视为相同
+_NEGATION_ALIASES = {"n't": "not", "cannot": "not"}
+
+
+def tokenize(text: str) -> List[str]:
+    """全角转半角并统一大小写，中日韩文字按单字切分，其他文字按单词切分，忽略标点与空白"""
+    return TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).casefold())
+
+
+def shingles(text: str, size: int = 2) -> Set[str]:
+    tokens = tokenize(text)
+    if len(tokens) < size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def numbers(text: str) -> List[str]:
+    return sorted(token for token in tokenize(text) if any(char.isdigit() for char in token))
+
+
+def negations(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text).casefold().replace("’", "'")
+    return sorted(_NEGATION_ALIASES.get(token, token) for token in NEGATION_PATTERN.findall(text))
+
+
+def minhash(text: str) -> List[int]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for shingle in shingles(text)
+    ]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def similarity(signature: Sequence[int], other: Sequence[int]) -> float:
+    """两个 MinHash 签名估计的 Jaccard 相似度"""
+    return sum(1 for x, y in zip(signature, other) if x == y) / NUM_PERMUTATIONS
+
+
+def lsh_buckets(signature: Sequence[int]) -> List[str]:
+    return [
+        hashlib.blake2b(
+            json.dumps(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]).encode("utf-8"), digest_size=8
+        ).hexdigest()
+        for band in range(LSH_BANDS)
+    ]
+
+
+class ClaimMatch(BaseModel):
+    """复用的已核查条目"""
+    content: str
+    purpose: str
+    matched_content: str
+    matched_purpose: str
+    similarity: float
+    indexed_at: float
+    result: RetrievalResult
+
+
+def parse_freshness_windows(value: str) -> Dict[str, float]:
+    """解析 {"新闻类型关键词": 秒数} 形式的 JSON，关键词按包含关系匹配新闻类型"""
+    if not value.strip():
+        return {}
+    return {str(k).casefold(): float(v) for k, v in json.loads(value).items()}
+
+
+class ClaimIndex:
+    """
+    SQLite 核查点索引
+
+    Args:
+        path: SQLite 文件路径，":memory:" 表示只保存在内存中
+        threshold: 核查点内容的最低相似度
+        purpose_threshold: 检索目的的最低相似度，同一核查点的不同检索步骤不会互相复用
+        default_window: 默认的复用窗口秒数
+        windows: 按新闻类型关键词设置的复用窗口秒数
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CLAIM_INDEX_PATH,
+        threshold: float = 0.7,
+        purpose_threshold: float = 0.5,
+        default_window: float = 7 * 24 * 3600,
+        windows: Optional[Dict[str, float]] = None,
+    ):
+        self.path = path
+        self.threshold = threshold
+        self.purpose_threshold = purpose_threshold
+        self.default_window = default_window
+        self.windows = windows or {}
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS claims (
+                id INTEGER PRIMARY KEY,
+                content TEXT NOT NULL,
+                purpose TEXT NOT NULL,
+                news_type TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                purpose_signature TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                conclusion TEXT NOT NULL,
+                evidences TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS claim_buckets (
+                band INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                claim_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS claim_buckets_bucket ON claim_buckets (band, bucket);
+            CREATE INDEX IF NOT EXISTS claims_created_at ON claims (created_at);
+            """
+        )
+
+    def freshness_window(self, news_type: str) -> float:
+        """新闻类型对应的复用窗口，匹配多个关键词时取最短的窗口"""
+        news_type = news_type.casefold()
+        matched = [window for keyword, window in self.windows.items() if keyword in news_type]
+        return min(matched) if matched else self.default_window
+
+    def add(self, content: str, purpose: str, news_type: str, result: RetrievalResult) -> int:
+        signature = minhash(content)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            cursor = self._conn.execute(
+                "INSERT INTO claims (content, purpose, news_type, signature, purpose_signature, "
+                "summary, conclusion, evidences, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    content,
+                    purpose,
+                    news_type,
+                    json.dumps(signature),
+                    json.dumps(minhash(purpose)),
+                    result.summary,
+                    result.conclusion,
+                    json.dumps([evidence.model_dump() for evidence in result.evidences], ensure_ascii=False),
+                    time.time(),
+                ),
+            )
+            claim_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO claim_buckets (band, bucket, claim_id) VALUES (?, ?, ?)",
+                [(band, bucket, claim_id) for band, bucket in enumerate(lsh_buckets(signature))],
+            )
+            self._conn.execute("COMMIT")
+        return claim_id  # type: ignore[return-value]
+
+    def lookup(
+        self,
+        content: str,
+        purpose: str,
+        news_type: str,
+        check_point_id: str,
+        retrieval_step_id: str,
+    ) -> Optional[ClaimMatch]:
+        """查找复用窗口内最相似的已核查条目，结论与证据挂到当前的核查点与检索步骤上"""
+        signature = minhash(content)
+        purpose_signature = minhash(purpose)
+        content_numbers = numbers(content)
+        content_negations = negations(content)
+        buckets = lsh_buckets(signature)
+        not_before = time.time() - self.freshness_window(news_type)
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT c.id, c.content, c.purpose, c.signature, c.purpose_signature, "
+                "c.summary, c.conclusion, c.evidences, c.created_at "
+                "FROM claim_buckets b JOIN claims c ON c.id = b.claim_id "
+                "WHERE (" + " OR ".join(["(b.band = ? AND b.bucket = ?)"] * LSH_BANDS) + ") AND c.created_at >= ?",
+                [value for band, bucket in enumerate(buckets) for value in (band, bucket)] + [not_before],
+            ).fetchall()
+
+        best: Optional[ClaimMatch] = None
+        for _, matched_content, matched_purpose, sig, purpose_sig, summary, conclusion, evidences, created_at in rows:
+            score = similarity(signature, json.loads(sig))
+            if score < self.threshold or similarity(purpose_signature, json.loads(purpose_sig)) < self.purpose_threshold:
+                continue
+            if numbers(matched_content) != content_numbers or negations(matched_content) != content_negations:
+                continue
+            # 相似度相同时优先复用较新的结论
+            if best is not None and (score, created_at) <= (best.similarity, best.indexed_at):
+                continue
+            best = ClaimMatch(
+                content=content,
+                purpose=purpose,
+                matched_content=matched_content,
+                matched_purpose=matched_purpose,
+                similarity=round(score, 3),
+                indexed_at=created_at,
+                result=RetrievalResult(
+                    check_point_id=check_point_id,
+                    retrieval_step_id=retrieval_step_id,
+                    summary=summary,
+                    conclusion=conclusion,
+                    evidences=[Evidence(**evidence) for evidence in json.loads(evidences)],
+                    reused=True,
+                ),
+            )
+
+        with self._lock:
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return best
+
+    def purge_expired(self) -> int:
+        """删除超出所有复用窗口的条目"""
+        not_before = time.time() - max([self.default_window, *self.windows.values()])
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "DELETE FROM claim_buckets WHERE claim_id IN (SELECT id FROM claims WHERE created_at < ?)",
+                (not_before,),
+            )
+            deleted = self._conn.execute("DELETE FROM claims WHERE created_at < ?", (not_before,)).rowcount
+            self._conn.execute("COMMIT")
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM claims").fetchone()[0]
+            return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+_claim_index: Optional[ClaimIndex] = None
+_claim_index_lock = threading.Lock()
+
+
+def get_claim_index() -> Optional[ClaimIndex]:
+    """进程内共享的核查点索引，默认关闭（CLAIM_INDEX_ENABLED=true 时启用）"""
+    global _claim_index
+    if os.getenv("CLAIM_INDEX_ENABLED", "false").lower() != "true":
+        return None
+    if _claim_index is None:
+        with _claim_index_lock:
+            if _claim_index is None:
+                _claim_index = ClaimIndex(
+                    path=os.getenv("CLAIM_INDEX_PATH", DEFAULT_CLAIM_INDEX_PATH),
+                    threshold=float(os.getenv("CLAIM_INDEX_THRESHOLD", "0.7")),
+                    default_window=float(os.getenv("CLAIM_INDEX_WINDOW", str(7 * 24 * 3600))),
+                    windows=parse_freshness_windows(os.getenv("CLAIM_INDEX_WINDOWS", "")),
+                )
+    return _claim_index
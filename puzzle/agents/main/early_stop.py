@@ -0,0 +1,77 @@
+"""
+提前结束检索
+
+高优先级的核查点被可靠的来源明确证伪后，新闻的核查结论基本已经确定，
+剩余的中、低优先级检索步骤很少会改变结论。EarlyStopPolicy 在每次复核之后按规则判断结论是否已经确定，
+确定时跳过剩余的中、低优先级检索步骤，跳过的检索步骤在 skipped 中记录原因并出现在报告的输入中。
+
+判定规则（不调用模型）：
+- 核查点的 priority 为 high
+- 该核查点有检索步骤的结论经过 main agent 复核认可
+- 该检索结论的证据全部为 contradict，且来自至少 min_sources 个不同的来源
+
+priority 缺失的核查点既不会触发提前结束，也不会被跳过。
+"""
+
+import os
+from typing import List, Optional
+
+from .states import CheckPoint, RetrievalStep
+from ..searcher.evidence_store import canonicalize_url
+
+
+SKIPPABLE_PRIORITIES = ("medium", "low")
+
+
+class EarlyStopPolicy:
+    """
+    Args:
+        min_sources: 证伪的检索结论至少需要的不同来源数
+    """
+
+    def __init__(self, min_sources: int = 1):
+        self.min_sources = min_sources
+
+    def is_contradicted(self, step: RetrievalStep) -> bool:
+        """检索结论经过复核认可，且证据全部为 contradict"""
+        if not step.result or not step.verification or not step.verification.verified:
+            return False
+
+        evidences = step.result.evidences
+        if not evidences or any(evidence.relationship != "contradict" for evidence in evidences):
+            return False
+
+        sources = {
+            canonicalize_url(url)
+            for evidence in evidences
+            for url in evidence.source.values()
+            if url
+        }
+        return len(sources) >= self.min_sources
+
+    def find_decisive_check_point(self, check_points: List[CheckPoint]) -> Optional[CheckPoint]:
+        """返回已被明确证伪的高优先级核查点，没有时返回 None"""
+        for check_point in check_points:
+            if check_point.priority != "high":
+                continue
+            if any(self.is_contradicted(step) for step in check_point.retrieval_step or []):
+                return check_point
+        return None
+
+    def skip_reason(self, decisive: CheckPoint) -> str:
+        return f"The verdict was already decided: the high-priority check point \"{decisive.content}\" was contradicted"
+
+    def steps_to_skip(self, check_points: List[CheckPoint], remaining_step_ids: List[str]) -> List[str]:
+        """结论已经确定时，剩余检索步骤中可以跳过的中、低优先级检索步骤"""
+        remaining = set(remaining_step_ids)
+        return [
+            step.id
+            for check_point in check_points
+            if check_point.priority in SKIPPABLE_PRIORITIES
+            for step in check_point.retrieval_step or []
+            if step.id in remaining and step.result is None and not step.skipped
+        ]
+
+
+def create_early_stop_policy_from_env() -> EarlyStopPolicy:
+    return EarlyStopPolicy(min_sources=int(os.getenv("EARLY_STOP_MIN_SOURCES", "1")))
@@ -6,8 +6,10 @@ Main agent 是 Puzzle Fact Check 的主模型，其主要负责：
 4. 报告生成：根据核查结论生成报告
 """
 
+import json
 from agents.base import BaseAgent
 from langgraph.graph.state import CompiledStateGraph, StateGraph, END
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 from .prompts import (
     check_if_news_text_prompt_template,
@@ -16,6 +18,8 @@ from .prompts import (
     fact_check_plan_output_parser,
     evaluate_search_result_output_parser,
     evaluate_search_result_prompt_template,
+    evaluate_search_results_output_parser,
+    evaluate_search_results_prompt_template,
     write_fact_check_report_prompt_template,
     write_fact_check_report_output_parser,
 )
@@ -23,13 +27,21 @@ from ..searcher.states import SearchAgentState
 from ..searcher.graph import SearchAgentGraph
 from ..metadata_extractor.graph import MetadataExtractAgentGraph
 from ..metadata_extractor.states import MetadataState
+from .claim_index import ClaimIndex, ClaimMatch, get_claim_index
+from .early_stop import EarlyStopPolicy
 from utils.exceptions import AgentExecutionException
+from langchain_core.runnables import RunnableLambda
+from langchain_core.exceptions import OutputParserException
+from langchain_core.callbacks import dispatch_custom_event
+from langchain_core.messages import BaseMessageChunk
+from utils.json_stream import JsonFieldExtractor
 
 from typing import List, Optional, Any, Dict, Literal
 from .states import (
     FactCheckPlanState,
     RetrievalResult,
     RetrievalResultVerification,
+    RetrievalResultVerifications,
     CheckPoint,
     CheckPoints,
     RetrievalStep,
@@ -48,7 +60,17 @@ class MainAgent(BaseAgent):
         selected_tools: List[str],
         max_search_tokens: int = 5000,
         max_retries: int = 1, # main agent 在一个任务上允许的最多重试次数
+        checkpointer: Optional[BaseCheckpointSaver] = None,
+        claim_index: Optional[ClaimIndex] = None,
+        verify_batch_size: int = 1, # 一次复核的检索步骤数，1 表示每个检索步骤完成后立即复核
+        early_stop_policy: Optional[EarlyStopPolicy] = None,
+        search_light_model: Optional[BaseChatOpenAI] = None, # search agent 级联模式先尝试的轻量模型
     ):
+        # 持久化的 checkpointer 使中断或崩溃的核查可以从最后完成的节点恢复，默认仅保存在内存中
+        self.checkpointer = checkpointer
+        # 跨会话复用已核查的检索结论，未指定时使用进程内共享的索引（默认关闭，为 None）
+        self.claim_index = claim_index if claim_index is not None else get_claim_index()
+        
         super().__init__(model=model)
         
         self.metadata_extract_model = metadata_extract_model
@@ -59,13 +81,14 @@ class MainAgent(BaseAgent):
             model=search_model,
             max_search_tokens=max_search_tokens,
             selected_tools=selected_tools,
+            light_model=search_light_model,
         )
         
-        # graph 内部动态条件参数
-        self.retries = 0
+        # 检索进度（当前任务索引、重试次数）保存在 FactCheckPlanState 中
         self.max_retries = max_retries
-        self.current_retrieval_task_index = 0  # 跟踪当前检索任务的索引
-        self.total_retrieval_tasks_nums = 0  # 总任务数
+        self.verify_batch_size = max(1, verify_batch_size)
+        # 结论已经确定时跳过剩余的中、低优先级检索步骤，默认关闭（为 None）
+        self.early_stop_policy = early_stop_policy
         
     def _build_graph(self) -> CompiledStateGraph:
         graph_builder = StateGraph(FactCheckPlanState)
@@ -97,13 +120,15 @@ class MainAgent(BaseAgent):
                 "retry": "invoke_search_agent",
                 "continue": "invoke_search_agent",
                 "force_continue": "invoke_search_agent",
+                "defer": "invoke_search_agent",
+                "early_stop": "write_fact_check_report",
                 "finish": "write_fact_check_report"
             }
         )
         graph_builder.set_finish_point("write_fact_check_report")
 
         return graph_builder.compile(
-            checkpointer=MemorySaver(),
+            checkpointer=self.checkpointer or MemorySaver(),
         )
     
     def check_if_news_text(self, state: FactCheckPlanState):
@@ -113,7 +138,7 @@ class MainAgent(BaseAgent):
                 news_text=state.news_text
             )
         ])
-        is_news_text: IsNewsText = check_if_news_text_output_parser.invoke(response)
+        is_news_text: IsNewsText = check_if_news_text_output_parser.with_llm(self.metadata_extract_model).invoke(response)
 
         return {"is_news_text": is_news_text}
     
@@ -160,7 +185,7 @@ class MainAgent(BaseAgent):
         ]
 
         response = self.model.invoke(messages)
-        check_points: CheckPoints = fact_check_plan_output_parser.invoke(response)
+        check_points: CheckPoints = fact_check_plan_output_parser.with_llm(self.model).invoke(response)
         
         formatted_check_points = state.get_formatted_check_points(check_points)
         
@@ -195,8 +220,21 @@ class MainAgent(BaseAgent):
                 agent_type="main",
                 message="Cannot find retrieval task",
             )
-        
-        self.retries += 1
+
+        # 只在首次检索时复用已核查的结论，main agent 不认可复用的结论而重试时重新检索
+        if self.claim_index is not None and state.retries == 0:
+            claim_match: Optional[ClaimMatch] = RunnableLambda(
+                self.reuse_retrieval_result, name="reuse_retrieval_result"
+            ).invoke(current_task)
+            if claim_match is not None:
+                updated_check_points = self._batch_update_retrieval_steps(state, [{
+                    "id": current_task.retrieval_step_id,
+                    "data": {"result": claim_match.result},
+                }])
+                return {
+                    "check_points": updated_check_points,
+                    "retries": state.retries + 1,
+                }
         
         result = self.search_agent.graph.invoke(
             current_task, 
@@ -226,10 +264,28 @@ class MainAgent(BaseAgent):
         }]
         updated_check_points = self._batch_update_retrieval_steps(state, updates)
 
-        return {"check_points": updated_check_points}
+        return {
+            "check_points": updated_check_points,
+            "retries": state.retries + 1,
+        }
+
+    def reuse_retrieval_result(self, task: SearchAgentState) -> Optional[ClaimMatch]:
+        """在核查点索引中查找与当前检索任务近似重复的已核查条目"""
+        return self.claim_index.lookup(  # type: ignore[union-attr]
+            content=task.content,
+            purpose=task.purpose,
+            news_type=task.basic_metadata.news_type,
+            check_point_id=task.check_point_id,
+            retrieval_step_id=task.retrieval_step_id,
+        )
 
     def evaluate_search_result(self, state: FactCheckPlanState):
-        """主模型对当前 search agent 的检索结论进行复核推理"""
+        """
+        主模型对 search agent 的检索结论进行复核推理
+
+        verify_batch_size 大于 1 时，首次检索的结果先暂存并继续下一个检索任务，
+        攒够 verify_batch_size 个或到达最后一个任务时在一次调用中复核，复核未通过的检索步骤再逐个重试
+        """
         current_task = self._get_current_retrieval_task(state)
         if not current_task:
             raise AgentExecutionException(
@@ -251,18 +307,140 @@ class MainAgent(BaseAgent):
                 message="Cannot find current retrieval step result",
             )
 
+        if self.verify_batch_size > 1 and not state.retry_queue:
+            pending = [*state.pending_verification, state.current_retrieval_task_index]
+            retrieval_tasks = self._get_retrieval_tasks(state)
+            next_index = self._next_unskipped_task_index(
+                retrieval_tasks, state.check_points, state.current_retrieval_task_index + 1
+            )
+            if len(pending) < self.verify_batch_size and next_index < len(retrieval_tasks):
+                return {
+                    "pending_verification": pending,
+                    "retrieval_decision": "defer",
+                    "retries": 0,
+                    "current_retrieval_task_index": next_index,
+                }
+            return self._skip_decided_retrieval(state, self._evaluate_pending_search_results(state, pending))
+
         # 评估当前检索结果
+        verification_result = self._verify_retrieval_step(state, current_step)
+        updated_check_points = self._batch_update_retrieval_steps(
+            state, self._get_verification_updates(current_step, verification_result)
+        )
+        if verification_result.verified:
+            self._index_verified_result(current_task, current_result)
+        
+        return self._skip_decided_retrieval(state, {
+            "check_points": updated_check_points,
+            **(
+                self._plan_queued_retry(state, verification_result)
+                if state.retry_queue
+                else self._plan_next_retrieval(state, verification_result)
+            ),
+        })
+
+    def _verify_retrieval_step(self, state: FactCheckPlanState, step: RetrievalStep) -> RetrievalResultVerification:
+        """逐个复核一个检索步骤"""
         response = self.model.invoke([
             evaluate_search_result_prompt_template.format(
                 news_text=state.news_text,
-                current_step=current_step,
-                current_result=current_result
+                current_step=step,
+                current_result=step.result
             )
         ])
-        verification_result: RetrievalResultVerification = evaluate_search_result_output_parser.invoke(response)
-        
-        updates = [{
-            "id": current_step.id, 
+        return evaluate_search_result_output_parser.with_llm(self.model).invoke(response)
+
+    def _verify_retrieval_steps(
+        self, state: FactCheckPlanState, steps: List[RetrievalStep]
+    ) -> Dict[str, RetrievalResultVerification]:
+        """
+        在一次调用中复核多个检索步骤，批量复核的输出无法解析或遗漏了检索步骤时，对这些检索步骤逐个复核
+
+        Returns:
+            retrieval_step_id -> 复核结果
+        """
+        verifications: Dict[str, RetrievalResultVerification] = {}
+        if len(steps) > 1:
+            retrieval_steps, evidences = state.serialize_retrieval_steps_for_verification([step.id for step in steps])
+            try:
+                response = self.model.invoke([
+                    evaluate_search_results_prompt_template.format(
+                        news_text=state.news_text,
+                        retrieval_steps=json.dumps(retrieval_steps, ensure_ascii=False),
+                        evidences=json.dumps(evidences, ensure_ascii=False),
+                    )
+                ])
+                result: RetrievalResultVerifications = evaluate_search_results_output_parser.with_llm(self.model).invoke(response)
+                step_ids = {step.id for step in steps}
+                verifications = {
+                    item.retrieval_step_id: RetrievalResultVerification(
+                        **item.model_dump(exclude={"retrieval_step_id"})
+                    )
+                    for item in result.items
+                    if item.retrieval_step_id in step_ids
+                }
+            except OutputParserException:
+                verifications = {}
+
+        for step in steps:
+            if step.id not in verifications:
+                verifications[step.id] = self._verify_retrieval_step(state, step)
+        return verifications
+
+    def _evaluate_pending_search_results(self, state: FactCheckPlanState, pending: List[int]) -> Dict[str, Any]:
+        """批量复核暂存的检索结果，并决定逐个重试复核未通过的检索步骤还是继续下一个任务"""
+        retrieval_tasks = self._get_retrieval_tasks(state)
+        tasks = [retrieval_tasks[index] for index in pending]
+        steps = []
+        for task in tasks:
+            step = self.find_retrieval_step(state, task.retrieval_step_id)
+            if not step or not step.result:
+                raise AgentExecutionException(
+                    agent_type="main",
+                    message="Cannot find pending retrieval step result",
+                )
+            steps.append(step)
+
+        verifications = self._verify_retrieval_steps(state, steps)
+
+        updates: List[Dict[str, Any]] = []
+        retry_queue: List[int] = []
+        for index, task, step in zip(pending, tasks, steps):
+            verification_result = verifications[step.id]
+            updates.extend(self._get_verification_updates(step, verification_result))
+            if verification_result.verified:
+                self._index_verified_result(task, step.result)  # type: ignore[arg-type]
+            # 暂存的检索任务都只检索过一次，与逐个复核时的重试条件一致
+            elif state.retries <= self.max_retries:
+                retry_queue.append(index)
+
+        updated_check_points = self._batch_update_retrieval_steps(state, updates)
+        next_index = pending[-1] + 1
+        base = {"check_points": updated_check_points, "pending_verification": []}
+
+        if retry_queue:
+            return {
+                **base,
+                "retrieval_decision": "retry",
+                "retry_queue": retry_queue,
+                "resume_retrieval_task_index": next_index,
+                "current_retrieval_task_index": retry_queue[0],
+                "retries": 1,
+            }
+        if next_index >= len(retrieval_tasks):
+            return {**base, "retrieval_decision": "finish"}
+        return {
+            **base,
+            "retrieval_decision": "continue" if all(v.verified for v in verifications.values()) else "force_continue",
+            "retries": 0,
+            "current_retrieval_task_index": next_index,
+        }
+
+    def _get_verification_updates(
+        self, step: RetrievalStep, verification_result: RetrievalResultVerification
+    ) -> List[Dict[str, Any]]:
+        updates: List[Dict[str, Any]] = [{
+            "id": step.id, 
             "data": {
                 "verification": verification_result,
             }
@@ -270,64 +448,188 @@ class MainAgent(BaseAgent):
 
         # 主模型不认可检索结论，需要更新检索步骤
         if not verification_result.verified and (verification_result.updated_purpose or verification_result.updated_expected_source):
+            # 只更新给出的字段，未给出的字段保持原样
             update_data = {
-                "purpose": verification_result.updated_purpose,
-                "expected_source": verification_result.updated_expected_source,
+                "purpose": verification_result.updated_purpose or step.purpose,
+                "expected_source": verification_result.updated_expected_source or step.expected_source,
             }
-            updates.append({"id": current_step.id, "data": update_data})
+            updates.append({"id": step.id, "data": update_data})
+
+        return updates
+
+    def _index_verified_result(self, task: SearchAgentState, result: RetrievalResult) -> None:
+        """经过复核认可的本次检索结论写入核查点索引，复用的结论不重复写入，避免旧结论不断延长有效期"""
+        if self.claim_index is not None and not result.reused:
+            self.claim_index.add(
+                content=task.content,
+                purpose=task.purpose,
+                news_type=task.basic_metadata.news_type,
+                result=result,
+            )
 
-        updated_check_points = self._batch_update_retrieval_steps(state, updates)
-        
-        return {"check_points": updated_check_points}
+    def _plan_next_retrieval(
+        self, 
+        state: FactCheckPlanState, 
+        verification_result: RetrievalResultVerification,
+    ) -> Dict[str, Any]:
+        """
+        根据复核结果决定是重试当前检索任务、继续下一个任务还是完成检索，并更新检索进度
+        """
+        # 检查是否已经处理完所有任务
+        if state.current_retrieval_task_index >= len(self._get_retrieval_tasks(state)) - 1:
+            return {"retrieval_decision": "finish"}
+
+        # 主模型对当前检索结果不满意，且 search agent 重试次数未超过最大重试次数，重试当前检索
+        if not verification_result.verified and state.retries <= self.max_retries:
+            return {"retrieval_decision": "retry"}
+
+        # 重置重试计数器和更新当前检索任务索引，准备处理下一个任务
+        # 主模型仍不认可检索结果时，说明重试次数已超过最大重试次数，强制继续下一个任务
+        return {
+            "retrieval_decision": "continue" if verification_result.verified else "force_continue",
+            "retries": 0,
+            "current_retrieval_task_index": state.current_retrieval_task_index + 1,
+        }
+
+    def _plan_queued_retry(
+        self,
+        state: FactCheckPlanState,
+        verification_result: RetrievalResultVerification,
+    ) -> Dict[str, Any]:
+        """
+        批量复核后逐个重试复核未通过的检索步骤，重试完成后回到批量复核前的检索进度
+        """
+        if not verification_result.verified and state.retries <= self.max_retries:
+            return {"retrieval_decision": "retry"}
+
+        decision = "continue" if verification_result.verified else "force_continue"
+        retry_queue = state.retry_queue[1:]
+        if retry_queue:
+            return {
+                "retrieval_decision": decision,
+                "retry_queue": retry_queue,
+                "current_retrieval_task_index": retry_queue[0],
+                "retries": 1,
+            }
+
+        next_index = state.resume_retrieval_task_index
+        if next_index is None or next_index >= len(self._get_retrieval_tasks(state)):
+            return {"retrieval_decision": "finish", "retry_queue": [], "resume_retrieval_task_index": None}
+        return {
+            "retrieval_decision": decision,
+            "retry_queue": [],
+            "resume_retrieval_task_index": None,
+            "retries": 0,
+            "current_retrieval_task_index": next_index,
+        }
+
+    def _skip_decided_retrieval(self, state: FactCheckPlanState, output: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        继续下一个检索任务前，按提前结束策略跳过结论已经确定后剩余的中、低优先级检索步骤，
+        并越过已跳过的检索任务，没有剩余的检索任务时直接撰写报告
+        """
+        # 只在继续下一个任务时处理，批量复核后逐个重试的检索步骤仍然执行
+        if output.get("retrieval_decision") not in ("continue", "force_continue") or output.get("retry_queue", state.retry_queue):
+            return output
+
+        check_points: List[CheckPoint] = output.get("check_points", state.check_points)
+        retrieval_tasks = self._get_retrieval_tasks(state)
+        next_index = output["current_retrieval_task_index"]
+
+        if self.early_stop_policy is not None:
+            decisive = self.early_stop_policy.find_decisive_check_point(check_points)
+            if decisive is not None:
+                skipped_step_ids = self.early_stop_policy.steps_to_skip(
+                    check_points, [task.retrieval_step_id for task in retrieval_tasks[next_index:]]
+                )
+                if skipped_step_ids:
+                    reason = self.early_stop_policy.skip_reason(decisive)
+                    check_points = self._batch_update_retrieval_steps(
+                        state.model_copy(update={"check_points": check_points}),
+                        [{"id": step_id, "data": {"skipped": reason}} for step_id in skipped_step_ids],
+                    )
+
+        next_index = self._next_unskipped_task_index(retrieval_tasks, check_points, next_index)
+        if next_index >= len(retrieval_tasks):
+            return {**output, "check_points": check_points, "retrieval_decision": "early_stop", "retries": 0}
+        return {**output, "check_points": check_points, "current_retrieval_task_index": next_index}
+
+    def _next_unskipped_task_index(
+        self, retrieval_tasks: List[SearchAgentState], check_points: List[CheckPoint], start: int
+    ) -> int:
+        """从 start 开始第一个没有被跳过的检索任务索引，没有时返回检索任务数"""
+        skipped = {
+            step.id
+            for check_point in check_points
+            for step in check_point.retrieval_step or []
+            if step.skipped
+        }
+        index = start
+        while index < len(retrieval_tasks) and retrieval_tasks[index].retrieval_step_id in skipped:
+            index += 1
+        return index
 
     def should_retry_or_continue(
         self, 
         state: FactCheckPlanState
-    ) -> Literal["retry", "continue", "force_continue", "finish"]:        
+    ) -> Literal["retry", "continue", "force_continue", "defer", "early_stop", "finish"]:        
         """
-        根据评估结果决定是重试当前检索任务、继续下一个任务还是完成检索
+        根据 evaluate_search_result 给出的决定，重试当前检索任务、继续下一个任务或完成检索
         """
-        # 检查是否已经处理完所有任务
-        if self.current_retrieval_task_index >= self.total_retrieval_tasks_nums - 1:
-            return "finish"
-        
-        current_task = self._get_current_retrieval_task(state)
-        current_step = self.find_retrieval_step(state, current_task.retrieval_step_id)
-        if not current_step or not current_step.verification:
+        if not state.retrieval_decision:
             raise AgentExecutionException(
                 agent_type="main",
                 message="Cannot find current retrieval step verification result",
             )
 
-        # 主模型对当前检索结果不满意，且 search agent 重试次数未超过最大重试次数，重试当前检索
-        if not current_step.verification.verified and self.retries <= self.max_retries:
-            return "retry"
-
-        # 重置重试计数器和更新当前检索任务索引，准备处理下一个任务
-        self.retries = 0
-        self.current_retrieval_task_index += 1
-        
-        # 无论主模型是否认可当前检索结果，只要 search agent 重试次数超过最大重试次数，继续下一个任务
-        if self.retries > self.max_retries:
-            return "force_continue"
-
-        return "continue"
+        return state.retrieval_decision
     
     def write_fact_check_report(self, state: FactCheckPlanState):
-        """将核查结果写为核查报告"""
-        response = self.model.invoke([
+        """
+        将核查结果写为核查报告
+
+        报告以流式生成，report 字段的增量与解析出的 verdict 通过 write_fact_check_report_delta 事件推送，
+        生成结束后再解析完整的 Result
+        """
+        # 各检索步骤的证据合并去重后只列出一次，核查点中只引用证据 id
+        check_points, evidences = state.serialize_check_points_for_report()
+        messages = [
             write_fact_check_report_prompt_template.format(
                 news_text=state.news_text, 
-                check_points=state.check_points
+                check_points=json.dumps(check_points, ensure_ascii=False),
+                evidences=json.dumps(evidences, ensure_ascii=False),
             )
-        ])
-        result: Result = write_fact_check_report_output_parser.invoke(response)
+        ]
+
+        extractor = JsonFieldExtractor(["report", "verdict"])
+        verdict_sent = False
+        response: Optional[BaseMessageChunk] = None
+        for chunk in self.model.stream(messages):
+            response = chunk if response is None else response + chunk
+            deltas = extractor.feed(chunk.content if isinstance(chunk.content, str) else "")
+
+            verdict = None
+            if not verdict_sent and extractor.is_complete("verdict"):
+                verdict = extractor.values.get("verdict")
+                verdict_sent = True
+            if deltas.get("report") or verdict:
+                dispatch_custom_event(
+                    "write_fact_check_report_delta",
+                    {"delta": deltas.get("report", ""), "verdict": verdict},
+                )
+
+        if response is None:
+            raise AgentExecutionException(
+                agent_type="main",
+                message="Model did not return fact check report",
+            )
+        result: Result = write_fact_check_report_output_parser.with_llm(self.model).invoke(response)
         
         return {"result": result}
     
-    def _get_current_retrieval_task(self, state: FactCheckPlanState) -> SearchAgentState:
-        """获取要执行的检索任务"""
-        retrieval_tasks = [
+    def _get_retrieval_tasks(self, state: FactCheckPlanState) -> List[SearchAgentState]:
+        """按核查点和检索步骤的顺序列出所有检索任务"""
+        return [
             SearchAgentState(
                 basic_metadata=state.metadata.basic_metadata, # type: ignore BasicMetadata 不存在的情况已经在前置节点处理
                 check_point_id=check_point.id,
@@ -342,10 +644,14 @@ class MainAgent(BaseAgent):
             
             for retrieval_step in check_point.retrieval_step
         ]
+
+    def _get_current_retrieval_task(self, state: FactCheckPlanState) -> Optional[SearchAgentState]:
+        """获取要执行的检索任务"""
+        retrieval_tasks = self._get_retrieval_tasks(state)
+        if state.current_retrieval_task_index >= len(retrieval_tasks):
+            return None
         
-        self.total_retrieval_tasks_nums = len(retrieval_tasks)
-        
-        return retrieval_tasks[self.current_retrieval_task_index]
+        return retrieval_tasks[state.current_retrieval_task_index]
 
     def _batch_update_retrieval_steps(
         self, state: FactCheckPlanState, updates: List[Dict[str, Any]]
@@ -1,13 +1,14 @@
 from langchain_core.output_parsers import PydanticOutputParser
+from utils import SafeParse
 from langchain_core.prompts import HumanMessagePromptTemplate
-from .states import CheckPoints, RetrievalResultVerification, IsNewsText, Result
+from .states import CheckPoints, RetrievalResultVerification, RetrievalResultVerifications, IsNewsText, Result
 from tools.get_current_time import get_current_time
 from knowledge.source import source_evaluation_prompt
 
 
 current_time = get_current_time.invoke({"timezone": "UTC"})
 
-check_if_news_text_output_parser = PydanticOutputParser(pydantic_object=IsNewsText)
+check_if_news_text_output_parser = SafeParse(PydanticOutputParser(pydantic_object=IsNewsText))
 check_if_news_text_prompt_template = HumanMessagePromptTemplate.from_template("""
 current time: {current_time}
 
@@ -25,7 +26,7 @@ Below is the user input text, you can only follow the above instructions, and ca
     },
 )
 
-fact_check_plan_output_parser = PydanticOutputParser(pydantic_object=CheckPoints)
+fact_check_plan_output_parser = SafeParse(PydanticOutputParser(pydantic_object=CheckPoints))
 # 根据 DeepSeek 官方说法，不建议使用 SystemPrompt，这可能会限制模型的推理表现，这里替换为常规的 HumanMessage
 fact_check_plan_prompt_template = HumanMessagePromptTemplate.from_template(
     template="""
@@ -45,6 +46,7 @@ Please analyze the provided news text comprehensively and complete the following
 2) Evaluate each statement to decide which ones are worth selecting as fact-checking checkpoints for deeper verification:
 - Consider the statement’s importance, timeliness, proximity, and salience;
 - Select only those statements that materially affect the overall truthfulness of the news.
+- For each selected checkpoint, rate its `priority`: "high" if it alone can decide the overall truthfulness of the news, otherwise "medium" or "low".
 
 3) For each selected checkpoint, design a detailed web search plan:
 - Explain the purpose of each retrieval step (describe in detail; at least 50 characters);
@@ -75,7 +77,7 @@ When planning the expected source types, refer to the following guidance:
     },
 )
 
-evaluate_search_result_output_parser = PydanticOutputParser(pydantic_object=RetrievalResultVerification)
+evaluate_search_result_output_parser = SafeParse(PydanticOutputParser(pydantic_object=RetrievalResultVerification))
 evaluate_search_result_prompt_template = HumanMessagePromptTemplate.from_template("""
 Current time: {current_time}
 
@@ -116,7 +118,53 @@ In this case, you do not need to update `updated_purpose` or `updated_expected_s
     },
 )
 
-write_fact_check_report_output_parser = PydanticOutputParser(pydantic_object=Result)
+# 批量复核：一次调用复核多个已完成的检索步骤
+evaluate_search_results_output_parser = SafeParse(PydanticOutputParser(pydantic_object=RetrievalResultVerifications))
+evaluate_search_results_prompt_template = HumanMessagePromptTemplate.from_template("""
+Current time: {current_time}
+
+# Task
+You are a professional news fact-checker. Earlier, you designed a fact-checking plan based on the news text. 
+Now, the search agent has completed several retrieval tasks, and you need to evaluate the results of each of these retrieval steps independently.
+
+# News Text
+{news_text}
+
+# Retrieval Steps to Evaluate
+Each item contains the checkpoint being verified, the retrieval step, and the search agent’s retrieval result. The evidence is referenced by `evidence_ids`.
+{retrieval_steps}
+
+# Evidence
+{evidences}
+
+# Tasks
+For **each** retrieval step above:
+1) Evaluate whether the search agent’s retrieval results fulfill the purpose of the retrieval step. 
+   Carefully review the retrieval step’s conclusion, check if the evidence is sufficient, and verify whether the conclusion and reasoning are consistent.
+2) Use the following guidance to evaluate the information sources used by the search agent:
+{source_evaluation_prompt}
+
+If you do **not** accept the results of a retrieval step, you may:
+   - Point out the problems with the results;
+   - Adjust the retrieval purpose and the expected source types;
+   - Finally, update the fields `updated_purpose` and `updated_expected_source`.
+
+If you **accept** the results, set `verified` to True. 
+In this case, you do not need to update `updated_purpose` or `updated_expected_source`.
+
+Output exactly one item per retrieval step and copy its `retrieval_step_id` unchanged.
+
+# Output Format
+{format_instructions}
+""",
+    partial_variables={
+        "format_instructions": evaluate_search_results_output_parser.get_format_instructions(),
+        "current_time": current_time,
+        "source_evaluation_prompt": source_evaluation_prompt,
+    },
+)
+
+write_fact_check_report_output_parser = SafeParse(PydanticOutputParser(pydantic_object=Result))
 write_fact_check_report_prompt_template = HumanMessagePromptTemplate.from_template(
     template="""
 Current time: {current_time}
@@ -127,6 +175,11 @@ You are a professional news fact-checker conducting a fact-check of the followin
 Previously, you designed a fact-checking plan based on this news. The search agent executed retrieval steps according to your plan, and you have already reviewed all the retrieval results:
 {check_points}
 
+The evidence cited by the retrieval results (`evidence_ids`):
+{evidences}
+
+Retrieval steps with `skipped` set were not executed because the verdict had already been decided by a contradicted high-priority checkpoint; mention them as not verified where relevant.
+
 # Task
 Based on your fact-checking plan, the search agent’s retrieval history, and your review conclusions, write a professional and authoritative news fact-checking report. The report should allow readers to clearly understand the truthfulness of each checkpoint and the supporting evidence.
 
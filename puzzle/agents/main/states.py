@@ -1,9 +1,10 @@
 import uuid
-import operator
 from pydantic import BaseModel, Field
+from pydantic.json_schema import SkipJsonSchema
 from ..metadata_extractor.states import MetadataState
 from ..searcher.states import SearchResult, Evidence
-from typing import Optional, List, Annotated, Literal
+from ..searcher.evidence_store import EvidenceStore, merge_evidences
+from typing import Optional, List, Annotated, Literal, Dict, Any, Tuple
 
 class IsNewsText(BaseModel):
     result: bool = Field(description="Whether the text is suitable for fact-checking")
@@ -28,14 +29,27 @@ class RetrievalResultVerification(BaseModel):
     )
 
 
+class RetrievalStepVerification(RetrievalResultVerification):
+    retrieval_step_id: str = Field(description="The id of the evaluated retrieval step")
+
+
+class RetrievalResultVerifications(BaseModel):
+    items: List[RetrievalStepVerification] = Field(
+        description="The verification of each retrieval step, one item per retrieval step",
+        default_factory=list,
+    )
+
+
 # 合并了 SearchResult 和 Evidence 的核查结论
 class RetrievalResult(SearchResult):
     check_point_id: str
     retrieval_step_id: str
-    evidences: Annotated[List[Evidence], operator.add] = Field(
+    evidences: Annotated[List[Evidence], merge_evidences] = Field(
         description="Evidence fragments collected during retrieval, which are important to the fact-checking goal",
         default_factory=list
     )
+    # 是否复用了核查点索引中已核查的结论，而不是本次检索得到的
+    reused: bool = Field(default=False)
 
 
 class RetrievalStep(BaseModel):
@@ -52,6 +66,8 @@ class RetrievalStep(BaseModel):
         description="The verification of the retrieval result by the main agent",
         default=None
     )
+    # 提前结束检索时跳过该检索步骤的原因，不出现在模型的输出格式中
+    skipped: SkipJsonSchema[Optional[str]] = None
 
 
 class CheckPoint(BaseModel):
@@ -62,6 +78,10 @@ class CheckPoint(BaseModel):
         description="If it is selected as a verification point, explain its importance",
         default=None
     )
+    priority: Optional[Literal["high", "medium", "low"]] = Field(
+        description="If it is selected as a verification point, how much it affects the overall truthfulness of the news",
+        default=None
+    )
     retrieval_step: Optional[List[RetrievalStep]] = Field(
         description="If it is selected as a verification point, provide a retrieval plan", 
         default=None
@@ -92,6 +112,15 @@ class Result(BaseModel):
     )
 
 
+def _serialize_result(result: RetrievalResult, evidence_store: EvidenceStore) -> Dict[str, Any]:
+    """检索结论中的证据只保留 id，证据内容由 evidence_store 统一列出"""
+    return {
+        "summary": result.summary,
+        "conclusion": result.conclusion,
+        "evidence_ids": evidence_store.resolve_ids(result.evidences),
+    }
+
+
 class FactCheckPlanState(BaseModel):
     news_text: str = Field(description="The news text to be fact-checked")
     is_news_text: Optional[IsNewsText] = Field(description="Whether the text is suitable for fact-checking", default=None)
@@ -99,6 +128,68 @@ class FactCheckPlanState(BaseModel):
     check_points: List[CheckPoint] = Field(default_factory=list)
     result: Optional[Result] = Field(description="The fact-checking result", default=None)
     
+    # 检索进度，保存在 state 中随 checkpoint 一起持久化，从中断处恢复时不会丢失
+    current_retrieval_task_index: int = Field(description="The index of the current retrieval task", default=0)
+    retries: int = Field(description="The number of search attempts on the current retrieval task", default=0)
+    retrieval_decision: Optional[Literal["retry", "continue", "force_continue", "defer", "early_stop", "finish"]] = Field(
+        description="The decision made after evaluating the current retrieval result",
+        default=None
+    )
+    # 批量复核：等待复核的检索任务索引；复核未通过、等待逐个重试的检索任务索引，以及重试完成后继续的任务索引
+    pending_verification: List[int] = Field(default_factory=list)
+    retry_queue: List[int] = Field(default_factory=list)
+    resume_retrieval_task_index: Optional[int] = Field(default=None)
+    
+    def serialize_check_points_for_report(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        将核查点序列化为撰写报告使用的格式：所有检索步骤的证据合并去重为一个证据列表，
+        检索结论中只保留证据 id
+
+        Returns:
+            (核查点列表, 证据列表)
+        """
+        evidence_store = EvidenceStore()
+        check_points = []
+        
+        for check_point in self.check_points:
+            check_point_data = check_point.model_dump(exclude={"retrieval_step"})
+            retrieval_steps = []
+            for retrieval_step in check_point.retrieval_step or []:
+                step_data = retrieval_step.model_dump(exclude={"result"})
+                if retrieval_step.result:
+                    step_data["result"] = _serialize_result(retrieval_step.result, evidence_store)
+                retrieval_steps.append(step_data)
+            check_point_data["retrieval_step"] = retrieval_steps
+            check_points.append(check_point_data)
+        
+        return check_points, evidence_store.serialize_for_llm()
+
+    def serialize_retrieval_steps_for_verification(
+        self, retrieval_step_ids: List[str]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        将待批量复核的检索步骤序列化为 (检索步骤列表, 证据列表)，每个检索步骤附带所属核查点的内容
+        """
+        evidence_store = EvidenceStore()
+        steps: Dict[str, Dict[str, Any]] = {}
+
+        for check_point in self.check_points:
+            for retrieval_step in check_point.retrieval_step or []:
+                if retrieval_step.id not in retrieval_step_ids or not retrieval_step.result:
+                    continue
+                steps[retrieval_step.id] = {
+                    "retrieval_step_id": retrieval_step.id,
+                    "check_point": check_point.content,
+                    "purpose": retrieval_step.purpose,
+                    "expected_source": retrieval_step.expected_source,
+                    "result": _serialize_result(retrieval_step.result, evidence_store),
+                }
+
+        return (
+            [steps[step_id] for step_id in retrieval_step_ids if step_id in steps],
+            evidence_store.serialize_for_llm(),
+        )
+    
     def get_formatted_check_points(self, check_points: CheckPoints) -> List[CheckPoint]:
         """
         在 LLM 给出 check points 后为每个 check point 和 retrieval step 生成唯一 id
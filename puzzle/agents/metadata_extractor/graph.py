@@ -10,8 +10,10 @@ from .prompts import (
 from tools import SearchWikipediaTool
 
 from .states import MetadataState, BasicMetadata, Knowledge, Knowledges
+from .knowledge_store import KnowledgeStore, get_knowledge_store
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langgraph.graph.state import CompiledStateGraph
+from typing import Optional
 
 
 class MetadataExtractAgentGraph(BaseAgent):
@@ -21,9 +23,12 @@ class MetadataExtractAgentGraph(BaseAgent):
     def __init__(
         self, 
         model: BaseChatOpenAI,
+        knowledge_store: Optional[KnowledgeStore] = None,
     ):
         super().__init__(model=model)
         
+        # 未指定时使用进程内共享的知识元定义缓存（默认关闭，KNOWLEDGE_CACHE_ENABLED=true 时启用）
+        self.knowledge_store = knowledge_store if knowledge_store is not None else get_knowledge_store()
         self.tools = [SearchWikipediaTool()]
         self.model_with_tools = self.model.bind_tools(tools=self.tools)
         
@@ -82,7 +87,27 @@ class MetadataExtractAgentGraph(BaseAgent):
 
     def retrieve_knowledge(self, sub_state: Knowledge):
         """
-        使用维基百科检索每个知识元的定义
+        使用维基百科检索每个知识元的定义，已缓存的知识元直接使用缓存的定义
+        """
+        if self.knowledge_store is not None:
+            cached_knowledge = self.knowledge_store.lookup(sub_state)
+            if cached_knowledge is not None:
+                return {"retrieved_knowledges": [cached_knowledge]}
+
+        retrieved_knowledge = self.retrieve_term(sub_state)
+        if self.knowledge_store is not None:
+            # 以提取出的名称与类别为 key，检索 agent 可能改写返回的名称
+            self.knowledge_store.put(sub_state.model_copy(update={
+                "description": retrieved_knowledge.description,
+                "source": retrieved_knowledge.source,
+            }))
+        
+        # 返回检索到的知识元
+        return {"retrieved_knowledges": [retrieved_knowledge]}
+
+    def retrieve_term(self, sub_state: Knowledge) -> Knowledge:
+        """
+        运行检索 agent 获取单个知识元的定义，不经过缓存
         """
         sub_graph = create_react_agent(
             model=self.model,
@@ -97,6 +122,4 @@ class MetadataExtractAgentGraph(BaseAgent):
         response = sub_graph.invoke({"messages": [retrieve_message]})
         retrieved_knowledge: Knowledge = response["structured_response"]
         
-        # 返回检索到的知识元
-        return {"retrieved_knowledges": [retrieved_knowledge]}
-    
\ No newline at end of file
+        return retrieved_knowledge
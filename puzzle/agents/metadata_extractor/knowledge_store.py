@@ -0,0 +1,181 @@
+"""
+知识元定义缓存
+
+retrieve_knowledge 会为每个知识元运行一次带维基百科检索的 ReAct 循环，
+而 "美国国会"、"F-1 visa" 这类常见知识元几乎每篇新闻都会出现。
+KnowledgeStore 按 (规范化后的名称, 类别, 语言) 持久化保存检索到的定义与来源，已知的知识元直接返回，不再运行 agent。
+
+- 超过 ttl 的定义视为过期，下次遇到时重新检索并刷新
+- 没有检索到定义的知识元不写入缓存
+"""
+
+import os
+import re
+import time
+import sqlite3
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .states import Knowledge
+
+
+DEFAULT_KNOWLEDGE_CACHE_PATH = "knowledge_cache.sqlite"
+
+CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+
+def normalize_term(text: str) -> str:
+    """全角转半角、统一大小写并合并空白，"F-1 Visa"、"Ｆ-1  visa" 对应同一个 key"""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def detect_language(term: str) -> str:
+    """知识元名称的语言，只区分中日韩文字与其他文字"""
+    return "zh" if CJK_PATTERN.search(term) else "en"
+
+
+def is_retrieved(knowledge: Knowledge) -> bool:
+    """检索 agent 在找不到定义时会输出 None 或 'None'"""
+    description = (knowledge.description or "").strip()
+    return bool(description) and description.lower() not in ("none", "null", "n/a")
+
+
+@dataclass
+class KnowledgeEntry:
+    term: str
+    category: str
+    language: str
+    description: str
+    source: Optional[str]
+    updated_at: float
+
+
+class KnowledgeStore:
+    """
+    SQLite 知识元定义缓存
+
+    Args:
+        path: SQLite 文件路径，":memory:" 表示只保存在内存中
+        ttl: 定义的有效秒数，0 表示不过期
+    """
+
+    def __init__(self, path: str = DEFAULT_KNOWLEDGE_CACHE_PATH, ttl: float = 30 * 24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+        self._lock = threading.Lock()
+        # 知识元检索在多个线程中并行执行，共用一个连接并由锁保证串行访问
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS knowledge (
+                term_key TEXT NOT NULL,
+                category_key TEXT NOT NULL,
+                language TEXT NOT NULL,
+                term TEXT NOT NULL,
+                category TEXT NOT NULL,
+                description TEXT NOT NULL,
+                source TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (term_key, category_key, language)
+            )
+            """
+        )
+
+    @staticmethod
+    def make_key(term: str, category: str, language: Optional[str] = None) -> Tuple[str, str, str]:
+        return normalize_term(term), normalize_term(category), language or detect_language(term)
+
+    def get(self, term: str, category: str, language: Optional[str] = None) -> Optional[KnowledgeEntry]:
+        """返回未过期的定义，不存在或已过期时返回 None"""
+        key = self.make_key(term, category, language)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT term, category, language, description, source, updated_at FROM knowledge "
+                "WHERE term_key = ? AND category_key = ? AND language = ?",
+                key,
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+            if self.ttl and time.time() - row[5] > self.ttl:
+                self.stale += 1
+                return None
+            self.hits += 1
+
+        return KnowledgeEntry(*row)
+
+    def lookup(self, knowledge: Knowledge) -> Optional[Knowledge]:
+        """按知识元的名称与类别查找定义，返回的知识元保留原始的名称与类别"""
+        entry = self.get(knowledge.term, knowledge.category)
+        if entry is None:
+            return None
+        return Knowledge(
+            term=knowledge.term,
+            category=knowledge.category,
+            description=entry.description,
+            source=entry.source,
+        )
+
+    def put(self, knowledge: Knowledge, language: Optional[str] = None) -> bool:
+        """写入检索到的定义，没有定义时不写入，返回是否写入"""
+        if not is_retrieved(knowledge):
+            return False
+
+        key = self.make_key(knowledge.term, knowledge.category, language)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO knowledge "
+                "(term_key, category_key, language, term, category, description, source, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, knowledge.term, knowledge.category, knowledge.description, knowledge.source, time.time()),
+            )
+        return True
+
+    def put_many(self, knowledges: Iterable[Knowledge]) -> int:
+        return sum(self.put(knowledge) for knowledge in knowledges)
+
+    def purge_expired(self) -> int:
+        if not self.ttl:
+            return 0
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM knowledge WHERE updated_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM knowledge").fetchone()[0]
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+            }
+
+
+_knowledge_store: Optional[KnowledgeStore] = None
+_knowledge_store_lock = threading.Lock()
+
+
+def get_knowledge_store() -> Optional[KnowledgeStore]:
+    """进程内共享的知识元定义缓存，默认关闭（KNOWLEDGE_CACHE_ENABLED=true 时启用）"""
+    global _knowledge_store
+    if os.getenv("KNOWLEDGE_CACHE_ENABLED", "false").lower() != "true":
+        return None
+    if _knowledge_store is None:
+        with _knowledge_store_lock:
+            if _knowledge_store is None:
+                _knowledge_store = KnowledgeStore(
+                    path=os.getenv("KNOWLEDGE_CACHE_PATH", DEFAULT_KNOWLEDGE_CACHE_PATH),
+                    ttl=float(os.getenv("KNOWLEDGE_CACHE_TTL", str(30 * 24 * 3600))),
+                )
+    return _knowledge_store
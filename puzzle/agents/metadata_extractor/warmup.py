@@ -0,0 +1,129 @@
+"""
+预热知识元定义缓存
+
+读取常见知识元列表，为缓存中不存在或已过期的知识元运行检索 agent，写入 KnowledgeStore：
+    python -m agents.metadata_extractor.warmup terms.txt --provider qwen --model qwen-plus
+
+列表文件格式：
+- .txt：每行一个知识元，"名称<TAB>类别"，省略类别时使用 --category
+- .json / .jsonl：Knowledge 对象（term、category，可选 description、source），带有定义的条目直接导入，不运行检索 agent
+"""
+
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from .states import Knowledge
+from .knowledge_store import KnowledgeStore, get_knowledge_store, is_retrieved
+
+
+def load_terms(path: str, default_category: str) -> List[Knowledge]:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    if path.endswith(".json"):
+        return [Knowledge.model_validate(item) for item in json.loads(text)]
+    if path.endswith(".jsonl"):
+        return [Knowledge.model_validate_json(line) for line in text.splitlines() if line.strip()]
+
+    knowledges = []
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        term, _, category = line.partition("\t")
+        knowledges.append(Knowledge(term=term.strip(), category=category.strip() or default_category))
+    return knowledges
+
+
+def warm_up(
+    store: KnowledgeStore,
+    knowledges: List[Knowledge],
+    agent: Optional[object] = None,
+    concurrency: int = 4,
+    refresh: bool = False,
+) -> dict:
+    """
+    预热缓存
+
+    Args:
+        agent: MetadataExtractAgentGraph，为 None 时只导入带有定义的条目
+        refresh: 是否重新检索缓存中未过期的知识元
+    """
+    imported = store.put_many(knowledge for knowledge in knowledges if is_retrieved(knowledge))
+    pending = [
+        knowledge for knowledge in knowledges
+        if not is_retrieved(knowledge)
+        and (refresh or store.get(knowledge.term, knowledge.category) is None)
+    ]
+
+    retrieved, failed = 0, 0
+    if agent is not None and pending:
+        def retrieve(knowledge: Knowledge) -> bool:
+            try:
+                result = agent.retrieve_term(knowledge)  # type: ignore[attr-defined]
+            except Exception as e:
+                print(f"failed to retrieve {knowledge.term}: {e}", file=sys.stderr)
+                return False
+            return store.put(knowledge.model_copy(update={
+                "description": result.description,
+                "source": result.source,
+            }))
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for ok in executor.map(retrieve, pending):
+                if ok:
+                    retrieved += 1
+                else:
+                    failed += 1
+
+    return {
+        "terms": len(knowledges),
+        "imported": imported,
+        "retrieved": retrieved,
+        "failed": failed,
+        "skipped": len(pending) if agent is None else 0,
+        "entries": store.stats()["entries"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="预热知识元定义缓存")
+    parser.add_argument("terms", help="知识元列表文件（.txt / .json / .jsonl）")
+    parser.add_argument("--provider", help="检索 agent 使用的模型提供商，不指定时只导入带有定义的条目")
+    parser.add_argument("--model", help="检索 agent 使用的模型名称")
+    parser.add_argument("--category", default="概念", help=".txt 文件中省略类别时使用的类别")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时检索的知识元数量")
+    parser.add_argument("--refresh", action="store_true", help="重新检索缓存中未过期的知识元")
+    args = parser.parse_args(argv)
+
+    store = get_knowledge_store()
+    if store is None:
+        print("Knowledge cache is disabled, set KNOWLEDGE_CACHE_ENABLED=true", file=sys.stderr)
+        return 1
+
+    agent = None
+    if args.provider and args.model:
+        from api.agent_service import get_model_instance_from_provider
+        from .graph import MetadataExtractAgentGraph
+
+        model = get_model_instance_from_provider(args.provider, args.model, streaming=False)
+        agent = MetadataExtractAgentGraph(model=model, knowledge_store=store)
+
+    started_at = time.perf_counter()
+    summary = warm_up(
+        store,
+        load_terms(args.terms, args.category),
+        agent=agent,
+        concurrency=args.concurrency,
+        refresh=args.refresh,
+    )
+    summary["elapsed"] = round(time.perf_counter() - started_at, 2)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0 if not summary["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""
+证据去重
+
+search agent 在多轮检索中会反复从同一篇文章中提取相同的片段，百度的跳转链接与原始链接也会被当作不同的来源，
+这些重复的证据会随后续每一次 prompt 以及 write_fact_check_report 一起重复发送。
+EvidenceStore 按 (规范化的来源 URL, 内容指纹) 对证据去重，合并近似重复的证据，并为每条证据分配稳定的 id，
+prompt 中的检索历史与核查点只引用证据 id，证据内容只出现一次。
+"""
+
+import base64
+import hashlib
+import unicodedata
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Set
+
+if TYPE_CHECKING:
+    # states 使用 merge_evidences 作为 reducer，运行时不反向导入
+    from .states import Evidence, Status
+
+
+# 不影响页面内容的跟踪参数
+TRACKING_PARAMS = {
+    "spm", "from", "ref", "ref_src", "source", "share", "share_token", "fbclid", "gclid",
+    "yclid", "mc_cid", "mc_eid", "igshid", "wfr", "scene", "vd_source", "sharesource",
+}
+# 跳转链接中保存目标地址的参数，如 google.com/url?q=、bing.com/ck/a?u=
+REDIRECT_PARAMS = ("url", "q", "u", "target", "to")
+# 不同来源的内容相似度达到该值时视为同一条证据
+NEAR_DUPLICATE_THRESHOLD = 0.85
+# 同一来源的内容相似度达到该值，或一条证据包含另一条时视为同一条证据
+SAME_SOURCE_THRESHOLD = 0.6
+
+
+def _unwrap_redirect(parts: Any) -> Optional[str]:
+    for key, value in parse_qsl(parts.query):
+        if key not in REDIRECT_PARAMS:
+            continue
+        if value.startswith("a1"):
+            # bing 的跳转链接把目标地址做了 base64 编码
+            try:
+                value = base64.urlsafe_b64decode(value[2:] + "=" * (-len(value[2:]) % 4)).decode("utf-8")
+            except (ValueError, UnicodeDecodeError):
+                continue
+        value = unquote(value)
+        if value.startswith(("http://", "https://")):
+            return value
+    return None
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    规范化来源 URL：展开搜索引擎的跳转链接，统一协议与域名大小写，去掉 www.、片段、跟踪参数与末尾的斜杠
+
+    百度 /link?url= 跳转链接中的目标地址是加密的，无法在本地还原，这类证据依靠内容指纹与其他来源合并
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    if not parts.scheme and not parts.netloc:
+        return url
+
+    target = _unwrap_redirect(parts)
+    if target is not None and target != url:
+        return canonicalize_url(target)
+
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    host = host.removesuffix(":80").removesuffix(":443")
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_")
+    ))
+    path = parts.path.rstrip("/") or ""
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme, host, path, query, ""))
+
+
+def fingerprint(content: str) -> str:
+    """内容指纹：全角转半角、统一大小写并去掉空白与标点"""
+    return "".join(char for char in unicodedata.normalize("NFKC", content).casefold() if char.isalnum())
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(max(1, len(text) - 2))}
+
+
+def _similarity(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    x, y = _trigrams(a), _trigrams(b)
+    return len(x & y) / len(x | y)
+
+
+def _source_urls(evidence: "Evidence") -> List[str]:
+    return [canonicalize_url(url) for url in evidence.source.values() if url]
+
+
+class EvidenceStore:
+    """
+    一次核查运行中的证据集合，按加入的顺序保存去重后的证据
+
+    Args:
+        evidences: 初始证据，已有 id 的证据保留原来的 id
+    """
+
+    def __init__(self, evidences: Iterable["Evidence"] = ()):
+        self._items: Dict[str, "Evidence"] = {}
+        self._keys: Dict[tuple, str] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._aliases: Dict[str, str] = {}
+        for evidence in evidences:
+            self.add(evidence)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def items(self) -> List["Evidence"]:
+        return list(self._items.values())
+
+    def get(self, evidence_id: str) -> Optional["Evidence"]:
+        return self._items.get(self._aliases.get(evidence_id, evidence_id))
+
+    def add(self, evidence: "Evidence") -> "Evidence":
+        """加入一条证据，与已有证据重复时合并来源，返回保存的证据"""
+        urls = _source_urls(evidence)
+        content_fingerprint = fingerprint(evidence.content)
+        key = (urls[0] if urls else "", content_fingerprint)
+
+        existing_id = self._keys.get(key) or self._find_near_duplicate(urls, content_fingerprint)
+        if existing_id is not None:
+            merged = self._merge(self._items[existing_id], evidence, content_fingerprint)
+            if evidence.id and evidence.id != existing_id:
+                self._aliases[evidence.id] = existing_id
+            self._keys[key] = existing_id
+            return merged
+
+        evidence_id = evidence.id or "ev_" + hashlib.blake2b(
+            f"{key[0]}\n{key[1]}".encode("utf-8"), digest_size=4
+        ).hexdigest()
+        stored = evidence.model_copy(update={
+            "id": evidence_id,
+            "source": self._merge_sources({}, evidence.source),
+        })
+        self._items[evidence_id] = stored
+        self._keys[key] = evidence_id
+        self._fingerprints[evidence_id] = content_fingerprint
+        return stored
+
+    def add_all(self, evidences: Iterable["Evidence"]) -> List["Evidence"]:
+        return [self.add(evidence) for evidence in evidences]
+
+    def resolve_ids(self, evidences: Sequence["Evidence"]) -> List[str]:
+        """证据在集合中对应的 id，去重后保持顺序"""
+        ids: List[str] = []
+        for evidence in evidences:
+            evidence_id = self.add(evidence).id
+            if evidence_id and evidence_id not in ids:
+                ids.append(evidence_id)
+        return ids
+
+    def serialize_for_llm(self, evidence_ids: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        items = self.items() if evidence_ids is None else [
+            item for item in (self.get(evidence_id) for evidence_id in evidence_ids) if item is not None
+        ]
+        return [
+            {
+                "id": item.id,
+                "content": item.content,
+                "source": item.source,
+                "relationship": item.relationship,
+                "reasoning": item.reasoning,
+            }
+            for item in items
+        ]
+
+    # internals
+    def _find_near_duplicate(self, urls: List[str], content_fingerprint: str) -> Optional[str]:
+        for evidence_id, existing_fingerprint in self._fingerprints.items():
+            same_source = bool(set(urls) & set(_source_urls(self._items[evidence_id])))
+            if same_source and (
+                content_fingerprint in existing_fingerprint or existing_fingerprint in content_fingerprint
+            ):
+                return evidence_id
+            threshold = SAME_SOURCE_THRESHOLD if same_source else NEAR_DUPLICATE_THRESHOLD
+            if _similarity(content_fingerprint, existing_fingerprint) >= threshold:
+                return evidence_id
+        return None
+
+    def _merge(self, existing: "Evidence", evidence: "Evidence", content_fingerprint: str) -> "Evidence":
+        update: Dict[str, Any] = {"source": self._merge_sources(existing.source, evidence.source)}
+        # 保留更完整的片段
+        if len(content_fingerprint) > len(self._fingerprints[existing.id]):  # type: ignore[index]
+            update["content"] = evidence.content
+            self._fingerprints[existing.id] = content_fingerprint  # type: ignore[index]
+        merged = existing.model_copy(update=update)
+        self._items[existing.id] = merged  # type: ignore[index]
+        return merged
+
+    @staticmethod
+    def _merge_sources(existing: Dict[str, str], new: Dict[str, str]) -> Dict[str, str]:
+        sources = dict(existing)
+        seen = {canonicalize_url(url) for url in sources.values() if url}
+        for name, url in new.items():
+            canonical = canonicalize_url(url) if url else url
+            if canonical and canonical in seen:
+                continue
+            sources[name if name not in sources else f"{name} ({len(sources) + 1})"] = canonical
+            if canonical:
+                seen.add(canonical)
+        return sources
+
+
+def merge_evidences(left: List["Evidence"], right: List["Evidence"]) -> List["Evidence"]:
+    """state 中证据列表的 reducer：合并新的证据并去重"""
+    store = EvidenceStore(left)
+    store.add_all(right)
+    return store.items()
+
+
+def serialize_statuses_for_llm(statuses: Sequence["Status"], store: EvidenceStore) -> List[Dict[str, Any]]:
+    """检索历史中的证据只保留 id，证据内容在证据列表中给出"""
+    serialized = []
+    for status in statuses:
+        data = status.model_dump(exclude={"new_evidence"})
+        if status.new_evidence:
+            data["new_evidence_ids"] = store.resolve_ids(status.new_evidence)
+        serialized.append(data)
+    return serialized
@@ -1,12 +1,14 @@
 import json
 from agents.base import BaseAgent
-from langchain_core.utils.function_calling import convert_to_openai_tool
-from utils import count_tokens
+from utils import count_tokens, compact_tool_schema
 from .states import SearchAgentState, Status, SearchResult
+from .evidence_store import EvidenceStore, serialize_statuses_for_llm
 from .prompts import (
     search_method_prompt_template,
+    retrieval_step_prompt_template,
     evaluate_current_status_prompt_template,
     evaluate_current_status_output_parser,
+    evaluate_current_status_strict_output_parser,
     generate_answer_prompt_template,
     generate_answer_output_parser,
 )
@@ -22,9 +24,10 @@ from tools import (
 )
 from langgraph.graph.state import StateGraph
 
-from typing import cast, List, Dict, Any
-from langchain_core.messages import ToolCall
+from typing import cast, List, Dict, Any, Optional
+from langchain_core.messages import BaseMessage, ToolCall
 from langchain_openai.chat_models.base import BaseChatOpenAI
+from models.cascade import ModelCascade
 
 class SearchAgentGraph(BaseAgent):
     """
@@ -33,14 +36,17 @@ class SearchAgentGraph(BaseAgent):
     Args:
         max_search_tokens：子 agent 检索时允许消耗的最大 token 数
         selected_tools: 从前端传入的工具选择配置
+        light_model: 级联模式下 evaluate_current_status 先尝试的轻量模型，为 None 时不使用级联
     """
     def __init__(
         self,
         model: BaseChatOpenAI,
         max_search_tokens: int,
         selected_tools: List[str] = [],
+        light_model: Optional[BaseChatOpenAI] = None,
     ):
         super().__init__(model=model)
+        self.light_model = light_model
 
         self.max_search_tokens = max_search_tokens
         self.token_usage = 0
@@ -67,7 +73,10 @@ class SearchAgentGraph(BaseAgent):
         # 初始化工具列表
         self.tools = self._get_tools(selected_tools)
         self.tools_by_name = {tool.name: tool for tool in self.tools}
-        self.tool_calling_schema = [convert_to_openai_tool(tool) for tool in self.tools]
+        # 只取决于工具列表的 prompt 前缀，每次调用都原样复用
+        self.search_method_prompt = search_method_prompt_template.format(
+            tools_schema=compact_tool_schema(self.tools),
+        )
         
     def _get_tools(self, selected_tools: List[str] = []) -> List[Any]:
         """
@@ -184,25 +193,40 @@ class SearchAgentGraph(BaseAgent):
 
             return {"statuses": [forced_status]}
 
-        search_method_prompt = search_method_prompt_template.format(
+        retrieval_step_prompt = retrieval_step_prompt_template.format(
             basic_metadata=state.basic_metadata.serialize_for_llm(),
             content=state.content,
             purpose=state.purpose,
             expected_source=state.expected_source,
-            tools_schema=self.tool_calling_schema,
         )
 
+        # 检索历史只引用证据 id，证据内容在证据列表中只出现一次
+        evidence_store = EvidenceStore(state.evidences)
         evaluate_current_status_prompt = evaluate_current_status_prompt_template.format(
             retrieved_information=state.latest_tool_result,
-            statuses=state.statuses,
-            evidences=state.evidences,
+            statuses=json.dumps(serialize_statuses_for_llm(state.statuses, evidence_store), ensure_ascii=False),
+            evidences=json.dumps(evidence_store.serialize_for_llm(), ensure_ascii=False),
         )
-        messages = [search_method_prompt, evaluate_current_status_prompt]
+        messages = [self.search_method_prompt, retrieval_step_prompt, evaluate_current_status_prompt]
 
-        response = self.model.invoke(input=messages)
-        self.token_usage += count_tokens(messages + [response])
-        
-        new_status: Status = evaluate_current_status_output_parser.parse(str(response.content))
+        responses: List[BaseMessage]
+        if self.light_model is not None:
+            responses, new_status = ModelCascade(
+                node="evaluate_current_status",
+                light_model=self.light_model,
+                model=self.model,
+                parse=lambda message: evaluate_current_status_strict_output_parser.parse(str(message.content)),
+                escalated_parse=lambda message: evaluate_current_status_output_parser.parse(
+                    str(message.content), llm=self.model
+                ),
+                should_escalate=self._should_escalate_status,
+            ).invoke(messages)
+        else:
+            response = self.model.invoke(input=messages)
+            responses = [response]
+            new_status = evaluate_current_status_output_parser.parse(str(response.content), llm=self.model)
+        # 级联升级时轻量模型的调用同样计入 token 用量
+        self.token_usage += sum(count_tokens(messages + [response]) for response in responses)
         
         updated_state: Dict[str, Any] = {"statuses": [new_status]}
         if new_status.new_evidence:
@@ -210,6 +234,17 @@ class SearchAgentGraph(BaseAgent):
         
         return updated_state
     
+    def _should_escalate_status(self, status: Status):
+        """级联模式下轻量模型给出的状态需要交给配置的模型重新评估的原因"""
+        # 结束检索循环的决定交给配置的模型
+        if status.action == "answer":
+            return "answer"
+        if status.confidence == "low":
+            return "low_confidence"
+        if not isinstance(status.action, dict) or status.action.get("name") not in self.tools_by_name:
+            return "invalid_tool"
+        return None
+
     def tool_node(self, state: SearchAgentState):
         """执行工具调用"""
         # 找到最近的一条 action 消息，提取工具调用信息
@@ -246,18 +281,19 @@ class SearchAgentGraph(BaseAgent):
     
     def generate_answer(self, state: SearchAgentState):
         """生成最终答案"""
+        evidence_store = EvidenceStore(state.evidences)
         generate_answer_prompt = generate_answer_prompt_template.format(
             basic_metadata=state.basic_metadata.serialize_for_llm(),
             content=state.content,
             purpose=state.purpose,
             expected_source=state.expected_source,
-            statuses=state.statuses,
-            evidences=state.evidences,
+            statuses=json.dumps(serialize_statuses_for_llm(state.statuses, evidence_store), ensure_ascii=False),
+            evidences=json.dumps(evidence_store.serialize_for_llm(), ensure_ascii=False),
         )
         messages = [generate_answer_prompt]
 
         response = self.model.invoke(input=messages)
-        answer: SearchResult = generate_answer_output_parser.parse(str(response.content))
+        answer: SearchResult = generate_answer_output_parser.parse(str(response.content), llm=self.model)
 
         # self.token_usage += count_tokens(messages + [response])
         self.token_usage = 0
@@ -8,25 +8,19 @@ from knowledge.source import source_evaluation_prompt
 
 current_time = get_current_time.invoke({"timezone": "UTC"})
 
-evaluate_current_status_output_parser = SafeParse(parser=PydanticOutputParser(pydantic_object=Status))
+# 级联模式下轻量模型的输出无法解析时直接升级到配置的模型，不经过 SafeParse 的修复
+evaluate_current_status_strict_output_parser = PydanticOutputParser(pydantic_object=Status)
+evaluate_current_status_output_parser = SafeParse(parser=evaluate_current_status_strict_output_parser)
+
+# 检索循环中每次调用 evaluate_current_status 的 prompt 按变化频率排列：
+# search_method_prompt 只取决于工具列表，每个 search agent 渲染一次，所有检索步骤的所有调用都以完全相同的内容开头，
+# 其后是检索步骤内不变的 retrieval_step_prompt，最后才是每次调用都不同的检索历史与工具结果，
+# 使 DeepSeek、Qwen、OpenAI 的提示词缓存可以命中前面的部分
 search_method_prompt_template = HumanMessagePromptTemplate.from_template(
     """
-Current time: {current_time}
-
 You are conducting a fact-check on a news story. Use the available tools to fact-check the checkpoint assigned to you.
-
-# News Metadata
-Ensure that the evidence you find is highly consistent with the following news metadata:
-{basic_metadata}
-
-# Checkpoint
-{content}
-
-# Fact-Checking Goal
-{purpose}
-
-# Expected Source Types
-{expected_source}
+The news metadata, the checkpoint, the fact-checking goal and the expected source types are given in the next message.
+Ensure that the evidence you find is highly consistent with the news metadata.
 
 # Available Tools
 {tools_schema}
@@ -65,16 +59,35 @@ The following strategies may improve retrieval efficiency:
 {format_instructions}
 """,
     partial_variables={
-        "current_time": current_time,
         "format_instructions": evaluate_current_status_output_parser.get_format_instructions(),
         "search_engine_advanced_query_usage": search_engine_advanced_query_usage,
         "source_evaluation_prompt": source_evaluation_prompt,
     },
 )
 
+retrieval_step_prompt_template = HumanMessagePromptTemplate.from_template(
+    """
+Current time: {current_time}
+
+# News Metadata
+{basic_metadata}
+
+# Checkpoint
+{content}
+
+# Fact-Checking Goal
+{purpose}
+
+# Expected Source Types
+{expected_source}
+""",
+    partial_variables={"current_time": current_time},
+)
+
 evaluate_current_status_prompt_template = HumanMessagePromptTemplate.from_template(
     template="""
 # Retrieval History:
+Evidence extracted in each step is referenced by `new_evidence_ids`, see Key Evidence below.
 {statuses}
 
 # Result of the Most Recent Tool Call:
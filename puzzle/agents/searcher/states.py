@@ -2,11 +2,15 @@ import operator
 from typing import List, Union, Literal, Optional, Dict, Annotated
 from langchain_core.messages import ToolCall
 from pydantic import BaseModel, Field
+from pydantic.json_schema import SkipJsonSchema
 from ..metadata_extractor.states import BasicMetadata
+from .evidence_store import merge_evidences
 
 
 class Evidence(BaseModel):
     """Supporting or contradicting evidence fragments for the fact-checking goal"""
+    # 加入证据集合时分配的稳定 id，不出现在模型的输出格式中
+    id: SkipJsonSchema[Optional[str]] = None
     content: str = Field(description="The original fragment of evidence highly relevant to the fact-checking goal")
     source: Dict[str, str] = Field(
         description="The source of the evidence",
@@ -31,6 +35,10 @@ class Status(BaseModel):
         default=None
     )
     next_step: str = Field(description="The next step based on the existing information")
+    confidence: Optional[Literal["high", "medium", "low"]] = Field(
+        description="How confident you are that the chosen action is the right next step",
+        default=None
+    )
     action: Union[ToolCall, Literal["answer"]] = Field(
         description="Call tool or answer",
         json_schema_extra={
@@ -63,7 +71,7 @@ class SearchAgentState(BaseModel):
         description="The result of the latest tool call", 
         default=None
     )
-    evidences: Annotated[List[Evidence], operator.add] = Field(
+    evidences: Annotated[List[Evidence], merge_evidences] = Field(
         description="The evidence fragments collected during retrieval, which are important to the fact-checking goal",
         default_factory=list
     )
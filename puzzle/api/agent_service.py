@@ -1,18 +1,104 @@
+import os
 import json
-from typing import cast
+import httpx
+from typing import cast, Any, Callable, Dict, List, Optional, Tuple
 
 from agents.main.graph import MainAgent
+from agents.main.early_stop import create_early_stop_policy_from_env
 from langchain_openai.chat_models.base import BaseChatOpenAI
 from langchain_core.messages import ToolMessage
-from .model import CreateAgentConfig
+from .model import BaseModelConfig, CreateAgentConfig
+from config import MODEL_CONFIGS
 from .events import *
+from .check_point_delta import CheckPointTracker, StreamProtocol
 from agents.searcher.states import SearchAgentState
 from utils.get_env import get_env
+from models import create_model_registry_from_env, create_llm_cache_from_env
+from models.failover import FailoverChatModel
+from agents.checkpointer import open_checkpointer
+from utils.telemetry import TelemetryCallback
+from .metrics import metrics_registry
+
+# ToolEnd.output_str 的最大字符数（网页全文、搜索结果等），0 表示不截断
+TOOL_OUTPUT_MAX_CHARS = int(os.getenv("SSE_TOOL_OUTPUT_MAX_CHARS", "8000"))
+# 截断 JSON 输出时，单个字符串字段保留的最大字符数
+TOOL_OUTPUT_MAX_FIELD_CHARS = 500
+TRUNCATION_MARK = "…"
+
+# 进程内共享的模型实例，相同配置的请求复用同一个实例及其连接池
+model_registry = create_model_registry_from_env()
+# 可选的模型响应缓存，只挂载到 temperature=0 的模型实例上，默认关闭
+llm_cache = create_llm_cache_from_env()
+
 
 def get_model_instance_from_provider(
     provider: str, model: str, temperature: float = 0.0, streaming: bool = True
 ) -> BaseChatOpenAI:
-    """根据模型提供商获取模型，并注入从环境加载的API密钥"""
+    """根据模型提供商获取模型，相同配置复用注册表中的实例"""
+    def factory(http_client: httpx.Client) -> BaseChatOpenAI:
+        instance = create_model_instance(provider, model, temperature, streaming, http_client)
+        if llm_cache is not None and temperature == 0:
+            instance.cache = llm_cache
+        return instance
+
+    return model_registry.get((provider, model, temperature, streaming), factory)
+
+
+def get_fallback_models(role: str) -> List[Tuple[str, str]]:
+    """LLM_FALLBACKS 中为 agent 角色配置的后备模型，按 (provider, model) 返回"""
+    fallbacks = json.loads(os.getenv("LLM_FALLBACKS") or "{}").get(role, [])
+    return [tuple(name.split(":", 1)) for name in fallbacks]  # type: ignore[misc]
+
+
+def get_role_model(role: str, model_config: BaseModelConfig) -> Any:
+    """agent 角色使用的模型，配置了后备模型时包装为按顺序故障转移的模型"""
+    model = get_model_instance_from_provider(
+        model_config.model_provider,
+        model_config.model_name,
+        model_config.temperature,
+        model_config.streaming,
+    )
+    fallbacks = [
+        get_model_instance_from_provider(provider, name, model_config.temperature, model_config.streaming)
+        for provider, name in get_fallback_models(role)
+        if (provider, name) != (model_config.model_provider, model_config.model_name)
+    ]
+    if not fallbacks:
+        return model
+
+    return FailoverChatModel(
+        models=[model, *fallbacks],
+        hedge=os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true",
+        hedge_percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95")),
+        hedge_min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20")),
+        hedge_min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "2")),
+        # 包装后的模型按自身的参数缓存，被包装的模型不再查询缓存
+        cache=model.cache,
+    )
+
+
+def get_light_model_name(provider: str, model: str, agent_type: str) -> Optional[str]:
+    """级联模式使用的轻量模型：同一提供商 light_models 中第一个可用于该 agent 的模型，配置的模型本身是轻量模型时不使用级联"""
+    light_models = MODEL_CONFIGS["providers"].get(provider, {}).get("light_models", [])
+    excluded = MODEL_CONFIGS["agent_restrictions"].get(agent_type, {}).get("excluded", [])
+    if model in light_models:
+        return None
+    return next((name for name in light_models if name not in excluded), None)
+
+
+def create_model_instance(
+    provider: str, 
+    model: str, 
+    temperature: float = 0.0, 
+    streaming: bool = True,
+    http_client: Optional[httpx.Client] = None,
+) -> BaseChatOpenAI:
+    """
+    根据模型提供商创建模型，并注入从环境加载的API密钥
+
+    传入共享的 http_client 时 langchain_openai 不再默认开启 stream_usage，流式调用需要显式开启，
+    否则返回中没有 token 用量（包括 cached_tokens）
+    """
     from models import ChatQwen, ChatGemini
     from langchain_openai import ChatOpenAI
     from langchain_deepseek import ChatDeepSeek
@@ -22,57 +108,228 @@ def get_model_instance_from_provider(
             model=model,
             temperature=temperature,
             streaming=streaming,
+            stream_usage=True,
+            http_client=http_client,
         )
     elif provider == "qwen":
         return ChatQwen(
             model=model,
             temperature=temperature,
             streaming=streaming,
+            stream_usage=True,
+            http_client=http_client,
         )
     elif provider == "deepseek":
         return ChatDeepSeek(
             model=model,
             temperature=temperature,
             streaming=streaming,
+            stream_usage=True,
+            http_client=http_client,
         )
     elif provider == "gemini":
         return ChatGemini(
             model=model,
             temperature=temperature,
             streaming=streaming,
+            stream_usage=True,
+            http_client=http_client,
         )
     elif provider == "openai_third_party":
         return ChatOpenAI(
             model=model,
             temperature=temperature,
             streaming=streaming,
+            stream_usage=True,
             base_url=get_env("OPENAI_BASE_URL_THIRD_PARTY"),
             api_key=get_env("OPENAI_API_KEY_THIRD_PARTY", as_secret_str=True),
+            http_client=http_client,
         )
     else:
         raise ValueError(f"不支持的模型提供商: {provider}")
 
 
-def filter_graph_events(kind: str, name: str, node: str, metadata: dict) -> bool:
-    kind_filter = [
-        "on_chat_model_stream", 
-        "on_chain_stream",
-        "on_parser_start",
-    ]
-    name_filter = [
-        "LangGraph", 
-        "_write", 
-        "ChannelWrite", 
-        "RunnableSequence",
-    ]
+def _tool_start(name: str, data: Dict[str, Any]) -> BaseEvent:
+    tool_input_str = json.dumps(data.get("input", {}), ensure_ascii=False)
+    return ToolStart(
+        data=ToolStartData(
+            tool_name=name,
+            input_str=tool_input_str
+        )
+    )
+
+
+def _shorten_json_strings(value: Any, max_chars: int) -> Any:
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + TRUNCATION_MARK
+    if isinstance(value, list):
+        return [_shorten_json_strings(item, max_chars) for item in value]
+    if isinstance(value, dict):
+        return {k: _shorten_json_strings(v, max_chars) for k, v in value.items()}
+    return value
+
+
+def truncate_tool_output(output: str, max_chars: int = TOOL_OUTPUT_MAX_CHARS) -> str:
+    """
+    截断过长的工具输出
+    
+    - 前端会解析搜索类工具返回的 JSON，因此 JSON 输出只缩短其中的长字符串字段，必要时丢弃末尾的列表项，保证结果仍是合法 JSON
+    - 其他输出（如网页 markdown）直接截断并附上被截掉的字符数
+    """
+    if max_chars <= 0 or len(output) <= max_chars:
+        return output
+
+    try:
+        parsed = json.loads(output)
+    except ValueError:
+        parsed = None
+
+    if isinstance(parsed, (list, dict)):
+        shortened = _shorten_json_strings(parsed, TOOL_OUTPUT_MAX_FIELD_CHARS)
+        shortened_str = json.dumps(shortened, ensure_ascii=False)
+        if isinstance(shortened, list):
+            items: List[Any] = shortened
+            while len(shortened_str) > max_chars and len(items) > 1:
+                items = items[:-1]
+                shortened_str = json.dumps(items, ensure_ascii=False)
+        if len(shortened_str) <= max_chars:
+            return shortened_str
 
-    """过滤掉无关的节点事件"""
-    if kind in kind_filter:
-        return True
-    elif name in name_filter or name.startswith("ChannelWrite"):
-        return True
+    omitted = len(output) - max_chars
+    return f"{output[:max_chars]}{TRUNCATION_MARK}[truncated {omitted} chars]"
 
-    return False
+
+def _tool_end(name: str, data: Dict[str, Any]) -> BaseEvent:
+    output_data = data.get("output")
+    if isinstance(output_data, ToolMessage):
+        tool_output_str = str(output_data.content)
+    elif isinstance(output_data, str):
+        # Ensure we're properly handling the string representation without additional escaping
+        tool_output_str = output_data
+    else:
+        # For non-string output, convert to JSON string with proper unicode handling
+        tool_output_str = json.dumps(output_data, ensure_ascii=False)
+
+    return ToolEnd(
+        data=ToolEndData(
+            tool_name=name,
+            output_str=truncate_tool_output(tool_output_str)
+        )
+    )
+
+
+def _search_agent_start(name: str, data: Dict[str, Any]) -> BaseEvent:
+    input_data = cast(SearchAgentState, data.get("input"))
+    return SearchAgentStart(
+        data=SearchAgentInput(
+            content=input_data.content,
+            purpose=input_data.purpose,
+            expected_source=input_data.expected_source,
+        )
+    )
+
+
+def _write_fact_check_report_end(name: str, data: Dict[str, Any]) -> BaseEvent:
+    result = data.get("output", {})["result"]
+    return WriteFactCheckReportEnd(
+        data=FactCheckResultData(
+            report=result.report, 
+            verdict=result.verdict
+        )
+    )
+
+
+def _evaluate_search_result_end(name: str, data: Dict[str, Any]) -> BaseEvent:
+    output = data.get("output")
+    # 批量复核一次输出多个检索步骤的复核结果
+    if isinstance(output, RetrievalResultVerifications):
+        return EvaluateSearchResultsEnd(data=output)
+    return EvaluateSearchResultEnd(data=cast(RetrievalResultVerification, output))
+
+
+EventBuilder = Callable[[str, Dict[str, Any]], Optional[BaseEvent]]
+
+# (kind, name, node) -> event builder，name / node 为 None 时表示匹配任意值
+# node 为事件所在的顶层 graph 节点（checkpoint_ns 的第一段）
+EVENT_HANDLERS: Dict[Tuple[str, Optional[str], Optional[str]], EventBuilder] = {
+    # check_if_news_text
+    ("on_chain_start", "check_if_news_text", None): 
+        lambda name, data: CheckIfNewsTextStart(),
+    ("on_chain_end", "check_if_news_text", None): 
+        lambda name, data: CheckIfNewsTextEnd(data=data.get("output", {})["is_news_text"]),
+    # invoke_metadata_extract_agent
+    ("on_chain_start", "extract_basic_metadata", "invoke_metadata_extract_agent"): 
+        lambda name, data: ExtractBasicMetadataStart(),
+    ("on_chain_end", "extract_basic_metadata", "invoke_metadata_extract_agent"): 
+        lambda name, data: ExtractBasicMetadataEnd(data=data.get("output", {})["basic_metadata"]),
+    ("on_chain_start", "extract_knowledge", "invoke_metadata_extract_agent"): 
+        lambda name, data: ExtractKnowledgeStart(),
+    ("on_chain_end", "extract_knowledge", "invoke_metadata_extract_agent"): 
+        lambda name, data: ExtractKnowledgeEnd(data=data.get("output", {})["knowledges"]),
+    ("on_chain_start", "retrieve_knowledge", "invoke_metadata_extract_agent"): 
+        lambda name, data: RetrieveKnowledgeStart(),
+    ("on_chain_end", "retrieve_knowledge", "invoke_metadata_extract_agent"): 
+        lambda name, data: RetrieveKnowledgeEnd(data=data.get("output", {})["retrieved_knowledges"][0]),
+    # extract_check_point
+    ("on_chain_start", "extract_check_point", None): 
+        lambda name, data: ExtractCheckPointStart(),
+    ("on_chain_end", "extract_check_point", None): 
+        lambda name, data: ExtractCheckPointEnd(data=data.get("output", {})["check_points"]),
+    # invoke_search_agent
+    ("on_chain_start", "__start__", "invoke_search_agent"): 
+        _search_agent_start,
+    ("on_chain_start", "evaluate_current_status", "invoke_search_agent"): 
+        lambda name, data: EvaluateCurrentStatusStart(),
+    ("on_chain_end", "evaluate_current_status", "invoke_search_agent"): 
+        lambda name, data: EvaluateCurrentStatusEnd(data=data.get("output", {})["statuses"][0]),
+    ("on_chain_start", "generate_answer", "invoke_search_agent"): 
+        lambda name, data: GenerateAnswerStart(),
+    ("on_chain_end", "generate_answer", "invoke_search_agent"): 
+        lambda name, data: GenerateAnswerEnd(data=data.get("output", {})["result"]),
+    ("on_chain_end", "reuse_retrieval_result", "invoke_search_agent"): 
+        lambda name, data: ReuseRetrievalResult(data=data["output"]) if data.get("output") else None,
+    # evaluate_search_result
+    ("on_chain_start", "evaluate_search_result", None): 
+        lambda name, data: EvaluateSearchResultStart(),
+    ("on_parser_end", None, "evaluate_search_result"): 
+        _evaluate_search_result_end,
+    ("on_chain_end", "should_retry_or_continue", None): 
+        lambda name, data: LLMDecision(data=LLMDecisionData(decision=cast(str, data.get("output", {})))),
+    # write_fact_check_report
+    ("on_chain_start", "write_fact_check_report", None): 
+        lambda name, data: WriteFactCheckReportStart(),
+    ("on_custom_event", "write_fact_check_report_delta", "write_fact_check_report"): 
+        lambda name, data: WriteFactCheckReportDelta(data=FactCheckReportDeltaData(**data)),
+    ("on_chain_end", "write_fact_check_report", None): 
+        _write_fact_check_report_end,
+    # tools
+    ("on_tool_start", None, None): 
+        _tool_start,
+    ("on_tool_end", None, None): 
+        _tool_end,
+}
+
+# 会更新核查点的节点，delta 协议下在节点结束时发送增量
+CHECK_POINT_UPDATE_NODES = {"invoke_search_agent", "evaluate_search_result"}
+
+# 只订阅会被映射的事件，其余事件（如 token 级别的 on_chat_model_stream）不会被产生到事件流中
+EVENT_INCLUDE_NAMES = sorted(
+    {name for _, name, _ in EVENT_HANDLERS if name} | CHECK_POINT_UPDATE_NODES
+)
+EVENT_INCLUDE_TYPES = ["tool", "parser"]
+
+
+def map_graph_event(kind: str, name: str, node: str, data: Dict[str, Any]) -> Optional[BaseEvent]:
+    """按 (kind, name, node) 从精确到宽泛查找事件构造函数"""
+    builder = (
+        EVENT_HANDLERS.get((kind, name, node))
+        or EVENT_HANDLERS.get((kind, name, None))
+        or EVENT_HANDLERS.get((kind, None, node))
+        or EVENT_HANDLERS.get((kind, None, None))
+    )
+    if builder is None:
+        return None
+    return builder(name, data)
 
 
 def pretier_print_event(sse_event: BaseEvent):
@@ -80,225 +337,155 @@ def pretier_print_event(sse_event: BaseEvent):
     print(f"data: {sse_event.data}")
     print("-" * 100)
 
+def map_check_points_delta(
+    tracker: CheckPointTracker, kind: str, name: str, node: str, data: Dict[str, Any]
+) -> Optional[BaseEvent]:
+    """delta 协议：核查点快照发出后，只发送后续节点对核查点的改动"""
+    # 只处理顶层节点本身的结束事件（其 checkpoint_ns 为空或就是节点本身），忽略子图内同名的 chain
+    if kind != "on_chain_end" or node not in ("", name):
+        return None
+
+    output = data.get("output")
+    if not isinstance(output, dict) or "check_points" not in output:
+        return None
+
+    if name == "extract_check_point":
+        tracker.snapshot(output["check_points"])
+        return None
+
+    if name in CHECK_POINT_UPDATE_NODES:
+        patches = tracker.diff(output["check_points"])
+        if patches:
+            return CheckPointsDelta(data=patches)
+
+    return None
+
+
 async def run_main_agent(
     news_text: str, 
     config: CreateAgentConfig, 
     thread_id: str,
+    stream_protocol: StreamProtocol = "snapshot",
+    resume: bool = False,
 ):
-    model = get_model_instance_from_provider(
-        config.main_agent.model_provider,
-        config.main_agent.model_name,
-        config.main_agent.temperature,
-        config.main_agent.streaming,
-    )
-    metadata_extractor_model = get_model_instance_from_provider(
-        config.metadata_extractor.model_provider,
-        config.metadata_extractor.model_name,
-        config.metadata_extractor.temperature,
-        config.metadata_extractor.streaming,
-    )
-    searcher_model = get_model_instance_from_provider(
-        config.searcher.model_provider,
-        config.searcher.model_name,
-        config.searcher.temperature,
-        config.searcher.streaming,
-    )
+    """
+    运行 main agent 并将 graph 事件转换为 SSE 帧
+    
+    Args:
+        resume: 从 thread_id 的最新 checkpoint 继续执行，而不是重新开始
+    """
+    async with open_checkpointer() as checkpointer:
+        main_agent = build_main_agent(config, checkpointer)
+        async for frame in stream_agent_events(
+            main_agent, news_text, config, thread_id, stream_protocol, resume
+        ):
+            yield frame
 
-    main_agent = MainAgent(
+
+def build_main_agent(config: CreateAgentConfig, checkpointer: Any = None) -> MainAgent:
+    """根据请求配置创建 main agent，模型实例来自进程内共享的注册表"""
+    model = get_role_model("main_agent", config.main_agent)
+    metadata_extractor_model = get_role_model("metadata_extractor", config.metadata_extractor)
+    searcher_model = get_role_model("searcher", config.searcher)
+
+    # 级联模式下 search agent 先由轻量模型尝试
+    searcher_light_model = None
+    light_model_name = get_light_model_name(
+        config.searcher.model_provider, config.searcher.model_name, "searcher"
+    ) if config.searcher.cascade else None
+    if light_model_name:
+        searcher_light_model = get_model_instance_from_provider(
+            config.searcher.model_provider,
+            light_model_name,
+            config.searcher.temperature,
+            config.searcher.streaming,
+        )
+
+    return MainAgent(
         model=model,
         metadata_extract_model=metadata_extractor_model,
         search_model=searcher_model,
         max_retries=config.main_agent.max_retries,
+        verify_batch_size=config.main_agent.verify_batch_size,
+        early_stop_policy=create_early_stop_policy_from_env() if config.main_agent.early_stop else None,
         max_search_tokens=config.searcher.max_search_tokens,
         selected_tools=config.searcher.selected_tools,
+        search_light_model=searcher_light_model,
+        checkpointer=checkpointer,
     )
 
+
+async def stream_agent_events(
+    main_agent: MainAgent,
+    news_text: str, 
+    config: CreateAgentConfig, 
+    thread_id: str,
+    stream_protocol: StreamProtocol = "snapshot",
+    resume: bool = False,
+):
+    """
+    执行已创建的 main agent，将 graph 事件映射并序列化为 SSE 帧
+
+    离线回放（replay.benchmark）传入使用录制数据的 agent，走与线上相同的事件映射与序列化路径
+    """
+    check_point_tracker = CheckPointTracker() if stream_protocol == "delta" else None
+    telemetry = TelemetryCallback(thread_id)
+    graph_config = {
+        "configurable": {"thread_id": thread_id},
+        "recursion_limit": 75,
+        # 写入 checkpoint 的 metadata，恢复会话时用于重建 agent
+        "metadata": {"agent_config": config.model_dump()},
+        # 回调会传递到子图、模型与工具调用，按节点统计耗时与 token
+        "callbacks": [telemetry],
+    }
+
+    # 没有正常结束或出错时（生成器被关闭），视为会话被中断
+    status = "interrupted"
     try:
+        if resume:
+            # 恢复的会话先发送已有的核查点，客户端不需要收到中断前的事件也能展示已完成的检索
+            snapshot = await main_agent.graph.aget_state(graph_config)
+            check_points = snapshot.values.get("check_points")
+            if check_points:
+                yield encode_event(ExtractCheckPointEnd(data=check_points))
+                if check_point_tracker is not None:
+                    check_point_tracker.snapshot(check_points)
+
         async for event in main_agent.graph.astream_events(
-            input={"news_text": news_text},
-            config={
-                "configurable": {"thread_id": thread_id},
-                "recursion_limit": 75,
-            },
+            # 输入为 None 时 LangGraph 从最新的 checkpoint 继续执行
+            input=None if resume else {"news_text": news_text},
+            config=graph_config,
             version="v2",
+            include_names=EVENT_INCLUDE_NAMES,
+            include_types=EVENT_INCLUDE_TYPES,
         ):
             kind = event.get("event")
-            data = event.get("data")
             name = event.get("name")
             metadata = event.get("metadata", {})
             node = metadata.get("checkpoint_ns", "").split(":")[0]
             
-            if filter_graph_events(kind, name, node, metadata):
-                continue
-
-            if (
-                kind == "on_chain_start"
-                and name == "check_if_news_text"
-            ):
-                yield CheckIfNewsTextStart().model_dump()
-            elif (
-                kind == "on_chain_end"
-                and name == "check_if_news_text"
-            ):
-                is_news_text = data.get("output", {})["is_news_text"]
-                yield CheckIfNewsTextEnd(data=is_news_text).model_dump()
-            elif (
-                kind == "on_chain_start"
-                and node == "invoke_metadata_extract_agent"
-                and name == "extract_basic_metadata"
-            ):
-                yield ExtractBasicMetadataStart().model_dump()
-            elif (
-                kind == "on_chain_end"
-                and node == "invoke_metadata_extract_agent"
-                and name == "extract_basic_metadata"
-            ):
-                basic_metadata = data.get("output", {})["basic_metadata"]
-                yield ExtractBasicMetadataEnd(data=basic_metadata).model_dump()
-            elif (
-                kind == "on_chain_start"
-                and node == "invoke_metadata_extract_agent"
-                and name == "extract_knowledge"
-            ):
-                yield ExtractKnowledgeStart().model_dump()
-            elif (
-                kind == "on_chain_end"
-                and node == "invoke_metadata_extract_agent"
-                and name == "extract_knowledge"
-            ):
-                knowledges = data.get("output", {})["knowledges"]
-                yield ExtractKnowledgeEnd(data=knowledges).model_dump()
-            elif (
-                kind == "on_chain_start"
-                and node == "invoke_metadata_extract_agent"
-                and name == "retrieve_knowledge"
-            ):
-                yield RetrieveKnowledgeStart().model_dump()
-            elif (
-                kind == "on_chain_end"
-                and node == "invoke_metadata_extract_agent"
-                and name == "retrieve_knowledge"
-            ):
-                retrieved_knowledge = data.get("output", {})["retrieved_knowledges"][0]
-                yield RetrieveKnowledgeEnd(data=retrieved_knowledge).model_dump()
-            elif (
-                kind == "on_chain_start"
-                and name == "extract_check_point"
-            ):
-                yield ExtractCheckPointStart().model_dump()
-            elif (
-                kind == "on_chain_end"
-                and name == "extract_check_point"
-            ):
-                check_points = data.get("output", {})["check_points"]
-                yield ExtractCheckPointEnd(data=check_points).model_dump()
-            elif (
-                kind == "on_chain_start"
-                and name == "__start__"
-                and node == "invoke_search_agent"
-            ):
-                input_data = cast(SearchAgentState, data.get("input"))
-                yield SearchAgentStart(
-                    data=SearchAgentInput(
-                        content=input_data.content,
-                        purpose=input_data.purpose,
-                        expected_source=input_data.expected_source,
-                    )
-                ).model_dump()
-            elif (
-                kind == "on_chain_start"
-                and name == "evaluate_current_status"
-                and node == "invoke_search_agent"
-            ):
-                yield EvaluateCurrentStatusStart().model_dump()
-            elif (
-                kind == "on_chain_end"
-                and name == "evaluate_current_status"
-                and node == "invoke_search_agent"
-            ):
-                status = data.get("output", {})["statuses"][0]
-                yield EvaluateCurrentStatusEnd(data=status).model_dump()
-            elif (
-                kind == "on_chain_start"
-                and name == "generate_answer"
-                and node == "invoke_search_agent"
-            ):
-                yield GenerateAnswerStart().model_dump()
-            elif (
-                kind == "on_chain_end"
-                and name == "generate_answer"
-                and node == "invoke_search_agent"
-            ):
-                search_result = data.get("output", {})["result"]
-                yield GenerateAnswerEnd(data=search_result).model_dump()
-            elif (
-                kind == "on_chain_start"
-                and name == "evaluate_search_result"
-            ):
-                yield EvaluateSearchResultStart().model_dump()
-            elif (
-                kind == "on_parser_end"
-                and node == "evaluate_search_result"
-            ):
-                verification = cast(RetrievalResultVerification, data.get("output"))
-                yield EvaluateSearchResultEnd(data=verification).model_dump()
-            elif (
-                kind == "on_chain_end"
-                and name == "should_retry_or_continue"
-            ):
-                decision = cast(str, data.get("output", {}))
-                yield LLMDecision(data=LLMDecisionData(decision=decision)).model_dump()
-            elif (
-                kind == "on_chain_start"
-                and name == "write_fact_check_report"
-            ):
-                yield WriteFactCheckReportStart().model_dump()
-            elif (
-                kind == "on_chain_end"
-                and name == "write_fact_check_report"
-            ):
-                result = data.get("output", {})["result"]
-                yield WriteFactCheckReportEnd(
-                    data=FactCheckResultData(
-                        report=result.report, 
-                        verdict=result.verdict
-                    )
-                ).model_dump()
-            elif (
-                kind == "on_tool_start"
-            ):
-                tool_name = name
-                tool_input_str = json.dumps(data.get("input", {}), ensure_ascii=False)
-                yield ToolStart(
-                    data=ToolStartData(
-                        tool_name=tool_name,
-                        input_str=tool_input_str
-                    )
-                ).model_dump()
-            elif (
-                kind == "on_tool_end"
-            ):
-                tool_name = name
-                tool_output_str = None
-                if isinstance(data.get("output"), ToolMessage):
-                    tool_output_str = str(cast(ToolMessage, data.get("output")).content)
-                else:
-                    # Ensure we're properly handling the string representation without additional escaping
-                    output_data = data.get("output")
-                    if isinstance(output_data, str):
-                        tool_output_str = output_data
-                    else:
-                        # For non-string output, convert to JSON string with proper unicode handling
-                        tool_output_str = json.dumps(output_data, ensure_ascii=False)
-                    
-                yield ToolEnd(
-                    data=ToolEndData(
-                        tool_name=tool_name,
-                        output_str=tool_output_str
-                    )
-                ).model_dump()
+            sse_event = map_graph_event(kind, name, node, event.get("data", {}))
+            if sse_event is not None:
+                # 在 agent 线程中一次性序列化为 SSE 帧，之后的广播、缓存与回放都复用该帧
+                yield encode_event(sse_event)
+
+            if check_point_tracker is not None:
+                delta_event = map_check_points_delta(
+                    check_point_tracker, kind, name, node, event.get("data", {})
+                )
+                if delta_event is not None:
+                    yield encode_event(delta_event)
+        
+        status = "completed"
             
     except Exception as e:
+        status = "error"
         error_message = f"Error running agent: {str(e)}"
-        yield Error(data=ErrorData(message=error_message)).model_dump()
+        yield encode_event(Error(data=ErrorData(message=error_message)))
+    
+    finally:
+        telemetry.finish()
+        metrics_registry.record_session(telemetry, status)
+    
+    yield encode_event(SessionSummary(data=telemetry.summary()))
     
@@ -1,14 +1,24 @@
 import os
 from api import logger
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_talisman import Talisman
 from pydantic import ValidationError
 import threading
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-from .service import start_agent, get_session, interrupt_session, read_session_state
-from .model import FactCheckRequest
+from .service import (
+    start_agent, 
+    resume_agent, 
+    get_session, 
+    interrupt_session, 
+    read_session_state, 
+    SessionNotResumableException,
+)
+from .scheduler import QueueFullException
+from .model import FactCheckRequest, BatchFactCheckRequest
+from .batch import BatchRun, iter_ndjson
+from .metrics import metrics_registry
 
 app = Flask(__name__)
 
@@ -72,10 +82,13 @@ def create_and_run_agent():
         # 使用 Pydantic 模型验证请求
         fact_check_request = FactCheckRequest(**data)
         
-        # 启动 Agent 并获取会话 ID
+        # 启动 Agent 并获取会话 ID，客户端标识用于排队时的公平调度
+        client_id = request.headers.get("X-Client-Id") or request.remote_addr or "anonymous"
         session_id = start_agent(
             fact_check_request.news_text,
-            fact_check_request.config
+            fact_check_request.config,
+            client_id=client_id,
+            stream_protocol=fact_check_request.stream_protocol,
         )
         
         # 返回会话 ID 给客户端
@@ -89,11 +102,83 @@ def create_and_run_agent():
         logger.error(f"验证错误: {e}")
         return jsonify({"error": str(e)}), 400
     
+    except QueueFullException as e:
+        # 等待队列已满，提示客户端稍后重试
+        logger.warning(f"核查请求被拒绝: {e.message}")
+        response = jsonify({"error": e.message, "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+    
     except Exception as e:
         # 处理其他错误
         logger.error(f"启动核查错误: {e}")
         return jsonify({"error": f"启动核查失败: {str(e)}"}), 500
 
+@app.route('/api/agents/<session_id>/resume', methods=['POST'])
+def resume_fact_check(session_id):
+    """
+    从最后完成的节点恢复被中断或因 worker 重启而丢失的核查
+    恢复后的会话沿用原会话 ID，客户端重新订阅 /api/agents/<session_id>/events 即可
+    """
+    data = request.get_json(silent=True) or {}
+    stream_protocol = data.get("stream_protocol", "snapshot")
+    if stream_protocol not in ("snapshot", "delta"):
+        return jsonify({"error": f"不支持的 stream_protocol: {stream_protocol}"}), 400
+    
+    try:
+        client_id = request.headers.get("X-Client-Id") or request.remote_addr or "anonymous"
+        resume_agent(session_id, client_id=client_id, stream_protocol=stream_protocol)
+        return jsonify({
+            "session_id": session_id,
+            "message": "核查已恢复"
+        })
+    
+    except SessionNotResumableException as e:
+        logger.warning(f"恢复核查失败: {e.message}")
+        return jsonify({"error": e.message}), e.status_code
+    
+    except QueueFullException as e:
+        logger.warning(f"恢复核查请求被拒绝: {e.message}")
+        response = jsonify({"error": e.message, "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+    
+    except Exception as e:
+        logger.error(f"恢复核查错误: {e}")
+        return jsonify({"error": f"恢复核查失败: {str(e)}"}), 500
+
+@app.route('/api/batch-fact-check', methods=['POST'])
+def batch_fact_check():
+    """
+    批量核查接口，所有新闻共用同一份配置
+    结果按完成顺序以 NDJSON 流式返回，每行对应一条新闻
+    """
+    try:
+        data = request.json
+        if not data:
+            return jsonify({"error": "Missing request data"}), 400
+        
+        batch_request = BatchFactCheckRequest(**data)
+        batch_run = BatchRun(
+            batch_request.news_texts,
+            batch_request.config,
+            max_concurrency=batch_request.max_concurrency,
+        )
+    except (ValidationError, ValueError) as e:
+        logger.error(f"批量核查验证错误: {e}")
+        return jsonify({"error": str(e)}), 400
+    
+    logger.info(f"批量核查已开始: batch_id={batch_run.batch_id}, 共 {len(batch_run.news_texts)} 条")
+    return Response(
+        stream_with_context(iter_ndjson(batch_run)),
+        mimetype='application/x-ndjson',
+        headers={
+            'Cache-Control': 'no-cache, no-transform',
+            'X-Accel-Buffering': 'no',
+            'X-Batch-Id': batch_run.batch_id,
+        }
+    )
+
 @app.route('/api/agents/<session_id>/events', methods=['GET'])
 def get_agent_events(session_id):
     """
@@ -158,6 +243,14 @@ def interrupt_agent(session_id):
         logger.error(f"中断请求处理异常: {e}")
         return jsonify({"error": f"中断请求处理异常: {str(e)}"}), 500
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus 指标：各节点耗时与 token 统计、调度队列、结果缓存与 checkpoint 内存占用
+    多 worker 部署时每个 worker 分别统计各自处理的会话
+    """
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', '8000'))
     app.run(
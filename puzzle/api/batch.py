@@ -0,0 +1,306 @@
+"""
+批量核查
+
+一次提交多条新闻文本，共用同一份 agent 配置：
+- 所有任务都经过同一个调度器（AgentScheduler），和网页端请求一起受全局并发上限与公平出队约束
+- 每个批次再有自己的并发上限，避免一个批次占满整个等待队列
+- 规范化后相同的文本只运行一次；已有缓存或正在运行的相同任务直接复用
+- 结果按完成顺序以 NDJSON 逐行返回，或由命令行写入结果文件
+
+命令行用法:
+    python -m api.batch news.txt --config config.json --output results.ndjson
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from queue import Queue
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Union
+
+from pydantic import BaseModel
+
+from api import logger
+from .model import CreateAgentConfig
+from .events import BaseEvent, SSEFrame, encode_event, decode_frame_data
+from .result_cache import CachedRun, InFlightRun, make_cache_key
+from .scheduler import QueueFullException
+from . import service
+
+
+# 单个批次同时运行的核查任务数上限
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "3"))
+# 单个批次最多包含的新闻条数
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    news_text: str
+    status: Literal["completed", "error"]
+    verdict: Optional[str] = None
+    report: Optional[str] = None
+    error: Optional[str] = None
+    # 结果来自结果缓存
+    cached: bool = False
+    # 与批次中更早的相同文本共用了同一次核查，值为该文本的序号
+    duplicate_of: Optional[int] = None
+    duration: float = 0
+
+
+class _RunCollector:
+    """
+    挂载到 InFlightRun 上的订阅者，代替 SSESession 收集单次核查的最终结果
+
+    与 SSESession 一样提供 add_event / close / is_queued / is_interrupted
+    """
+
+    def __init__(self, on_done: Callable[["_RunCollector"], None]):
+        self.is_queued = False
+        self.is_interrupted = False
+        self.verdict: Optional[str] = None
+        self.report: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+        self._on_done = on_done
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def add_event(self, event_data: Union[BaseEvent, Dict[str, Any], SSEFrame]) -> None:
+        frame = encode_event(event_data)
+        if frame.event == "write_fact_check_report_end":
+            data = decode_frame_data(frame) or {}
+            self.verdict = data.get("verdict")
+            self.report = data.get("report")
+        elif frame.event == "error" and self.error is None:
+            data = decode_frame_data(frame) or {}
+            self.error = data.get("message", "Unknown error")
+
+    @property
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._on_done(self)
+
+
+class BatchRun:
+    """
+    一个批次的核查任务
+
+    Args:
+        news_texts: 新闻文本列表
+        config: 共用的 agent 配置
+        max_concurrency: 该批次同时运行的任务数，不超过 BATCH_MAX_CONCURRENCY
+    """
+
+    def __init__(
+        self,
+        news_texts: List[str],
+        config: CreateAgentConfig,
+        max_concurrency: Optional[int] = None,
+    ):
+        if len(news_texts) > BATCH_MAX_ITEMS:
+            raise ValueError(f"A batch can contain at most {BATCH_MAX_ITEMS} news texts")
+
+        self.batch_id = str(uuid.uuid4())
+        self.news_texts = news_texts
+        self.config = config
+        self.max_concurrency = min(max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+
+        # key -> 该文本在批次中出现的所有序号，规范化后相同的文本只核查一次
+        self._groups: "OrderedDict[str, List[int]]" = OrderedDict()
+        for index, news_text in enumerate(news_texts):
+            key = make_cache_key(news_text, config, stream_protocol="snapshot")
+            self._groups.setdefault(key, []).append(index)
+
+        self._slots = threading.Semaphore(self.max_concurrency)
+        self._results: "Queue[BatchItemResult]" = Queue()
+        self._collectors: Dict[str, _RunCollector] = {}
+        self._flights: Dict[str, InFlightRun] = {}
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def client_id(self) -> str:
+        return f"batch:{self.batch_id}"
+
+    def results(self) -> Iterator[BatchItemResult]:
+        """启动批次并按完成顺序返回每一条新闻的结果"""
+        driver = threading.Thread(target=self._drive, name=f"batch-{self.batch_id[:8]}", daemon=True)
+        driver.start()
+
+        try:
+            for _ in range(len(self.news_texts)):
+                yield self._results.get()
+        finally:
+            # 调用方提前停止迭代（例如客户端断开）时不再提交剩余任务
+            self.cancel()
+
+    def cancel(self) -> None:
+        """停止提交新的任务，并从已挂载的核查任务上卸载；没有其他订阅者的任务随之被放弃"""
+        self._cancelled.set()
+        with self._lock:
+            pending = [(key, c) for key, c in self._collectors.items() if not c.is_closed]
+        for key, collector in pending:
+            collector.is_interrupted = True
+            flight = self._flights.get(key)
+            if flight and flight.detach(collector) == 0 and flight.is_queued:
+                service.scheduler.cancel(flight.job_id)
+
+    # internals
+    def _drive(self) -> None:
+        for key, indexes in self._groups.items():
+            self._slots.acquire()
+            if self._cancelled.is_set():
+                return
+            try:
+                self._start(key, indexes)
+            except Exception as e:
+                logger.error(f"Batch {self.batch_id} failed to start item {indexes[0]}: {e}")
+                self._finish(indexes, error=str(e), started_at=time.time())
+
+    def _start(self, key: str, indexes: List[int]) -> None:
+        collector = _RunCollector(on_done=lambda c: self._on_collector_done(indexes, c))
+
+        cached_run: Optional[CachedRun] = service.result_cache.get(key)
+        if cached_run is not None:
+            for frame in cached_run.events:
+                collector.add_event(frame)
+            self._finish(indexes, collector=collector, cached=True)
+            return
+
+        job_id = f"batch-{self.batch_id}-{indexes[0]}"
+        flight, is_new_run = service.in_flight_runs.get_or_create(key, job_id=job_id, subscriber=collector)
+        with self._lock:
+            self._collectors[key] = collector
+            self._flights[key] = flight
+
+        if not is_new_run:
+            logger.info(f"Batch {self.batch_id} item {indexes[0]} attached to in-flight run {flight.job_id}")
+            return
+
+        flight.set_queued(True)
+        news_text = self.news_texts[indexes[0]]
+        while not self._cancelled.is_set():
+            try:
+                service.scheduler.submit(
+                    job_id, self.client_id, self._run,
+                    news_text, self.config, job_id, flight, collector,
+                )
+                return
+            except QueueFullException as e:
+                # 批次任务不会返回 429，而是等待队列空出位置
+                time.sleep(min(e.retry_after, 5))
+
+        service.in_flight_runs.remove(flight)
+        collector.close()
+
+    @staticmethod
+    def _run(
+        news_text: str,
+        config: CreateAgentConfig,
+        job_id: str,
+        flight: InFlightRun,
+        collector: _RunCollector,
+    ) -> None:
+        try:
+            service.run_agent_thread(news_text, config, job_id, flight)
+        finally:
+            # run_agent_thread 在任务被放弃或取消时不会关闭订阅者
+            collector.close()
+
+    def _on_collector_done(self, indexes: List[int], collector: _RunCollector) -> None:
+        self._finish(indexes, collector=collector)
+
+    def _finish(
+        self,
+        indexes: List[int],
+        collector: Optional[_RunCollector] = None,
+        cached: bool = False,
+        error: Optional[str] = None,
+        started_at: Optional[float] = None,
+    ) -> None:
+        if collector is not None:
+            error = collector.error
+            if error is None and collector.report is None:
+                error = "Fact check was interrupted before the report was written"
+            started_at = collector.started_at
+
+        duration = round(time.time() - (started_at or time.time()), 2)
+        for position, index in enumerate(indexes):
+            self._results.put(BatchItemResult(
+                index=index,
+                news_text=self.news_texts[index],
+                status="error" if error else "completed",
+                verdict=collector.verdict if collector and not error else None,
+                report=collector.report if collector and not error else None,
+                error=error,
+                cached=cached,
+                duplicate_of=indexes[0] if position > 0 else None,
+                duration=duration,
+            ))
+
+        self._slots.release()
+
+
+def iter_ndjson(batch_run: BatchRun) -> Iterator[str]:
+    """将批次结果编码为 NDJSON 行"""
+    for result in batch_run.results():
+        yield result.model_dump_json() + "\n"
+
+
+def _read_news_texts(path: str) -> List[str]:
+    """读取输入文件：每行一条新闻文本，或每行一个带 news_text 字段的 JSON 对象"""
+    news_texts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                news_texts.append(json.loads(line)["news_text"])
+            else:
+                news_texts.append(line)
+    return news_texts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量核查新闻文本，结果以 NDJSON 输出")
+    parser.add_argument("input", help="输入文件：每行一条新闻文本，或每行一个 {\"news_text\": ...} JSON 对象")
+    parser.add_argument("--config", required=True, help="CreateAgentConfig 的 JSON 文件")
+    parser.add_argument("--output", help="结果文件（NDJSON），默认输出到标准输出")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="同时运行的核查任务数")
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = CreateAgentConfig(**json.load(f))
+
+    batch_run = BatchRun(_read_news_texts(args.input), config, max_concurrency=args.max_concurrency)
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failed = 0
+    try:
+        for result in batch_run.results():
+            output.write(result.model_dump_json() + "\n")
+            output.flush()
+            if result.status == "error":
+                failed += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    logger.info(f"Batch {batch_run.batch_id} finished: {len(batch_run.news_texts)} items, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+核查点增量编码
+
+extract_check_point 结束时客户端已经收到完整的核查点列表（快照），
+之后 invoke_search_agent / evaluate_search_result 每次都会返回带有全部检索结果和证据的完整列表。
+delta 协议下只发送相对上一次发送内容发生变化的检索步骤字段，以 check_point_id + retrieval_step_id 定位，
+发送的数据量和序列化开销只与变化量相关，而与整个核查过程累积的数据量无关。
+"""
+
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel
+
+from agents.main.states import CheckPoint
+
+
+StreamProtocol = Literal["snapshot", "delta"]
+
+# 会被检索、复核节点和提前结束策略更新的检索步骤字段
+TRACKED_STEP_FIELDS = ("purpose", "expected_source", "result", "verification", "skipped")
+
+
+class CheckPointPatch(BaseModel):
+    op: Literal["add", "replace"]
+    check_point_id: str
+    retrieval_step_id: str
+    # 被替换的检索步骤字段；op 为 add 时为 None，value 为完整的检索步骤
+    path: Optional[str] = None
+    value: Any = None
+
+
+class CheckPointTracker:
+    """
+    记录已发送给客户端的检索步骤字段，用于计算增量
+
+    节点会原地修改检索步骤（setattr），因此这里保存的是各字段值的浅拷贝而非步骤对象本身；
+    更新时字段会被赋值为新的对象，先比较对象身份，只有身份不同时才做值比较
+    """
+
+    def __init__(self):
+        self._steps: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def snapshot(self, check_points: List[CheckPoint]) -> None:
+        """记录客户端已收到的完整快照"""
+        self._steps = {
+            (check_point.id, step.id): self._fields(step)
+            for check_point in check_points
+            for step in check_point.retrieval_step or []
+        }
+
+    def diff(self, check_points: List[CheckPoint]) -> List[CheckPointPatch]:
+        """计算相对上一次发送内容的增量，并将其记为已发送"""
+        patches: List[CheckPointPatch] = []
+
+        for check_point in check_points:
+            for step in check_point.retrieval_step or []:
+                key = (check_point.id, step.id)
+                fields = self._fields(step)
+                sent = self._steps.get(key)
+                self._steps[key] = fields
+
+                if sent is None:
+                    patches.append(CheckPointPatch(
+                        op="add",
+                        check_point_id=check_point.id,
+                        retrieval_step_id=step.id,
+                        value=step.model_copy(),
+                    ))
+                    continue
+
+                for field_name, value in fields.items():
+                    sent_value = sent[field_name]
+                    if value is sent_value or value == sent_value:
+                        continue
+                    patches.append(CheckPointPatch(
+                        op="replace",
+                        check_point_id=check_point.id,
+                        retrieval_step_id=step.id,
+                        path=field_name,
+                        value=value,
+                    ))
+
+        return patches
+
+    @staticmethod
+    def _fields(step: Any) -> Dict[str, Any]:
+        return {field_name: getattr(step, field_name) for field_name in TRACKED_STEP_FIELDS}
@@ -4,11 +4,15 @@ Agent SSE Event Models
 
 import re
 from pydantic import BaseModel
-from agents.main.states import CheckPoint, RetrievalResultVerification, IsNewsText, Result
+from pydantic_core import from_json, to_json
+from agents.main.states import CheckPoint, RetrievalResultVerification, RetrievalResultVerifications, IsNewsText, Result
+from agents.main.claim_index import ClaimMatch
 from agents.metadata_extractor.states import BasicMetadata, Knowledge
 from agents.searcher.states import Status, SearchResult
+from .check_point_delta import CheckPointPatch
+from utils.telemetry import SessionMetrics
 
-from typing import Optional, Any, List
+from typing import Optional, Any, Dict, List, NamedTuple, Union
 
 
 def convert_name_to_event(name: str) -> str:
@@ -33,10 +37,53 @@ class BaseEvent(BaseModel):
         super().__init__(**data)
 
 
+class SSEFrame(NamedTuple):
+    """
+    已序列化的 SSE 帧
+    
+    事件在产生时只序列化一次，广播给多个会话、写入缓存和回放时都直接复用帧文本
+    """
+    event: str
+    message: str
+
+
+def encode_event(event: Union[BaseEvent, Dict[str, Any], SSEFrame]) -> SSEFrame:
+    """将事件序列化为 SSE 帧，已经是帧时原样返回"""
+    if isinstance(event, SSEFrame):
+        return event
+
+    if isinstance(event, BaseEvent):
+        event_type, data = event.event, event.data
+    else:
+        event_type, data = event.get("event"), event.get("data")
+
+    # pydantic_core 直接输出 UTF-8 JSON，不需要先 model_dump 成 dict 再 json.dumps
+    data_json = to_json(data).decode("utf-8") if data is not None else "{}"
+    return SSEFrame(
+        event=str(event_type),
+        message=f"event: {event_type}\ndata: {data_json}\n\n",
+    )
+
+
+def decode_frame_data(frame: SSEFrame) -> Any:
+    """从 SSE 帧中解析出事件数据"""
+    _, _, data_json = frame.message.partition("\ndata: ")
+    return from_json(data_json.strip()) if data_json.strip() else None
+
+
 class OnAgentStart(BaseEvent):
     data: None = None
 
 
+class QueuedData(BaseModel):
+    position: int
+    eta_seconds: Optional[float] = None
+
+
+class Queued(BaseEvent):
+    data: QueuedData
+
+
 # check_if_news_text
 class CheckIfNewsTextStart(BaseEvent):
     data: None = None
@@ -79,6 +126,11 @@ class ExtractCheckPointEnd(BaseEvent):
     data: List[CheckPoint]
 
 
+# delta 协议下，检索和复核节点更新核查点后发送的增量
+class CheckPointsDelta(BaseEvent):
+    data: List[CheckPointPatch]
+
+
 # invoke_search_agent
 class SearchAgentInput(BaseModel):
     content: str
@@ -106,6 +158,11 @@ class GenerateAnswerEnd(BaseEvent):
     data: SearchResult
 
 
+class ReuseRetrievalResult(BaseEvent):
+    """复用了核查点索引中已核查的结论，本次检索任务不运行 search agent"""
+    data: ClaimMatch
+
+
 class EvaluateSearchResultStart(BaseEvent):
     data: None = None
 
@@ -114,6 +171,11 @@ class EvaluateSearchResultEnd(BaseEvent):
     data: RetrievalResultVerification
 
 
+class EvaluateSearchResultsEnd(BaseEvent):
+    """批量复核多个检索步骤的结果"""
+    data: RetrievalResultVerifications
+
+
 class LLMDecisionData(BaseModel):
     decision: str
 
@@ -131,6 +193,17 @@ class FactCheckResultData(BaseModel):
     verdict: str
 
 
+class FactCheckReportDeltaData(BaseModel):
+    delta: str = ""
+    # verdict 解析出后只随一个增量发送一次
+    verdict: Optional[str] = None
+
+
+class WriteFactCheckReportDelta(BaseEvent):
+    """流式生成报告时 report 字段的增量"""
+    data: FactCheckReportDeltaData
+
+
 class WriteFactCheckReportEnd(BaseEvent):
     data: FactCheckResultData
 
@@ -157,6 +230,11 @@ class TaskComplete(BaseEvent):
     data: None = None
 
 
+# 会话结束时发送的各节点耗时与 token 统计
+class SessionSummary(BaseEvent):
+    data: SessionMetrics
+
+
 class InterruptData(BaseModel):
     message: str
 
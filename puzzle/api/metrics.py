@@ -0,0 +1,127 @@
+"""
+进程级的运行指标，通过 /metrics 以 Prometheus 文本格式导出
+
+- 每个会话结束时汇总该会话各节点的耗时与 token 统计（见 utils.telemetry）
+- 其他模块通过 register_stats 注册返回数值字典的 stats 函数，导出为 gauge
+"""
+
+import os
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Mapping, Tuple
+
+from utils.telemetry import NodeTotals, TelemetryCallback
+
+
+METRIC_PREFIX = "puzzle"
+
+# (指标名, 类型, 说明, NodeTotals 字段)
+NODE_METRICS: List[Tuple[str, str, str, str]] = [
+    ("node_calls_total", "counter", "Node executions", "calls"),
+    ("node_seconds_total", "counter", "Wall time spent in node", "wall_time"),
+    ("llm_calls_total", "counter", "LLM calls made from node", "llm_calls"),
+    ("llm_seconds_total", "counter", "Time spent waiting for LLM responses", "llm_time"),
+    ("llm_ttft_seconds_sum", "counter", "Sum of LLM time-to-first-token of streamed calls", "ttft_sum"),
+    ("llm_ttft_seconds_count", "counter", "Number of streamed LLM calls", "ttft_count"),
+    ("tool_calls_total", "counter", "Tool calls made from node", "tool_calls"),
+    ("tool_seconds_total", "counter", "Time spent in tool calls", "tool_time"),
+    ("llm_input_tokens_total", "counter", "LLM input tokens", "input_tokens"),
+    ("llm_output_tokens_total", "counter", "LLM output tokens", "output_tokens"),
+    ("llm_cached_tokens_total", "counter", "LLM input tokens served from the provider prompt cache", "cached_tokens"),
+    ("llm_cache_hits_total", "counter", "LLM calls with prompt cache hits", "cache_hits"),
+    ("llm_response_cache_hits_total", "counter", "LLM calls served from the local response cache", "llm_cache_hits"),
+]
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, int] = defaultdict(int)
+        self._session_seconds = 0.0
+        self._nodes: Dict[str, NodeTotals] = {}
+        self._stats: Dict[str, Callable[[], Mapping[str, object]]] = {}
+
+    def record_session(self, telemetry: TelemetryCallback, status: str) -> None:
+        """
+        汇总一个已结束会话的统计
+
+        Args:
+            status: completed / error / interrupted
+        """
+        node_totals = telemetry.node_totals()
+        wall_time = (telemetry.finished_at or telemetry.started_at) - telemetry.started_at
+
+        with self._lock:
+            self._sessions[status] += 1
+            self._session_seconds += wall_time
+            for node, totals in node_totals.items():
+                self._nodes.setdefault(node, NodeTotals()).merge(totals)
+
+    def register_stats(self, name: str, stats: Callable[[], Mapping[str, object]]) -> None:
+        """注册一组 gauge，导出为 puzzle_<name>_<key>，只导出数值"""
+        with self._lock:
+            self._stats[name] = stats
+
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        with self._lock:
+            sessions = dict(self._sessions)
+            session_seconds = self._session_seconds
+            nodes = {node: NodeTotals(**vars(totals)) for node, totals in self._nodes.items()}
+            stats = dict(self._stats)
+
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]) -> None:
+            full_name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for labels, value in samples:
+                if isinstance(value, float):
+                    value = round(value, 6)
+                lines.append(f"{full_name}{labels} {value}")
+
+        metric("sessions_total", "counter", "Finished fact-check sessions", [
+            (f'{{status="{_escape_label(status)}"}}', count) for status, count in sorted(sessions.items())
+        ])
+        metric("session_seconds_total", "counter", "Wall time of finished sessions", [("", session_seconds)])
+
+        for name, kind, help_text, field_name in NODE_METRICS:
+            metric(name, kind, help_text, [
+                (f'{{node="{_escape_label(node)}"}}', getattr(totals, field_name))
+                for node, totals in sorted(nodes.items())
+            ])
+
+        for stats_name, stats_fn in sorted(stats.items()):
+            try:
+                values = stats_fn()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric(f"{stats_name}_{key}", "gauge", f"{stats_name} {key}", [("", value)])
+
+        return "\n".join(lines) + "\n"
+
+
+def process_stats() -> Dict[str, float]:
+    """当前进程的常驻内存（Linux 读取 /proc，其他平台为峰值常驻内存）"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return {"resident_memory_bytes": resident_pages * os.sysconf("SC_PAGE_SIZE")}
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS 的单位为字节，Linux 为 KB
+        return {"resident_memory_bytes": max_rss if sys.platform == "darwin" else max_rss * 1024}
+
+
+metrics_registry = MetricsRegistry()
+metrics_registry.register_stats("process", process_stats)
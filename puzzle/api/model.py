@@ -1,5 +1,7 @@
+from typing import List, Optional
 from pydantic import BaseModel, Field, field_validator
 from config import MODEL_CONFIGS
+from .check_point_delta import StreamProtocol
 
 
 class BaseModelConfig(BaseModel):
@@ -11,6 +13,8 @@ class BaseModelConfig(BaseModel):
 
 class MainAgentConfig(BaseModelConfig):
     max_retries: int = Field(ge=0, le=10, description="最大重试次数")
+    verify_batch_size: int = Field(default=1, ge=1, le=10, description="一次复核的检索步骤数，1 表示逐个复核")
+    early_stop: bool = Field(default=False, description="结论已经确定时是否跳过剩余的中、低优先级检索步骤")
 
 
 class MetadataExtractorConfig(BaseModelConfig):
@@ -20,6 +24,7 @@ class MetadataExtractorConfig(BaseModelConfig):
 class SearcherConfig(BaseModelConfig):
     max_search_tokens: int = Field(ge=5000, lt=50000, description="最大搜索token数")
     selected_tools: list[str] = Field(..., description="选中的工具")
+    cascade: bool = Field(default=False, description="是否先由同一提供商的轻量模型尝试，低置信度时升级到配置的模型")
 
 
 class CreateAgentConfig(BaseModel):
@@ -64,3 +69,17 @@ class FactCheckRequest(BaseModel):
     config: CreateAgentConfig = Field(
         description="Optional configuration for the agent"
     )
+    stream_protocol: StreamProtocol = Field(
+        default="snapshot",
+        description="snapshot: 只发送核查点快照; delta: 快照之后以增量形式发送核查点的更新",
+    )
+
+
+class BatchFactCheckRequest(BaseModel):
+    news_texts: List[str] = Field(..., min_length=1, description="待核查的新闻文本列表")
+    config: CreateAgentConfig = Field(description="所有新闻共用的 agent 配置")
+    max_concurrency: Optional[int] = Field(
+        default=None, 
+        ge=1, 
+        description="该批次同时运行的核查任务数，不超过 BATCH_MAX_CONCURRENCY",
+    )
@@ -0,0 +1,252 @@
+"""
+核查结果缓存与相同请求合并（singleflight）
+
+- ResultCache: 以规范化后的新闻文本 + 相关配置为 key，缓存已完成核查的完整事件记录，
+  之后相同的请求直接回放，不再运行 agent
+- InFlightRun: 正在运行的核查任务，相同请求到达时挂载到已有任务上，
+  共享同一个事件流，而不是重新运行一遍完整的多 agent 流程
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union, TYPE_CHECKING
+
+from api import logger
+from .model import CreateAgentConfig
+from .events import BaseEvent, SSEFrame, encode_event
+
+if TYPE_CHECKING:
+    from .service import SSESession
+
+
+# 不影响核查结果的配置项，不参与 key 的计算
+IGNORED_CONFIG_FIELDS = {"streaming"}
+
+# 不写入事件记录的事件类型（与单次连接相关，回放时没有意义）
+TRANSIENT_EVENTS = {"queued", "heartbeat", "stream_closed"}
+
+
+def normalize_news_text(news_text: str) -> str:
+    """统一全半角、去除首尾空白并合并连续空白"""
+    text = unicodedata.normalize("NFKC", news_text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_cache_key(news_text: str, config: CreateAgentConfig, **extra: Any) -> str:
+    """根据规范化后的新闻文本和影响结果的配置生成 key"""
+    config_dict = config.model_dump()
+    for agent_config in config_dict.values():
+        if not isinstance(agent_config, dict):
+            continue
+        for field_name in IGNORED_CONFIG_FIELDS:
+            agent_config.pop(field_name, None)
+        if "selected_tools" in agent_config:
+            agent_config["selected_tools"] = sorted(agent_config["selected_tools"])
+
+    payload = json.dumps(
+        {
+            "news_text": normalize_news_text(news_text),
+            "config": config_dict,
+            **extra,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedRun:
+    events: List[SSEFrame]
+    created_at: float = field(default_factory=time.time)
+
+
+class ResultCache:
+    """
+    带 TTL 的 LRU 结果缓存
+
+    Args:
+        ttl: 缓存有效期（秒），0 表示关闭缓存
+        max_entries: 最多缓存的核查记录数量
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedRun]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: str) -> Optional[CachedRun]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry.created_at > self.ttl:
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, events: List[SSEFrame]) -> None:
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = CachedRun(events=list(events))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class InFlightRun:
+    """
+    一次正在运行的核查任务，负责把事件广播给所有挂载的 SSE 会话
+
+    Args:
+        key: 请求 key
+        job_id: 调度器中的任务 id（即发起该任务的会话 id）
+        cacheable: 完成后是否写入结果缓存，从 checkpoint 恢复的任务只有部分事件记录，不能缓存
+    """
+
+    def __init__(self, key: str, job_id: str, cacheable: bool = True):
+        self.key = key
+        self.job_id = job_id
+        self.cacheable = cacheable
+        self.events: List[SSEFrame] = []
+        self.subscribers: List["SSESession"] = []
+        self.is_queued = False
+        self.has_error = False
+        self.task: Any = None
+        self._lock = threading.Lock()
+
+    def attach(self, sse_session: "SSESession") -> None:
+        """挂载一个新的 SSE 会话，并补发此前已产生的事件"""
+        with self._lock:
+            sse_session.is_queued = self.is_queued
+            for event_data in self.events:
+                sse_session.add_event(event_data)
+            self.subscribers.append(sse_session)
+
+    def detach(self, sse_session: "SSESession") -> int:
+        """移除一个 SSE 会话，返回剩余的会话数量"""
+        with self._lock:
+            if sse_session in self.subscribers:
+                self.subscribers.remove(sse_session)
+            return len(self.subscribers)
+
+    def publish(self, event_data: Union[BaseEvent, Dict[str, Any], SSEFrame]) -> None:
+        """广播事件，非临时事件同时写入事件记录；事件只序列化一次，所有会话共享同一个帧"""
+        frame = encode_event(event_data)
+        with self._lock:
+            if frame.event not in TRANSIENT_EVENTS:
+                self.events.append(frame)
+            if frame.event == "error":
+                self.has_error = True
+            subscribers = list(self.subscribers)
+
+        for sse_session in subscribers:
+            sse_session.add_event(frame)
+
+    def set_queued(self, is_queued: bool) -> None:
+        with self._lock:
+            self.is_queued = is_queued
+            for sse_session in self.subscribers:
+                sse_session.is_queued = is_queued
+
+    def is_abandoned(self) -> bool:
+        """所有挂载的会话都已断开或中断"""
+        with self._lock:
+            return all(s.is_interrupted for s in self.subscribers)
+
+    def close(self) -> None:
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for sse_session in subscribers:
+            sse_session.close()
+
+
+class InFlightRegistry:
+    """正在运行的核查任务索引，相同 key 的请求共享同一个任务"""
+
+    def __init__(self):
+        self._runs: Dict[str, InFlightRun] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[InFlightRun]:
+        with self._lock:
+            return self._runs.get(key)
+
+    def get_by_job(self, job_id: str) -> Optional[InFlightRun]:
+        with self._lock:
+            for run in self._runs.values():
+                if run.job_id == job_id:
+                    return run
+            return None
+
+    def get_or_create(
+        self,
+        key: str,
+        job_id: str,
+        subscriber: Optional["SSESession"] = None,
+        cacheable: bool = True,
+    ) -> Tuple[InFlightRun, bool]:
+        """
+        返回 (任务, 是否为新建任务)
+
+        subscriber 在注册表的锁内挂载：任务结束时先从注册表移除再关闭所有会话，
+        挂载到已有任务上的会话因此总会被该任务关闭，不会挂载到刚刚关闭的任务上一直等到心跳超时
+        """
+        with self._lock:
+            run = self._runs.get(key)
+            is_new_run = run is None
+            if run is None:
+                run = InFlightRun(key=key, job_id=job_id, cacheable=cacheable)
+                self._runs[key] = run
+            if subscriber is not None:
+                run.attach(subscriber)
+            return run, is_new_run
+
+    def remove(self, run: InFlightRun) -> None:
+        with self._lock:
+            if self._runs.get(run.key) is run:
+                del self._runs[run.key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._runs)
+
+
+def create_result_cache_from_env() -> ResultCache:
+    """从环境变量读取缓存配置"""
+    ttl = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+    max_entries = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+    logger.info(f"Result cache: ttl={ttl}s, max_entries={max_entries}")
+    return ResultCache(ttl=ttl, max_entries=max_entries)
@@ -0,0 +1,263 @@
+"""
+Agent 任务调度器：在 agent 线程池前做准入控制
+
+- 可配置的并发上限（同时运行的 agent 数量）
+- 有界等待队列，队列满时拒绝新任务（上层返回 429）
+- 按客户端轮转出队，避免单个客户端占满整个队列
+- 排队位置或预计等待时间变化时通过回调通知上层（用于推送 queued 事件）
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from api import logger
+
+
+class QueueFullException(Exception):
+    """等待队列已满，或单个客户端排队任务数超出限制"""
+
+    def __init__(self, message: str, retry_after: int = 30):
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+@dataclass
+class ScheduledJob:
+    job_id: str
+    client_id: str
+    func: Callable[..., Any]
+    args: Tuple[Any, ...] = ()
+    enqueued_at: float = field(default_factory=time.time)
+
+
+# (job_id, position, eta_seconds)
+QueueUpdateCallback = Callable[[str, int, Optional[float]], None]
+
+
+class AgentScheduler:
+    """
+    有界并发 + 有界队列 + 按客户端公平出队的调度器
+
+    Args:
+        max_concurrency: 同时运行的任务数上限
+        max_queue_size: 等待队列的总长度上限
+        max_queued_per_client: 单个客户端允许排队的任务数上限
+        on_queue_update: 排队位置或预计等待时间变化时的回调
+        default_job_duration: 还没有历史数据时用于估算 ETA 的单个任务耗时（秒）
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 5,
+        max_queue_size: int = 20,
+        max_queued_per_client: int = 3,
+        on_queue_update: Optional[QueueUpdateCallback] = None,
+        default_job_duration: float = 300.0,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_size = max(0, max_queue_size)
+        self.max_queued_per_client = max(1, max_queued_per_client)
+        self.on_queue_update = on_queue_update
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="agent-worker",
+        )
+        self._lock = threading.Lock()
+        # client_id -> 该客户端的等待队列；OrderedDict 的顺序即轮转顺序
+        self._queues: "OrderedDict[str, Deque[ScheduledJob]]" = OrderedDict()
+        self._running: Dict[str, ScheduledJob] = {}
+        self._queued_count = 0
+
+        # 任务耗时的指数移动平均，用于估算 ETA
+        self._avg_job_duration = default_job_duration
+        self._completed_jobs = 0
+
+    # public api
+    def submit(self, job_id: str, client_id: str, func: Callable[..., Any], *args: Any) -> int:
+        """
+        提交任务
+
+        Returns:
+            0 表示任务已立即开始执行，否则为任务在等待队列中的位置（从 1 开始）
+
+        Raises:
+            QueueFullException: 等待队列已满或该客户端排队任务过多
+        """
+        job = ScheduledJob(job_id=job_id, client_id=client_id, func=func, args=args)
+
+        with self._lock:
+            if len(self._running) < self.max_concurrency and self._queued_count == 0:
+                self._start_locked(job)
+                return 0
+
+            if self._queued_count >= self.max_queue_size:
+                raise QueueFullException(
+                    "Server is busy, the waiting queue is full",
+                    retry_after=self._retry_after_locked(),
+                )
+
+            client_queue = self._queues.get(client_id)
+            if client_queue is not None and len(client_queue) >= self.max_queued_per_client:
+                raise QueueFullException(
+                    "Too many queued tasks for this client",
+                    retry_after=self._retry_after_locked(),
+                )
+
+            if client_queue is None:
+                client_queue = deque()
+                self._queues[client_id] = client_queue
+            client_queue.append(job)
+            self._queued_count += 1
+
+            positions = self._positions_locked()
+
+        logger.info(f"Job {job_id} queued at position {positions[job_id][0]} (client: {client_id})")
+        self._notify(positions)
+
+        return positions[job_id][0]
+
+    def cancel(self, job_id: str) -> bool:
+        """从等待队列中移除尚未开始的任务，已开始的任务不受影响"""
+        with self._lock:
+            found = self._remove_queued_locked(job_id)
+            if not found:
+                return False
+
+            positions = self._positions_locked()
+
+        logger.info(f"Job {job_id} removed from queue")
+        self._notify(positions)
+        return True
+
+    def position(self, job_id: str) -> Optional[Tuple[int, Optional[float]]]:
+        """返回任务当前的 (排队位置, 预计等待秒数)，任务不在队列中时返回 None"""
+        with self._lock:
+            return self._positions_locked().get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": len(self._running),
+                "queued": self._queued_count,
+                "queued_clients": len(self._queues),
+                "max_concurrency": self.max_concurrency,
+                "max_queue_size": self.max_queue_size,
+                "avg_job_duration": self._avg_job_duration,
+            }
+
+    # internals
+    def _start_locked(self, job: ScheduledJob) -> None:
+        self._running[job.job_id] = job
+        self._executor.submit(self._run_job, job)
+
+    def _run_job(self, job: ScheduledJob) -> None:
+        started_at = time.time()
+        try:
+            job.func(*job.args)
+        except Exception as e:
+            logger.error(f"Scheduled job {job.job_id} failed: {e}")
+        finally:
+            self._on_job_done(job, time.time() - started_at)
+
+    def _on_job_done(self, job: ScheduledJob, duration: float) -> None:
+        with self._lock:
+            self._running.pop(job.job_id, None)
+
+            # 指数移动平均，前几个样本权重更高以尽快摆脱默认值
+            self._completed_jobs += 1
+            alpha = max(0.2, 1 / self._completed_jobs)
+            self._avg_job_duration = (1 - alpha) * self._avg_job_duration + alpha * duration
+
+            started = False
+            while len(self._running) < self.max_concurrency:
+                next_job = self._pop_next_locked()
+                if next_job is None:
+                    break
+                self._start_locked(next_job)
+                started = True
+
+            positions = self._positions_locked() if started else {}
+
+        if positions:
+            self._notify(positions)
+
+    def _remove_queued_locked(self, job_id: str) -> bool:
+        for client_id, client_queue in self._queues.items():
+            for job in client_queue:
+                if job.job_id == job_id:
+                    client_queue.remove(job)
+                    self._queued_count -= 1
+                    if not client_queue:
+                        del self._queues[client_id]
+                    return True
+        return False
+
+    def _pop_next_locked(self) -> Optional[ScheduledJob]:
+        """按客户端轮转取出下一个任务：取队首客户端的一个任务后，把该客户端移到队尾"""
+        if not self._queues:
+            return None
+
+        client_id, client_queue = next(iter(self._queues.items()))
+        job = client_queue.popleft()
+        self._queued_count -= 1
+
+        if client_queue:
+            self._queues.move_to_end(client_id)
+        else:
+            del self._queues[client_id]
+
+        return job
+
+    def _dispatch_order_locked(self) -> List[ScheduledJob]:
+        """模拟轮转出队，得到所有排队任务的预计执行顺序"""
+        queues = [list(q) for q in self._queues.values()]
+        order: List[ScheduledJob] = []
+        depth = 0
+        while len(order) < self._queued_count:
+            for client_jobs in queues:
+                if depth < len(client_jobs):
+                    order.append(client_jobs[depth])
+            depth += 1
+        return order
+
+    def _positions_locked(self) -> Dict[str, Tuple[int, Optional[float]]]:
+        positions = {}
+        for index, job in enumerate(self._dispatch_order_locked()):
+            position = index + 1
+            positions[job.job_id] = (position, self._eta_locked(position))
+        return positions
+
+    def _eta_locked(self, position: int) -> Optional[float]:
+        # 前面还有 position - 1 个任务，需要等待 ceil(position / 并发数) 轮
+        rounds = math.ceil(position / self.max_concurrency)
+        return round(rounds * self._avg_job_duration, 1)
+
+    def _retry_after_locked(self) -> int:
+        return max(1, int(self._avg_job_duration / self.max_concurrency))
+
+    def _notify(self, positions: Dict[str, Tuple[int, Optional[float]]]) -> None:
+        if not self.on_queue_update:
+            return
+        for job_id, (position, eta) in positions.items():
+            try:
+                self.on_queue_update(job_id, position, eta)
+            except Exception as e:
+                logger.error(f"Error notifying queue update for job {job_id}: {e}")
+
+
+def create_scheduler_from_env(on_queue_update: Optional[QueueUpdateCallback] = None) -> AgentScheduler:
+    """从环境变量读取调度配置"""
+    return AgentScheduler(
+        max_concurrency=int(os.getenv("AGENT_MAX_CONCURRENCY", "5")),
+        max_queue_size=int(os.getenv("AGENT_MAX_QUEUE_SIZE", "20")),
+        max_queued_per_client=int(os.getenv("AGENT_MAX_QUEUED_PER_CLIENT", "3")),
+        on_queue_update=on_queue_update,
+    )
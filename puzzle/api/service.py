@@ -9,24 +9,41 @@ import functools
 from pathlib import Path
 from api import logger
 
-from typing import Dict, Optional, Any, Generator
+from typing import Dict, Optional, Any, Generator, Union
 from queue import Queue
-from concurrent.futures import ThreadPoolExecutor
 from flask import Response
 
 from .model import CreateAgentConfig
-from .agent_service import run_main_agent
+from .check_point_delta import StreamProtocol
+from agents.checkpointer import aget_latest_checkpoint, release_thread, get_checkpointer_backend, get_memory_saver
+from agents.metadata_extractor.knowledge_store import get_knowledge_store
+from agents.main.claim_index import get_claim_index
+from .metrics import metrics_registry
+from models.cascade import cascade_stats
+from models.failover import failover_stats
+from utils.safe_parse import safe_parse_stats
+from .agent_service import run_main_agent, llm_cache, model_registry
+from .scheduler import create_scheduler_from_env, QueueFullException
+from .result_cache import (
+    CachedRun,
+    InFlightRun,
+    InFlightRegistry,
+    create_result_cache_from_env,
+    make_cache_key,
+)
 from .events import (
+    BaseEvent,
+    SSEFrame,
+    encode_event,
     TaskComplete, 
     TaskInterrupted, 
     InterruptData,
     Error, 
     ErrorData,
+    Queued,
+    QueuedData,
 )
 
-# Thread pool executor for running agents in background
-thread_pool = ThreadPoolExecutor(max_workers=5)
-
 # Store active sessions
 active_sessions: Dict[str, Dict[str, Any]] = {}
 # Lock for thread-safe operations on sessions
@@ -37,8 +54,13 @@ SESSION_DIR = os.path.join(tempfile.gettempdir(), 'puzzle_sessions')
 # 确保目录存在
 os.makedirs(SESSION_DIR, exist_ok=True)
 
-HEARTBEAT_INTERVAL = 30  # seconds
-MAX_CONSECUTIVE_HEARTBEATS = 6  # 最大连续发送6次心跳（约3分钟）
+HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "30"))  # seconds
+MAX_CONSECUTIVE_HEARTBEATS = int(os.getenv("SSE_MAX_CONSECUTIVE_HEARTBEATS", "6"))  # 最大连续发送6次心跳（约3分钟）
+
+# 压测时使用桩 agent，按真实的事件节奏和数据大小产生事件，不调用模型
+if os.getenv("STUB_AGENT", "false").lower() == "true":
+    from loadtest.stub_agent import run_stub_agent as run_main_agent
+    logger.warning("STUB_AGENT is enabled, fact checks will return stub events")
 
 # 会话状态共享函数
 def get_session_file_path(session_id: str) -> str:
@@ -139,18 +161,22 @@ class SSESession:
         self.is_interrupted = False
         self.task: Optional[asyncio.Task] = None
         self.consecutive_heartbeats = 0  # 初始化连续心跳计数器
+        self.is_queued = False  # 排队等待期间的心跳不计入连续心跳次数
+        self.close_when_drained = False  # 队列中的事件发送完后结束事件流
     
-    def add_event(self, event_data: Dict[str, Any]) -> None:
+    def add_event(self, event_data: Union[BaseEvent, Dict[str, Any], SSEFrame]) -> None:
         """Add an event to the session's queue
         
         Args:
-            event_data: A dictionary with 'event' and 'data' keys
+            event_data: An event model, a dictionary with 'event' and 'data' keys, 
+                or an already serialized SSE frame
         """
         if not self.is_running:
             return
         
-        event_type = event_data.get('event')    
-        self.queue.put(event_data)
+        frame = encode_event(event_data)
+        event_type = frame.event
+        self.queue.put(frame)
         logger.info(f"Event added to queue: {event_type} to session {self.session_id}")
         
         # 收到非心跳事件时重置心跳计数器
@@ -159,7 +185,7 @@ class SSESession:
         
         # Special logging for error events to help debug
         if event_type == 'error':
-            logger.error(f"ERROR EVENT DETAILS: {json.dumps(event_data, ensure_ascii=False)}")
+            logger.error(f"ERROR EVENT DETAILS: {frame.message.strip()}")
             logger.info(f"Queue size after adding error: {self.queue.qsize()}")
             
             # Force a small delay to ensure event processing
@@ -190,7 +216,6 @@ class SSESession:
             # 添加中断事件，并使用更短的超时确保被处理
             self.add_event(
                 TaskInterrupted(data=InterruptData(message="Task is interrupted by the user"))
-                .model_dump()
             )
             # 短暂等待确保事件被处理
             time.sleep(0.1)
@@ -209,7 +234,8 @@ class SSESession:
                 'Cache-Control': 'no-cache, no-transform',
                 'Connection': 'keep-alive',
                 'X-Accel-Buffering': 'no',  # Disable Nginx buffering
-                'Transfer-Encoding': 'chunked'  # Use chunked transfer to avoid buffering
+                # 不手动设置 Transfer-Encoding：没有 Content-Length 的流式响应由服务器自动分块，
+                # 重复的 Transfer-Encoding 头会被严格的 HTTP 客户端拒绝
             }
         )
     
@@ -244,7 +270,6 @@ class SSESession:
                     logger.error(f"Session {self.session_id} reached max consecutive heartbeats ({MAX_CONSECUTIVE_HEARTBEATS}). Model seems unresponsive.")
                     self.add_event(
                         Error(data=ErrorData(message="Model seems unresponsive. Maximum waiting time exceeded (3 minutes)"))
-                        .model_dump()
                     )
                     error_sent = True
                     error_sent_time = time.time()
@@ -262,7 +287,8 @@ class SSESession:
                     try:
                         yield "event: heartbeat\ndata: {\"message\": \"Connection alive\"}\n\n"
                         last_heartbeat = current_time
-                        self.consecutive_heartbeats += 1
+                        if not self.is_queued:
+                            self.consecutive_heartbeats += 1
                         logger.info(f"Heartbeat sent ({self.consecutive_heartbeats}/{MAX_CONSECUTIVE_HEARTBEATS}) to session {self.session_id}")
                     except GeneratorExit:
                         # 客户端断开连接时会引发 GeneratorExit 异常
@@ -273,9 +299,8 @@ class SSESession:
                 # Check for events (non-blocking)
                 try:
                     if not self.queue.empty():
-                        event = self.queue.get(block=False)
-                        event_type = event.get("event")
-                        event_data = event.get("data")
+                        frame: SSEFrame = self.queue.get(block=False)
+                        event_type = frame.event
                         
                         logger.info(f"Processing event from queue: {event_type} to session {self.session_id}")
                         
@@ -284,14 +309,13 @@ class SSESession:
                             self.consecutive_heartbeats = 0
                         
                         try:
-                            # Ensure data is JSON serializable
-                            data_json = json.dumps(event_data, ensure_ascii=False) if event_data is not None else "{}"
-                            message = f"event: {event_type}\ndata: {data_json}\n\n"
+                            # 帧在事件产生时已序列化，这里直接发送
+                            message = frame.message
                             logger.info(f"Sending event: {event_type} to session {self.session_id}")
                             
                             # Special handling for error events
                             if event_type == "error":
-                                logger.error(f"Sending ERROR event: {data_json} to session {self.session_id}")
+                                logger.error(f"Sending ERROR event: {message.strip()} to session {self.session_id}")
                                 try:
                                     yield message  # Send error event
                                     error_sent = True
@@ -315,6 +339,11 @@ class SSESession:
                         
                         except TypeError as e:
                             logger.error(f"Error serializing event data: {e}")
+                    elif self.close_when_drained:
+                        # 所有事件已发送，不再等待新的事件
+                        logger.info(f"All events drained, closing session {self.session_id}")
+                        self.is_running = False
+                        break
                     else:
                         # Short sleep to avoid CPU spinning while checking for new events
                         time.sleep(0.1)
@@ -344,13 +373,16 @@ class SSESession:
             logger.info("Client disconnected before final stream_closed event could be sent")
 
 
-def create_session() -> str:
+def create_session(session_id: Optional[str] = None) -> str:
     """Create a new session ID and initialize an empty session
     
+    Args:
+        session_id: 复用已有的会话 ID（恢复会话时），默认生成新的 ID
+    
     Returns:
         str: The new session ID
     """
-    session_id = str(uuid.uuid4())
+    session_id = session_id or str(uuid.uuid4())
     
     with sessions_lock:
         active_sessions[session_id] = {
@@ -442,6 +474,14 @@ def interrupt_session(session_id: str) -> bool:
         # 立即标记会话为中断状态
         sse_session.is_interrupted = True
         
+        # 从共享的核查任务上卸载当前会话，仍有其他会话在订阅时不取消任务
+        flight: Optional[InFlightRun] = session.get("flight")
+        remaining_subscribers = flight.detach(sse_session) if flight else 0
+        
+        # 如果任务仍在排队，直接从等待队列中移除
+        if flight and remaining_subscribers == 0 and flight.is_queued:
+            scheduler.cancel(flight.job_id)
+        
         # 更新文件系统状态
         update_session_state(session_id, is_interrupted=True)
         
@@ -449,33 +489,35 @@ def interrupt_session(session_id: str) -> bool:
         try:
             sse_session.add_event(
                 TaskInterrupted(data=InterruptData(message="Task Interrupted"))
-                .model_dump()
             )
             # 确保事件被处理的短暂延迟
             time.sleep(0.1)
         except Exception as e:
             logger.error(f"Error adding interrupt event: {e}")
         
-        # 如果 session 中包含 task，且 task 是 asyncio.Task 类型，则取消任务
-        if hasattr(sse_session, 'task') and sse_session.task is not None:
+        # 如果任务中包含 asyncio.Task，且没有其他会话在订阅，则取消任务
+        task = flight.task if flight else sse_session.task
+        if task is not None and remaining_subscribers == 0:
             try:
-                if not sse_session.task.done():
+                if not task.done():
                     # 获取任务所在的事件循环
                     loop = asyncio.get_event_loop_policy().get_event_loop()
-                    if sse_session.task._loop == loop:
+                    if task._loop == loop:
                         # 如果在同一个事件循环中，直接取消
-                        sse_session.task.cancel()
+                        task.cancel()
                     else:
                         # 如果不在同一个事件循环中，需要特殊处理
                         asyncio.run_coroutine_threadsafe(
-                            _cancel_task(sse_session.task), 
-                            sse_session.task._loop
+                            _cancel_task(task), 
+                            task._loop
                         )
                     logger.info(f"Cancelled async task for session {session_id}")
                 else:
                     logger.info(f"Task for session {session_id} was already done")
             except Exception as e:
                 logger.error(f"Error cancelling task: {e}")
+        elif remaining_subscribers > 0:
+            logger.info(f"Session {session_id} detached, run still has {remaining_subscribers} subscribers")
         
         # 关闭 SSE 会话
         sse_session.close()
@@ -498,35 +540,44 @@ async def _cancel_task(task):
     except asyncio.CancelledError:
         pass
 
-async def process_agent_events(news_text: str, config: CreateAgentConfig, session_id: str, sse_session: SSESession):
-    """Process events from the agent's generator and add them to the SSE session"""
+async def process_agent_events(
+    news_text: str, 
+    config: CreateAgentConfig, 
+    session_id: str, 
+    flight: InFlightRun, 
+    stream_protocol: StreamProtocol = "snapshot",
+    resume: bool = False,
+):
+    """Process events from the agent's generator and publish them to all subscribed SSE sessions"""
     error_occurred = False
+    completed = False
     
     try:
         # Add a starting event
-        sse_session.add_event({
+        flight.publish({
             "event": "agent_start",
             "data": {"message": "Agent starting"}
         })
         
-        # Check if the session has been interrupted
-        if sse_session.is_interrupted:
+        # Check if every subscribed session has been interrupted
+        if flight.is_abandoned():
             return
         
         # Get events from the agent generator
-        agent_events = run_main_agent(news_text, config, session_id)
+        agent_events = run_main_agent(news_text, config, session_id, stream_protocol, resume)
         
         async for event_data in agent_events:
             # Check for interruption after each event
-            if sse_session.is_interrupted:
+            if flight.is_abandoned():
                 break
                 
-            # Forward event to SSE session
-            sse_session.add_event(event_data)
+            # Forward event to SSE sessions
+            flight.publish(event_data)
                 
         # Add task complete event (only if not interrupted)
-        if not sse_session.is_interrupted:
-            sse_session.add_event(TaskComplete().model_dump())
+        if not flight.is_abandoned():
+            flight.publish(TaskComplete())
+            completed = True
             
     except Exception as e:
         # Handle any exceptions
@@ -536,9 +587,8 @@ async def process_agent_events(news_text: str, config: CreateAgentConfig, sessio
         
         try:
             # Add error event and wait to ensure it's processed
-            sse_session.add_event(
+            flight.publish(
                 Error(data=ErrorData(message=error_message))
-                .model_dump()
             )
             
             # Add a delay to ensure error event is sent before closing
@@ -548,6 +598,16 @@ async def process_agent_events(news_text: str, config: CreateAgentConfig, sessio
             logger.error(f"Error sending error event: {inner_e}")
         
     finally:
+        # 只缓存完整且没有出错的核查记录
+        if completed and not flight.has_error and flight.cacheable:
+            result_cache.put(flight.key, flight.events)
+        
+        # 之后到达的相同请求将命中缓存或重新运行，不再挂载到该任务上
+        in_flight_runs.remove(flight)
+        
+        # 完成的会话不再需要恢复，立即释放进程内存中的 checkpoint；中断或出错的会话保留一段时间以便恢复
+        release_thread(session_id, finished=completed and not error_occurred)
+        
         try:
             # Delay before closing to allow final events to be sent
             await asyncio.sleep(0.5)
@@ -555,7 +615,7 @@ async def process_agent_events(news_text: str, config: CreateAgentConfig, sessio
             # Make sure a stream_closed event is explicitly added if we had an error
             # This makes it more likely the browser will receive it
             if error_occurred:
-                sse_session.add_event({
+                flight.publish({
                     "event": "stream_closed",
                     "data": {"message": "Stream closed due to error"}
                 })
@@ -564,27 +624,42 @@ async def process_agent_events(news_text: str, config: CreateAgentConfig, sessio
         except Exception as e:
             logger.error(f"Error in final cleanup: {e}")
         
-        # Close the SSE session when finished
-        sse_session.close()
+        # Close the SSE sessions when finished
+        flight.close()
 
-def run_agent_thread(news_text: str, config: CreateAgentConfig, session_id: str) -> None:
-    """Run the agent in a separate thread and forward events to the SSE session"""
-    session = get_session(session_id)
-    if not session:
-        logger.error(f"Session {session_id} not found in run_agent_thread")
+def run_agent_thread(
+    news_text: str, 
+    config: CreateAgentConfig, 
+    session_id: str, 
+    flight: InFlightRun, 
+    stream_protocol: StreamProtocol = "snapshot",
+    resume: bool = False,
+) -> None:
+    """Run the agent in a separate thread and forward events to the subscribed SSE sessions"""
+    flight.set_queued(False)
+    
+    # 所有订阅该任务的会话都在排队期间被中断
+    if flight.is_abandoned():
+        logger.info(f"Run for session {session_id} was abandoned while queued, skipping")
+        in_flight_runs.remove(flight)
+        # 关闭移除前刚刚挂载上的会话
+        flight.close()
         return
     
+    session = get_session(session_id)
+    
     # 处理会话可能在其他 worker 中的情况
-    if session.get("exists_in_other_worker", False):
+    if session and session.get("exists_in_other_worker", False):
         logger.warning(f"Session {session_id} exists in another worker, not starting a new agent instance")
+        in_flight_runs.remove(flight)
+        flight.close()
         return
     
-    sse_session: SSESession = session["sse_session"]
-    
     # Update session state
     with sessions_lock:
-        session["is_running"] = True
-        session["start_time"] = time.time()
+        if session_id in active_sessions:
+            active_sessions[session_id]["is_running"] = True
+            active_sessions[session_id]["start_time"] = time.time()
         
     # 更新文件系统状态
     update_session_state(session_id, is_running=True)
@@ -595,17 +670,22 @@ def run_agent_thread(news_text: str, config: CreateAgentConfig, session_id: str)
         asyncio.set_event_loop(loop)
         
         # 创建处理 agent 事件的协程任务
-        process_events_coro = process_agent_events(news_text, config, session_id, sse_session)
+        process_events_coro = process_agent_events(
+            news_text, config, session_id, flight, stream_protocol, resume
+        )
         
         # 存储任务引用，以便可以在需要时取消
-        sse_session.task = asyncio.ensure_future(process_events_coro, loop=loop)
+        flight.task = asyncio.ensure_future(process_events_coro, loop=loop)
+        if session:
+            session["sse_session"].task = flight.task
         
         # 运行直到任务完成或被取消
-        loop.run_until_complete(sse_session.task)
+        loop.run_until_complete(flight.task)
         
     except asyncio.CancelledError:
         # 任务被取消时的处理
         logger.info(f"Agent task for session {session_id} was cancelled")
+        in_flight_runs.remove(flight)
         # 更新文件系统状态
         update_session_state(session_id, is_running=False, is_interrupted=True)
         
@@ -613,11 +693,11 @@ def run_agent_thread(news_text: str, config: CreateAgentConfig, session_id: str)
         # Handle any exceptions
         error_message = f"Error in agent thread: {str(e)}"
         logger.error(f"Exception in agent thread: {error_message}")
+        in_flight_runs.remove(flight)
         
         # Add error event
-        sse_session.add_event(
+        flight.publish(
             Error(data=ErrorData(message=error_message))
-            .model_dump()
         )
         
         # 更新文件系统状态
@@ -628,7 +708,9 @@ def run_agent_thread(news_text: str, config: CreateAgentConfig, session_id: str)
         
     finally:
         # 确保任务引用被清理
-        sse_session.task = None
+        flight.task = None
+        if session:
+            session["sse_session"].task = None
         
         # Update session state
         with sessions_lock:
@@ -645,9 +727,79 @@ def run_agent_thread(news_text: str, config: CreateAgentConfig, session_id: str)
         if is_session_interrupted(session_id):
             remove_session_state(session_id)
 
-def start_agent(news_text: str, config: CreateAgentConfig) -> str:
-    """Start a new agent instance and return the session ID"""
-    session_id = create_session()
+def replay_cached_run(session_id: str, cached_run: CachedRun) -> None:
+    """将缓存的核查记录放入 SSE 会话的队列，客户端取完所有事件后事件流自行结束
+    
+    不启动线程也不等待客户端连接，客户端从未连接的会话与其他会话一样由会话清理回收
+    """
+    with sessions_lock:
+        session = active_sessions.get(session_id)
+    if not session:
+        return
+    
+    sse_session: SSESession = session["sse_session"]
+    for event_data in cached_run.events:
+        sse_session.add_event(event_data)
+    sse_session.close_when_drained = True
+
+def notify_queue_update(session_id: str, position: int, eta_seconds: Optional[float]) -> None:
+    """调度器回调：向排队中的核查任务推送当前排队位置和预计等待时间"""
+    flight = in_flight_runs.get_by_job(session_id)
+    if not flight:
+        return
+    
+    flight.publish(
+        Queued(data=QueuedData(position=position, eta_seconds=eta_seconds))
+    )
+
+# Admission control in front of the agent worker threads
+scheduler = create_scheduler_from_env(on_queue_update=notify_queue_update)
+# 已完成核查的结果缓存，以及正在运行的相同请求
+result_cache = create_result_cache_from_env()
+in_flight_runs = InFlightRegistry()
+
+metrics_registry.register_stats("scheduler", scheduler.stats)
+if llm_cache is not None:
+    metrics_registry.register_stats("llm_cache", llm_cache.stats)
+knowledge_store = get_knowledge_store()
+if knowledge_store is not None:
+    metrics_registry.register_stats("knowledge_cache", knowledge_store.stats)
+claim_index = get_claim_index()
+if claim_index is not None:
+    metrics_registry.register_stats("claim_index", claim_index.stats)
+metrics_registry.register_stats("result_cache", result_cache.stats)
+metrics_registry.register_stats("model_cascade", cascade_stats.stats)
+metrics_registry.register_stats("llm_failover", failover_stats.stats)
+metrics_registry.register_stats("safe_parse", safe_parse_stats.stats)
+if model_registry.rate_limiter is not None:
+    metrics_registry.register_stats("llm_rate_limit", model_registry.rate_limiter.stats)
+metrics_registry.register_stats("active_sessions", lambda: {"count": len(active_sessions)})
+if get_checkpointer_backend() == "memory":
+    metrics_registry.register_stats("checkpoint_memory", get_memory_saver().stats)
+
+def start_agent(
+    news_text: str, 
+    config: CreateAgentConfig, 
+    client_id: str = "anonymous", 
+    stream_protocol: StreamProtocol = "snapshot",
+    resume_session_id: Optional[str] = None,
+) -> str:
+    """Start a new agent instance and return the session ID
+    
+    相同的新闻文本和配置：
+    - 已有缓存结果时直接回放
+    - 已有正在运行的任务时挂载到该任务上
+    
+    恢复会话时总是运行该会话自己的任务，不使用缓存和正在运行的相同任务
+    
+    Args:
+        resume_session_id: 从该会话的最新 checkpoint 继续执行，新会话沿用原会话 ID
+    
+    Raises:
+        QueueFullException: 等待队列已满，调用方应返回 429
+    """
+    resume = resume_session_id is not None
+    session_id = create_session(resume_session_id)
     
     # 检查文件系统是否已存在该会话
     if read_session_state(session_id) is None:
@@ -656,7 +808,109 @@ def start_agent(news_text: str, config: CreateAgentConfig) -> str:
             if session_id in active_sessions:
                 write_session_state(session_id, active_sessions[session_id])
     
-    # Start agent in background thread
-    thread_pool.submit(run_agent_thread, news_text, config, session_id)
+    with sessions_lock:
+        session = active_sessions[session_id]
+        sse_session: SSESession = session["sse_session"]
+    
+    if resume:
+        # 恢复的会话只继续自己的 thread：不回放缓存、不挂载到相同请求的任务上，
+        # 其事件记录从 checkpoint 开始，不完整，也不写入缓存
+        flight, is_new_run = in_flight_runs.get_or_create(
+            f"resume:{session_id}", job_id=session_id, subscriber=sse_session, cacheable=False
+        )
+    else:
+        # 不同协议的事件记录不同，不能互相回放
+        key = make_cache_key(news_text, config, stream_protocol=stream_protocol)
+        
+        cached_run = result_cache.get(key)
+        if cached_run is not None:
+            logger.info(f"Result cache hit for session {session_id}, replaying {len(cached_run.events)} events")
+            replay_cached_run(session_id, cached_run)
+            return session_id
+        
+        flight, is_new_run = in_flight_runs.get_or_create(key, job_id=session_id, subscriber=sse_session)
+    session["flight"] = flight
+    
+    if not is_new_run:
+        logger.info(f"Session {session_id} attached to in-flight run {flight.job_id}")
+        # 补发当前的排队位置
+        queue_position = scheduler.position(flight.job_id) if flight.is_queued else None
+        if queue_position:
+            position, eta_seconds = queue_position
+            sse_session.add_event(
+                Queued(data=QueuedData(position=position, eta_seconds=eta_seconds))
+            )
+        return session_id
+    
+    flight.set_queued(True)
+    
+    # Start agent in background thread once a worker slot is available
+    try:
+        scheduler.submit(
+            session_id, client_id, run_agent_thread, 
+            news_text, config, session_id, flight, stream_protocol, resume,
+        )
+    except QueueFullException:
+        in_flight_runs.remove(flight)
+        close_session(session_id)
+        raise
     
     return session_id
+
+class SessionNotResumableException(Exception):
+    """会话不存在可恢复的 checkpoint，或会话仍在运行、已经完成"""
+    
+    def __init__(self, message: str, status_code: int = 409):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(message)
+
+def _is_run_finished(values: Dict[str, Any]) -> bool:
+    """checkpoint 中的核查是否已经结束（已生成报告，或文本不适合核查）"""
+    if values.get("result") is not None:
+        return True
+    is_news_text = values.get("is_news_text")
+    return is_news_text is not None and not is_news_text.result
+
+def resume_agent(
+    session_id: str, 
+    client_id: str = "anonymous", 
+    stream_protocol: StreamProtocol = "snapshot",
+) -> str:
+    """Resume an interrupted or crashed session from its last completed node
+    
+    会话的新闻文本和配置从 checkpoint 中读取，已经完成的节点（包括已完成的检索步骤）不会重新执行
+    
+    Raises:
+        SessionNotResumableException: 没有可恢复的 checkpoint（404），或会话仍在运行、已经完成（409）
+        QueueFullException: 等待队列已满，调用方应返回 429
+    """
+    with sessions_lock:
+        session = active_sessions.get(session_id)
+    if session and (session.get("is_running") or in_flight_runs.get_by_job(session_id)):
+        raise SessionNotResumableException(f"Session {session_id} is still running")
+    
+    checkpoint_tuple = asyncio.run(aget_latest_checkpoint(session_id))
+    if checkpoint_tuple is None:
+        raise SessionNotResumableException(f"No checkpoint found for session {session_id}", status_code=404)
+    
+    values = checkpoint_tuple.checkpoint.get("channel_values", {})
+    agent_config = (checkpoint_tuple.metadata or {}).get("agent_config")
+    if not values.get("news_text") or not agent_config:
+        raise SessionNotResumableException(f"Checkpoint of session {session_id} cannot be resumed", status_code=404)
+    
+    if _is_run_finished(values):
+        raise SessionNotResumableException(f"Session {session_id} has already finished")
+    
+    # 旧的会话（例如已中断但仍在内存中的会话）由新会话替代
+    if session:
+        close_session(session_id)
+    
+    logger.info(f"Resuming session {session_id} from checkpoint {checkpoint_tuple.config['configurable'].get('checkpoint_id')}")
+    return start_agent(
+        values["news_text"],
+        CreateAgentConfig.model_validate(agent_config),
+        client_id=client_id,
+        stream_protocol=stream_protocol,
+        resume_session_id=session_id,
+    )
@@ -4,7 +4,7 @@ import multiprocessing
 # 单工作进程配置
 workers = 1
 worker_class = "sync"  # 使用同步工作模式，避免与 trio 冲突
-threads = 4  # 每个工作进程的线程数
+threads = int(os.getenv("GUNICORN_THREADS", "4"))  # 每个工作进程的线程数，每个 SSE 连接占用一个线程
 
 # 超时配置
 timeout = 120  # 请求超时时间，根据实际情况调整
@@ -0,0 +1,315 @@
+"""
+SSE 服务压测
+
+并发发起 start-fact-check + events 请求对，统计：
+- 事件延迟（服务端产生事件到客户端收到，依赖桩 agent 写入的 emitted_at）、首个事件延迟与会话时长的分位数
+- 事件与会话的吞吐量
+- 每个会话占用的内存（从 /metrics 读取进程常驻内存，取压测期间的峰值减去基线再除以同时进行的会话数）
+- 启动失败（429 / 500 等）、事件流 409 以及错误事件的比例
+
+先以桩 agent 启动服务，再运行压测:
+    STUB_AGENT=true STUB_AGENT_TIME_SCALE=0.1 gunicorn -c gunicorn.conf.py api.app:app
+    python -m loadtest.generator --base-url http://localhost:8000 --sessions 200 --concurrency 50
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+TERMINAL_EVENTS = {"task_complete", "task_interrupted", "stream_closed"}
+MEMORY_METRIC = "puzzle_process_resident_memory_bytes"
+
+
+@dataclass
+class SessionResult:
+    index: int
+    start_status: int = 0
+    events_status: int = 0
+    session_id: Optional[str] = None
+    events: int = 0
+    event_bytes: int = 0
+    heartbeats: int = 0
+    latencies: List[float] = field(default_factory=list)
+    first_event: Optional[float] = None
+    duration: float = 0
+    completed: bool = False
+    error: Optional[str] = None
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return round(ordered[position], 4)
+
+
+def default_config() -> Dict[str, Any]:
+    """从本地的模型配置中为每个 agent 选择第一个可用的模型，桩 agent 不会真正调用模型"""
+    from config import MODEL_CONFIGS
+
+    providers = MODEL_CONFIGS.get("providers", {})
+    restrictions = MODEL_CONFIGS.get("agent_restrictions", {})
+
+    def pick(agent: str) -> Dict[str, str]:
+        for provider, provider_config in providers.items():
+            models = (
+                provider_config.get("reasoning_models", [])
+                + provider_config.get("non_reasoning_models", [])
+                + provider_config.get("light_models", [])
+            )
+            for model in models:
+                if model not in restrictions.get(agent, {}).get("excluded", []):
+                    return {"model_name": model, "model_provider": provider}
+        raise ValueError("No model configured, pass --config")
+
+    return {
+        "main_agent": {**pick("main_agent"), "max_retries": 1},
+        "metadata_extractor": pick("metadata_extractor"),
+        "searcher": {**pick("searcher"), "max_search_tokens": 10000, "selected_tools": []},
+    }
+
+
+async def run_session(
+    client: httpx.AsyncClient,
+    base_url: str,
+    index: int,
+    config: Dict[str, Any],
+    stream_protocol: str,
+    client_id: str,
+    news_text: str,
+) -> SessionResult:
+    result = SessionResult(index=index)
+    started_at = time.perf_counter()
+
+    try:
+        response = await client.post(
+            f"{base_url}/api/start-fact-check",
+            json={"news_text": news_text, "config": config, "stream_protocol": stream_protocol},
+            headers={"X-Client-Id": client_id},
+        )
+        result.start_status = response.status_code
+        if response.status_code != 200:
+            result.error = response.text[:200]
+            return result
+        result.session_id = response.json()["session_id"]
+
+        async with client.stream("GET", f"{base_url}/api/agents/{result.session_id}/events") as stream:
+            result.events_status = stream.status_code
+            if stream.status_code != 200:
+                result.error = (await stream.aread()).decode("utf-8", "replace")[:200]
+                return result
+
+            event_type = None
+            async for line in stream.aiter_lines():
+                if line.startswith("event: "):
+                    event_type = line[len("event: "):]
+                    continue
+                if not line.startswith("data: "):
+                    continue
+
+                received_at = time.time()
+                if event_type == "heartbeat":
+                    result.heartbeats += 1
+                    continue
+
+                result.events += 1
+                result.event_bytes += len(line)
+                if result.first_event is None:
+                    result.first_event = time.perf_counter() - started_at
+
+                try:
+                    data = json.loads(line[len("data: "):])
+                except json.JSONDecodeError:
+                    data = None
+                if isinstance(data, dict):
+                    emitted_at = data.get("emitted_at")
+                    if emitted_at:
+                        result.latencies.append(received_at - emitted_at)
+                    if event_type == "error" and result.error is None:
+                        result.error = data.get("message")
+
+                if event_type == "task_complete":
+                    result.completed = True
+                if event_type in TERMINAL_EVENTS:
+                    break
+
+    except httpx.HTTPError as e:
+        result.error = f"{type(e).__name__}: {e}"
+    finally:
+        result.duration = time.perf_counter() - started_at
+
+    return result
+
+
+async def read_memory(client: httpx.AsyncClient, base_url: str) -> Optional[float]:
+    """读取服务进程的常驻内存，多 worker 部署时只能读到处理该请求的 worker"""
+    try:
+        response = await client.get(f"{base_url}/metrics")
+    except httpx.HTTPError:
+        return None
+    for line in response.text.splitlines():
+        if line.startswith(MEMORY_METRIC + " "):
+            return float(line.split()[-1])
+    return None
+
+
+async def run_load_test(
+    base_url: str,
+    sessions: int,
+    concurrency: int,
+    config: Dict[str, Any],
+    stream_protocol: str = "snapshot",
+    clients: int = 0,
+    ramp_up: float = 0,
+    same_text: bool = False,
+    timeout: float = 600,
+) -> Dict[str, Any]:
+    base_url = base_url.rstrip("/")
+    slots = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency * 2 + 4, max_keepalive_connections=concurrency * 2 + 4)
+
+    async with httpx.AsyncClient(timeout=httpx.Timeout(timeout, connect=10), limits=limits) as client:
+        baseline_memory = await read_memory(client, base_url)
+        peak_memory = baseline_memory
+        active = 0
+        peak_active = 0
+
+        async def one(index: int) -> SessionResult:
+            nonlocal active, peak_active
+            if ramp_up:
+                await asyncio.sleep(ramp_up * min(index, concurrency) / concurrency)
+            async with slots:
+                active += 1
+                peak_active = max(peak_active, active)
+                try:
+                    return await run_session(
+                        client, base_url, index, config, stream_protocol,
+                        client_id=f"loadtest-{index % clients if clients else index}",
+                        # 默认每个会话使用不同的文本，避免命中结果缓存和相同请求合并
+                        news_text="load test news" if same_text else f"load test news #{index} {time.time()}",
+                    )
+                finally:
+                    active -= 1
+
+        async def sample_memory(done: asyncio.Event) -> None:
+            nonlocal peak_memory
+            while not done.is_set():
+                memory = await read_memory(client, base_url)
+                if memory is not None:
+                    peak_memory = max(peak_memory or 0, memory)
+                try:
+                    await asyncio.wait_for(done.wait(), timeout=1)
+                except asyncio.TimeoutError:
+                    pass
+
+        done = asyncio.Event()
+        sampler = asyncio.create_task(sample_memory(done))
+        started_at = time.perf_counter()
+        results = await asyncio.gather(*(one(index) for index in range(sessions)))
+        elapsed = time.perf_counter() - started_at
+        done.set()
+        await sampler
+        final_memory = await read_memory(client, base_url)
+
+    return summarize(results, elapsed, baseline_memory, peak_memory, final_memory, peak_active)
+
+
+def summarize(
+    results: List[SessionResult],
+    elapsed: float,
+    baseline_memory: Optional[float],
+    peak_memory: Optional[float],
+    final_memory: Optional[float],
+    peak_active: int,
+) -> Dict[str, Any]:
+    latencies = [latency for result in results for latency in result.latencies]
+    first_events = [result.first_event for result in results if result.first_event is not None]
+    durations = [result.duration for result in results if result.completed]
+    total = len(results)
+    events = sum(result.events for result in results)
+
+    memory_per_session = None
+    if baseline_memory is not None and peak_memory is not None and peak_active:
+        memory_per_session = round((peak_memory - baseline_memory) / peak_active)
+
+    return {
+        "sessions": total,
+        "completed": sum(result.completed for result in results),
+        "elapsed": round(elapsed, 2),
+        "start_status": dict(Counter(result.start_status for result in results)),
+        "events_status": dict(Counter(result.events_status for result in results if result.events_status)),
+        "error_rate": round(sum(1 for result in results if result.error) / total, 4) if total else 0,
+        "conflict_rate": round(sum(1 for result in results if result.events_status == 409) / total, 4) if total else 0,
+        "rejected_rate": round(sum(1 for result in results if result.start_status == 429) / total, 4) if total else 0,
+        "event_latency": {f"p{q}": percentile(latencies, q) for q in (50, 90, 99)} | {"max": percentile(latencies, 100)},
+        "first_event": {f"p{q}": percentile(first_events, q) for q in (50, 90, 99)},
+        "session_duration": {f"p{q}": percentile(durations, q) for q in (50, 90, 99)},
+        "throughput": {
+            "events_per_second": round(events / elapsed, 2) if elapsed else 0,
+            "sessions_per_second": round(len(durations) / elapsed, 3) if elapsed else 0,
+            "bytes_per_second": round(sum(result.event_bytes for result in results) / elapsed) if elapsed else 0,
+        },
+        "heartbeats": sum(result.heartbeats for result in results),
+        "memory": {
+            "baseline_bytes": baseline_memory,
+            "peak_bytes": peak_memory,
+            "final_bytes": final_memory,
+            "peak_concurrent_sessions": peak_active,
+            "per_session_bytes": memory_per_session,
+        },
+        "errors": dict(Counter(result.error[:80] for result in results if result.error).most_common(5)),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="SSE 服务压测（服务端应以 STUB_AGENT=true 启动）")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--sessions", type=int, default=50, help="会话总数")
+    parser.add_argument("--concurrency", type=int, default=10, help="同时进行的会话数")
+    parser.add_argument("--clients", type=int, default=0, help="模拟的客户端数量（X-Client-Id），0 表示每个会话一个客户端")
+    parser.add_argument("--ramp-up", type=float, default=0, help="在该秒数内逐步启动前 concurrency 个会话")
+    parser.add_argument("--stream-protocol", choices=["snapshot", "delta"], default="snapshot")
+    parser.add_argument("--same-text", action="store_true", help="所有会话使用相同的新闻文本，测试结果缓存与相同请求合并")
+    parser.add_argument("--config", help="CreateAgentConfig 的 JSON 文件，默认从本地模型配置中选择")
+    parser.add_argument("--timeout", type=float, default=600, help="单个请求的超时秒数")
+    parser.add_argument("--output", help="结果 JSON 文件，默认输出到标准输出")
+    args = parser.parse_args(argv)
+
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    else:
+        config = default_config()
+
+    summary = asyncio.run(run_load_test(
+        args.base_url,
+        args.sessions,
+        args.concurrency,
+        config,
+        stream_protocol=args.stream_protocol,
+        clients=args.clients,
+        ramp_up=args.ramp_up,
+        same_text=args.same_text,
+        timeout=args.timeout,
+    ))
+
+    output = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
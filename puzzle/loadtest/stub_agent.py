@@ -0,0 +1,93 @@
+"""
+压测用的桩 agent
+
+与 api.agent_service.run_main_agent 签名相同，不调用模型和搜索引擎，
+按真实核查过程的事件顺序、间隔和数据大小产生事件，用于压测 SSE 服务本身。
+
+以 STUB_AGENT=true 启动服务时，service 使用该桩代替真实的 agent：
+    STUB_AGENT=true gunicorn -c gunicorn.conf.py api.app:app
+
+每个事件的数据中带有产生时间 emitted_at，压测客户端据此计算事件延迟。
+"""
+
+import os
+import time
+import random
+import asyncio
+from typing import AsyncIterator, List, Tuple
+
+from api.model import CreateAgentConfig
+from api.events import SSEFrame, encode_event
+from api.check_point_delta import StreamProtocol
+
+
+# 事件间隔的缩放系数，1 为接近真实核查的节奏（一次核查约 2 分钟），0.1 为 10 倍速
+STUB_AGENT_TIME_SCALE = float(os.getenv("STUB_AGENT_TIME_SCALE", "1.0"))
+# 核查点的检索步骤数量，决定检索相关事件重复的次数
+STUB_AGENT_RETRIEVAL_STEPS = int(os.getenv("STUB_AGENT_RETRIEVAL_STEPS", "3"))
+
+# (事件, 距上一个事件的秒数, 数据大小)
+PLANNING_TIMELINE: List[Tuple[str, float, int]] = [
+    ("check_if_news_text_start", 0.1, 0),
+    ("check_if_news_text_end", 2.0, 100),
+    ("extract_basic_metadata_start", 0.1, 0),
+    ("extract_basic_metadata_end", 4.0, 400),
+    ("extract_knowledge_start", 0.1, 0),
+    ("extract_knowledge_end", 3.0, 300),
+    ("retrieve_knowledge_start", 0.1, 0),
+    ("retrieve_knowledge_end", 8.0, 1500),
+    ("extract_check_point_start", 0.1, 0),
+    ("extract_check_point_end", 12.0, 3000),
+]
+
+RETRIEVAL_TIMELINE: List[Tuple[str, float, int]] = [
+    ("search_agent_start", 0.2, 600),
+    ("evaluate_current_status_start", 0.1, 0),
+    ("evaluate_current_status_end", 6.0, 1200),
+    ("tool_start", 0.1, 200),
+    # 网页全文等工具输出按 SSE_TOOL_OUTPUT_MAX_CHARS 截断后的大小
+    ("tool_end", 3.0, 8000),
+    ("evaluate_current_status_start", 0.1, 0),
+    ("evaluate_current_status_end", 6.0, 1200),
+    ("generate_answer_start", 0.1, 0),
+    ("generate_answer_end", 5.0, 1500),
+    ("evaluate_search_result_start", 0.1, 0),
+    ("evaluate_search_result_end", 6.0, 800),
+    ("llm_decision", 0.1, 200),
+]
+
+# 报告流式生成：首个 token 约 2 秒后到达，之后按增量推送
+REPORT_TIMELINE: List[Tuple[str, float, int]] = [
+    ("write_fact_check_report_start", 0.1, 0),
+    ("write_fact_check_report_delta", 2.0, 200),
+    *[("write_fact_check_report_delta", 0.7, 200)] * 19,
+    ("write_fact_check_report_end", 0.1, 4000),
+]
+
+
+def build_timeline(retrieval_steps: int = STUB_AGENT_RETRIEVAL_STEPS) -> List[Tuple[str, float, int]]:
+    return PLANNING_TIMELINE + RETRIEVAL_TIMELINE * retrieval_steps + REPORT_TIMELINE
+
+
+async def run_stub_agent(
+    news_text: str,
+    config: CreateAgentConfig,
+    thread_id: str,
+    stream_protocol: StreamProtocol = "snapshot",
+    resume: bool = False,
+) -> AsyncIterator[SSEFrame]:
+    # 同一个会话的间隔抖动固定，便于复现
+    rng = random.Random(thread_id)
+
+    for event, delay, size in build_timeline():
+        await asyncio.sleep(delay * STUB_AGENT_TIME_SCALE * rng.uniform(0.8, 1.2))
+
+        data = {"emitted_at": time.time()}
+        if event == "write_fact_check_report_end":
+            data.update(report="#" * size, verdict="false")
+        elif event == "write_fact_check_report_delta":
+            data.update(delta="#" * size, verdict=None)
+        elif size:
+            data["content"] = "x" * size
+
+        yield encode_event({"event": event, "data": data})
@@ -1,8 +1,20 @@
 # 模型包初始化文件
 from .qwen import ChatQwen
 from .gemini import ChatGemini
+from .registry import ModelRegistry, create_model_registry_from_env
+from .llm_cache import SQLiteLLMCache, create_llm_cache_from_env
+from .cascade import ModelCascade, cascade_stats
+from .failover import FailoverChatModel, failover_stats
 
 __all__ = [
     "ChatQwen",
-    "ChatGemini"
+    "ChatGemini",
+    "ModelRegistry",
+    "create_model_registry_from_env",
+    "SQLiteLLMCache",
+    "create_llm_cache_from_env",
+    "ModelCascade",
+    "cascade_stats",
+    "FailoverChatModel",
+    "failover_stats",
 ] 
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+模型级联
+
+search agent 的 evaluate_current_status 在每一轮检索循环中都会调用一次配置的模型，
+其中大部分只是 "调用下一次搜索" 这类简单的决定。级联模式下由同一提供商的轻量模型先尝试，
+输出无法解析、模型自评的置信度低或节点给出的其他条件成立时，再使用配置的模型重新调用。
+
+每个节点的尝试次数与各原因的升级次数记录在进程内共享的 cascade_stats 中，通过 /metrics 导出。
+"""
+
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+
+
+T = TypeVar("T")
+
+# 升级原因
+ESCALATE_PARSE_ERROR = "parse_error"
+
+
+class CascadeStats:
+    """各节点的级联尝试次数与升级次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._attempts: Dict[str, int] = defaultdict(int)
+        self._escalations: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, node: str, escalate_reason: Optional[str]) -> None:
+        with self._lock:
+            self._attempts[node] += 1
+            if escalate_reason is not None:
+                self._escalations[node][escalate_reason] += 1
+
+    def stats(self) -> Dict[str, float]:
+        """按 <节点>_attempts、<节点>_escalations、<节点>_escalation_rate、<节点>_escalations_<原因> 展开"""
+        with self._lock:
+            result: Dict[str, float] = {}
+            for node, attempts in self._attempts.items():
+                reasons = self._escalations.get(node, {})
+                escalations = sum(reasons.values())
+                result[f"{node}_attempts"] = attempts
+                result[f"{node}_escalations"] = escalations
+                result[f"{node}_escalation_rate"] = round(escalations / attempts, 4) if attempts else 0.0
+                for reason, count in reasons.items():
+                    result[f"{node}_escalations_{reason}"] = count
+            return result
+
+
+cascade_stats = CascadeStats()
+
+
+class ModelCascade(Generic[T]):
+    """
+    先由轻量模型尝试，不满足条件时升级到配置的模型
+
+    Args:
+        node: 记录统计使用的节点名称
+        light_model: 先尝试的轻量模型
+        model: 升级时使用的模型
+        parse: 将轻量模型的输出解析为结构化结果，无法解析时抛出 OutputParserException
+        should_escalate: 返回升级原因，不需要升级时返回 None
+        escalated_parse: 解析升级后模型输出的函数，默认与 parse 相同
+    """
+
+    def __init__(
+        self,
+        node: str,
+        light_model: BaseChatModel,
+        model: BaseChatModel,
+        parse: Callable[[BaseMessage], T],
+        should_escalate: Callable[[T], Optional[str]],
+        escalated_parse: Optional[Callable[[BaseMessage], T]] = None,
+        stats: CascadeStats = cascade_stats,
+    ):
+        self.node = node
+        self.light_model = light_model
+        self.model = model
+        self.parse = parse
+        self.should_escalate = should_escalate
+        self.escalated_parse = escalated_parse or parse
+        self.stats = stats
+
+    def invoke(self, messages: List[BaseMessage]) -> Tuple[List[BaseMessage], T]:
+        """
+        返回各次调用的模型输出及最终采用的解析结果
+
+        升级时模型输出依次为轻量模型与配置模型的输出，最后一个为采用的输出；
+        调用方统计 token 用量时两次调用都需要计入
+        """
+        light_response = self.light_model.invoke(messages)
+        try:
+            result = self.parse(light_response)
+            reason = self.should_escalate(result)
+        except OutputParserException:
+            reason = ESCALATE_PARSE_ERROR
+
+        self.stats.record(self.node, reason)
+        if reason is None:
+            return [light_response], result
+
+        # 配置的模型重新回答同样的问题，不参考轻量模型的输出
+        response = self.model.invoke(messages)
+        return [light_response, response], self.escalated_parse(response)
@@ -0,0 +1,272 @@
+"""
+模型故障转移与对冲请求
+
+提供商响应缓慢或出错时，整个 graph 会一直等待，直到 SSE 会话的心跳超时。
+FailoverChatModel 按顺序包装同一 agent 角色的多个模型：
+
+- 故障转移：请求在返回第一个结果（流式调用为第一个 chunk）之前出错时，改用列表中的下一个模型
+- 对冲请求：请求在该模型首个结果延迟的 p95 之后仍未返回时，向下一个模型再发出一个请求，
+  采用先返回的结果并取消另一个（流式调用在下一个 chunk 到达时关闭连接，非流式调用的结果被丢弃）
+
+延迟按模型在进程内统计，样本不足时不对冲。已经开始返回内容的流式调用出错时不再转移，直接抛出错误。
+
+bind_tools 与 with_structured_output 交给每个模型各自处理（不同提供商的工具与结构化输出格式可能不同），
+返回按顺序故障转移的 runnable；绑定后的调用只做故障转移，不做对冲。
+"""
+
+import time
+import queue
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import ConfigDict, Field
+
+
+def model_key(model: BaseChatModel) -> str:
+    """统计延迟使用的模型标识"""
+    name = getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+    return f"{model._llm_type}:{name}"
+
+
+class LatencyTracker:
+    """
+    按模型统计最近的首个结果延迟
+
+    Args:
+        window: 每个模型保留的最近样本数
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def percentile(self, key: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """最近样本的 q 分位数，样本数少于 min_samples 时返回 None"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class FailoverStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.failovers = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def increment(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "failovers": self.failovers,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+
+
+latency_tracker = LatencyTracker()
+failover_stats = FailoverStats()
+
+# 请求在线程中执行，控制线程只等待结果；被取消的非流式请求会在后台运行到结束
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-failover")
+
+
+class _Attempt:
+    def __init__(self, model: BaseChatModel):
+        self.model = model
+        self.started_at = time.perf_counter()
+        self.cancelled = threading.Event()
+
+
+class FailoverChatModel(BaseChatModel):
+    """
+    按顺序故障转移并对冲慢请求的模型包装
+
+    Args:
+        models: 按优先级排列的模型，第一个为配置的模型
+        hedge: 是否对冲慢请求
+        hedge_percentile: 触发对冲的延迟分位数
+        hedge_min_samples: 模型的延迟样本数达到该值后才会对冲
+        hedge_min_delay: 对冲前至少等待的秒数
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    models: List[BaseChatModel] = Field(min_length=1)
+    hedge: bool = False
+    hedge_percentile: float = 0.95
+    hedge_min_samples: int = 20
+    hedge_min_delay: float = 1.0
+    tracker: LatencyTracker = Field(default=latency_tracker, exclude=True)
+    stats: FailoverStats = Field(default=failover_stats, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "failover"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"models": [model_key(model) for model in self.models]}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable:
+        bound = [model.bind_tools(tools, **kwargs) for model in self.models]
+        return bound[0].with_fallbacks(bound[1:])
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> Runnable:  # type: ignore[override]
+        structured = [model.with_structured_output(schema, **kwargs) for model in self.models]
+        return structured[0].with_fallbacks(structured[1:])
+
+    def hedge_delay(self, model: BaseChatModel) -> Optional[float]:
+        """向下一个模型发出对冲请求前等待的秒数，不对冲时返回 None"""
+        if not self.hedge:
+            return None
+        latency = self.tracker.percentile(model_key(model), self.hedge_percentile, self.hedge_min_samples)
+        if latency is None:
+            return None
+        return max(self.hedge_min_delay, latency)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # 同时进行的请求不共享 run_manager，避免多个请求的 token 回调交错
+        def run(model: BaseChatModel, emit: Callable[[Any], None], cancelled: threading.Event) -> None:
+            emit(model._generate(messages, stop=stop, **kwargs))
+
+        for result in self._race(run):
+            return result
+        raise RuntimeError("Failover model returned no result")
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        def run(model: BaseChatModel, emit: Callable[[Any], None], cancelled: threading.Event) -> None:
+            stream = model._stream(messages, stop=stop, **kwargs)
+            try:
+                for chunk in stream:
+                    if cancelled.is_set():
+                        return
+                    emit(chunk)
+            finally:
+                stream.close()
+
+        for chunk in self._race(run):
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _race(
+        self, run: Callable[[BaseChatModel, Callable[[Any], None], threading.Event], None]
+    ) -> Iterator[Any]:
+        """
+        依次启动请求并返回最先开始返回结果的请求的所有结果
+
+        Args:
+            run: 在工作线程中执行一个模型的请求，通过 emit 逐个返回结果，cancelled 被设置时应尽快结束
+        """
+        self.stats.increment("calls")
+        events: "queue.Queue[Tuple[_Attempt, str, Any]]" = queue.Queue()
+        candidates = list(self.models)
+        in_flight: List[_Attempt] = []
+
+        def start(model: BaseChatModel) -> None:
+            attempt = _Attempt(model)
+            first = [True]
+
+            def emit(item: Any) -> None:
+                if first[0]:
+                    first[0] = False
+                    self.tracker.record(model_key(model), time.perf_counter() - attempt.started_at)
+                events.put((attempt, "item", item))
+
+            def target() -> None:
+                try:
+                    run(model, emit, attempt.cancelled)
+                    events.put((attempt, "done", None))
+                except Exception as e:
+                    events.put((attempt, "error", e))
+
+            in_flight.append(attempt)
+            _executor.submit(target)
+
+        start(candidates.pop(0))
+        winner: Optional[_Attempt] = None
+        try:
+            while winner is None:
+                timeout = None
+                if candidates and len(in_flight) == 1:
+                    delay = self.hedge_delay(in_flight[0].model)
+                    if delay is not None:
+                        timeout = max(0.0, in_flight[0].started_at + delay - time.perf_counter())
+
+                try:
+                    attempt, kind, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    # 当前请求超过了延迟分位数，对冲到下一个模型
+                    self.stats.increment("hedges")
+                    start(candidates.pop(0))
+                    continue
+
+                if kind == "error":
+                    self.stats.increment("errors")
+                    in_flight.remove(attempt)
+                    if in_flight:
+                        continue
+                    if not candidates:
+                        raise payload
+                    self.stats.increment("failovers")
+                    start(candidates.pop(0))
+                    continue
+
+                winner = attempt
+                if len(in_flight) > 1 and attempt is not in_flight[0]:
+                    self.stats.increment("hedge_wins")
+                for other in in_flight:
+                    if other is not winner:
+                        other.cancelled.set()
+                if kind == "done":
+                    return
+                yield payload
+
+            # 只读取胜出请求的后续结果
+            while True:
+                attempt, kind, payload = events.get()
+                if attempt is not winner:
+                    continue
+                if kind == "item":
+                    yield payload
+                elif kind == "done":
+                    return
+                else:
+                    raise payload
+        finally:
+            for attempt in in_flight:
+                attempt.cancelled.set()
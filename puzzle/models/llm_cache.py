@@ -0,0 +1,170 @@
+"""
+模型响应缓存
+
+temperature=0 时，相同模型、相同消息与工具定义的请求结果基本确定，例如 check_if_news_text、
+extract_basic_metadata、extract_knowledge 以及每个知识元的维基百科检索，相同或转载的新闻会重复发起这些请求。
+SQLiteLLMCache 实现 LangChain 的 BaseCache，挂载到模型实例的 cache 属性上，命中时不再请求模型。
+
+- key 为 LangChain 传入的 prompt（序列化后的消息）与 llm_string（模型名称、温度等参数，以及绑定的工具定义）
+- 消息中每次运行都会变化的 id 字段不参与 key 的计算
+- 条目超过 ttl 后失效，条目数超过 max_entries 时按最近访问时间淘汰
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+
+# 命中缓存的生成结果在 generation_info 中带有该标记，统计回调据此区分缓存命中与真实请求
+CACHE_HIT_FLAG = "llm_cache_hit"
+
+
+def _strip_message_ids(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: _strip_message_ids(v)
+            for k, v in value.items()
+            if not (k == "id" and not isinstance(v, list))
+        }
+    if isinstance(value, list):
+        return [_strip_message_ids(v) for v in value]
+    return value
+
+
+def make_cache_key(prompt: str, llm_string: str) -> str:
+    try:
+        # 序列化对象的 id 是类路径（列表），消息的 id 是字符串，只去掉后者
+        normalized = json.dumps(_strip_message_ids(json.loads(prompt)), ensure_ascii=False, sort_keys=True)
+    except (TypeError, ValueError):
+        normalized = prompt
+    return hashlib.sha256(f"{normalized}\n{llm_string}".encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    有大小上限和过期时间的 SQLite 模型响应缓存
+
+    Args:
+        path: SQLite 文件路径，":memory:" 表示只保存在内存中
+        ttl: 条目的有效秒数，0 表示不过期
+        max_entries: 最多保存的条目数
+    """
+
+    def __init__(self, path: str = "llm_cache.sqlite", ttl: float = 7 * 24 * 3600, max_entries: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        # agent 运行在多个线程中，共用一个连接并由锁保证串行访问
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = make_cache_key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._entries -= 1
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+
+        generations = loads(row[0])
+        for generation in generations:
+            generation.generation_info = {**(generation.generation_info or {}), CACHE_HIT_FLAG: True}
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = make_cache_key(prompt, llm_string)
+        value = dumps(list(return_val))
+        now = time.time()
+
+        with self._lock:
+            existed = self._conn.execute("SELECT 1 FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if not existed:
+                self._entries += 1
+            self._evict_locked(now)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._entries = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": self._entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict_locked(self, now: float) -> None:
+        if self.ttl:
+            expired = self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)
+            ).rowcount
+            self._entries -= expired
+
+        overflow = self._entries - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+            self._entries -= overflow
+            self.evictions += overflow
+
+
+def is_cache_hit(generations: Sequence[Any]) -> bool:
+    return any((getattr(g, "generation_info", None) or {}).get(CACHE_HIT_FLAG) for g in generations)
+
+
+def create_llm_cache_from_env() -> Optional[SQLiteLLMCache]:
+    """LLM_CACHE_ENABLED=true 时创建缓存，默认关闭"""
+    if os.getenv("LLM_CACHE_ENABLED", "false").lower() != "true":
+        return None
+    return SQLiteLLMCache(
+        path=os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite"),
+        ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000")),
+    )
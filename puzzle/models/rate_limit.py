@@ -0,0 +1,317 @@
+"""
+提供商级的请求调度
+
+每个会话都独立调用提供商，负载高时 DashScope、DeepSeek 等提供商会返回 429，
+而 openai 客户端对每个 429 各自重试，重试请求又会互相挤占配额。
+ProviderRateLimiter 在进程内所有会话之间共享，按提供商与 提供商:模型 两级限制：
+
+- max_concurrency：同时进行的请求数
+- rpm：每分钟请求数
+- tpm：每分钟 token 数（请求的输入 token 估算值加上输出上限）
+
+请求按到达顺序排队，只有排在所有相关队列最前面的请求可以在预算允许时发出。
+请求先在模型一级排队，模型的预算允许后才进入提供商一级的队列；被模型自身的暂停或预算挡住的请求
+离开提供商的队列，不会挡住同一提供商其他模型的请求。
+提供商返回 429 时按 Retry-After 暂停对应的模型，客户端的重试请求同样在队列中等待暂停结束。
+
+限流作用在模型注册表共享的 HTTP 客户端上（RateLimitedTransport），覆盖该提供商的所有模型实例。
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from utils.count_tokens import tokenizer
+
+
+# 统计时间窗口（秒）
+WINDOW_SECONDS = 60.0
+# 提供商没有给出 Retry-After 时暂停的秒数
+DEFAULT_RETRY_AFTER = 1.0
+# 请求没有设置 max_tokens 时为输出预留的 token 数
+DEFAULT_COMPLETION_TOKENS = 1024
+
+
+@dataclass
+class RateLimit:
+    max_concurrency: Optional[int] = None
+    rpm: Optional[int] = None
+    tpm: Optional[int] = None
+
+
+class _Budget:
+    """一个限流 key 的预算与等待队列"""
+
+    def __init__(self, limit: RateLimit):
+        self.limit = limit
+        self.in_flight = 0
+        self.throttled = 0
+        self.paused_until = 0.0
+        # (发出时间, token 数)
+        self.requests: Deque[Tuple[float, int]] = deque()
+        self.waiting: Deque[object] = deque()
+
+    def wait_time(self, tokens: int, now: float) -> Optional[float]:
+        """
+        还需要等待的秒数，0 表示可以发出，None 表示需要等待其他请求结束
+        """
+        if now < self.paused_until:
+            return self.paused_until - now
+
+        while self.requests and self.requests[0][0] + WINDOW_SECONDS <= now:
+            self.requests.popleft()
+
+        limit = self.limit
+        if limit.max_concurrency is not None and self.in_flight >= limit.max_concurrency:
+            return None
+        if limit.rpm is not None and len(self.requests) >= limit.rpm:
+            return self.requests[len(self.requests) - limit.rpm][0] + WINDOW_SECONDS - now
+
+        if limit.tpm is not None and self.requests:
+            # 单个请求超过 tpm 时，在窗口清空后单独发出
+            excess = sum(used for _, used in self.requests) + min(tokens, limit.tpm) - limit.tpm
+            if excess > 0:
+                # 等到足够多的请求移出窗口
+                for sent_at, used in self.requests:
+                    excess -= used
+                    if excess <= 0:
+                        return max(0.0, sent_at + WINDOW_SECONDS - now)
+        return 0.0
+
+
+class Lease:
+    """一次已发出的请求，结束时释放并发额度"""
+
+    def __init__(self, limiter: "ProviderRateLimiter", budgets: List[_Budget]):
+        self._limiter = limiter
+        self._budgets = budgets
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._limiter._release(self._budgets)
+
+
+class ProviderRateLimiter:
+    """
+    按提供商与模型限制并发、RPM 与 TPM 的进程级调度器
+
+    Args:
+        limits: key 为提供商名称（如 "qwen"）或 "提供商:模型"（如 "qwen:qwen-max"）
+    """
+
+    def __init__(self, limits: Dict[str, RateLimit]):
+        self.limits = limits
+        self._budgets: Dict[str, _Budget] = {}
+        self._cond = threading.Condition()
+        # 排队中的请求数；请求不一定进入了提供商一级的队列，因此单独计数
+        self._waiting = 0
+
+    def acquire(self, provider: str, model: Optional[str], tokens: int) -> Lease:
+        """阻塞到请求可以发出"""
+        ticket = object()
+        with self._cond:
+            # 从模型到提供商：只有在更具体的队列中排在最前且预算允许时，才进入下一级队列
+            budgets = [self._budget_locked(key) for key in reversed(self._keys(provider, model))]
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    timeout: Optional[float] = None
+                    ready = True
+                    for index, budget in enumerate(budgets):
+                        if ticket not in budget.waiting:
+                            budget.waiting.append(ticket)
+                        if budget.waiting[0] is not ticket:
+                            ready = False
+                            break
+                        wait = budget.wait_time(tokens, now)
+                        if wait != 0:
+                            ready = False
+                            timeout = wait
+                            # 被这一级挡住时离开更上级的队列，让出队首位置
+                            if self._leave_locked(ticket, budgets[index + 1:]):
+                                self._cond.notify_all()
+                            break
+                    if ready:
+                        break
+                    self._cond.wait(timeout)
+
+                for budget in budgets:
+                    budget.waiting.popleft()
+                    budget.in_flight += 1
+                    budget.requests.append((now, tokens))
+            except BaseException:
+                self._leave_locked(ticket, budgets)
+                raise
+            finally:
+                self._waiting -= 1
+                # 队首变化，下一个请求重新检查预算
+                self._cond.notify_all()
+        return Lease(self, budgets)
+
+    def pause(self, provider: str, model: Optional[str], seconds: float) -> None:
+        """提供商返回 429 后暂停该模型的请求"""
+        key = self._keys(provider, model)[-1]
+        with self._cond:
+            budget = self._budget_locked(key)
+            budget.throttled += 1
+            budget.paused_until = max(budget.paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        waiting（排队的请求数）、in_flight、throttled（429 次数），
+        以及按 key 展开的 <key>_waiting、<key>_in_flight、<key>_throttled
+        """
+        with self._cond:
+            result = {"waiting": self._waiting, "in_flight": 0, "throttled": 0}
+            for key, budget in self._budgets.items():
+                name = re.sub(r"\W", "_", key)
+                result[f"{name}_waiting"] = len(budget.waiting)
+                result[f"{name}_in_flight"] = budget.in_flight
+                result[f"{name}_throttled"] = budget.throttled
+                result["throttled"] += budget.throttled
+                # 每个发出的请求都计入提供商一级，只按提供商汇总
+                if ":" not in key:
+                    result["in_flight"] += budget.in_flight
+            return result
+
+    # internals
+    @staticmethod
+    def _keys(provider: str, model: Optional[str]) -> List[str]:
+        return [provider, f"{provider}:{model}"] if model else [provider]
+
+    def _budget_locked(self, key: str) -> _Budget:
+        budget = self._budgets.get(key)
+        if budget is None:
+            # 没有配置限制的 key 只用于记录 Retry-After 暂停
+            budget = self._budgets[key] = _Budget(self.limits.get(key, RateLimit()))
+        return budget
+
+    @staticmethod
+    def _leave_locked(ticket: object, budgets: List[_Budget]) -> bool:
+        """从队列中移除请求，返回是否有队列发生了变化"""
+        left = False
+        for budget in budgets:
+            if ticket in budget.waiting:
+                budget.waiting.remove(ticket)
+                left = True
+        return left
+
+    def _release(self, budgets: List[_Budget]) -> None:
+        with self._cond:
+            for budget in budgets:
+                budget.in_flight -= 1
+            self._cond.notify_all()
+
+
+def estimate_request(content: bytes) -> Tuple[Optional[str], int]:
+    """从 chat completions 请求体中读取模型名称，并估算请求占用的 token 数"""
+    try:
+        body = json.loads(content)
+    except (ValueError, UnicodeDecodeError):
+        return None, DEFAULT_COMPLETION_TOKENS
+    if not isinstance(body, dict):
+        return None, DEFAULT_COMPLETION_TOKENS
+
+    texts: List[str] = []
+    for message in body.get("messages") or []:
+        content_value = message.get("content") if isinstance(message, dict) else None
+        texts.append(content_value if isinstance(content_value, str) else json.dumps(content_value, ensure_ascii=False))
+    if body.get("tools"):
+        texts.append(json.dumps(body["tools"], ensure_ascii=False))
+    prompt_tokens = len(tokenizer.encode(" ".join(texts), disallowed_special=()))
+    completion_tokens = body.get("max_tokens") or body.get("max_completion_tokens") or DEFAULT_COMPLETION_TOKENS
+    return body.get("model"), prompt_tokens + int(completion_tokens)
+
+
+def parse_retry_after(headers: httpx.Headers) -> float:
+    """Retry-After（秒数或 HTTP 日期）以及 OpenAI 兼容接口的 retry-after-ms"""
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return DEFAULT_RETRY_AFTER
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """响应体读取完毕或被关闭时释放并发额度，流式响应在整个流结束后才释放"""
+
+    def __init__(self, stream: httpx.SyncByteStream, lease: Lease):
+        self._stream = stream
+        self._lease = lease
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._lease.release()
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """
+    在发出请求前向调度器申请额度的 HTTP transport
+
+    Args:
+        transport: 实际发送请求的 transport
+        limiter: 进程内共享的调度器
+        provider: 该 HTTP 客户端所属的提供商
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, limiter: ProviderRateLimiter, provider: str):
+        self._transport = transport
+        self._limiter = limiter
+        self._provider = provider
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        model, tokens = estimate_request(request.read())
+        lease = self._limiter.acquire(self._provider, model, tokens)
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            lease.release()
+            raise
+
+        if response.status_code == 429:
+            self._limiter.pause(self._provider, model, parse_retry_after(response.headers))
+        response.stream = _ReleasingStream(response.stream, lease)  # type: ignore[arg-type]
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def create_rate_limiter_from_env() -> Optional[ProviderRateLimiter]:
+    """
+    从 LLM_RATE_LIMITS 读取限制，如 {"qwen": {"max_concurrency": 10, "tpm": 1000000}, "qwen:qwen-max": {"rpm": 60}}，
+    未配置时不限流
+    """
+    raw: Dict[str, Any] = json.loads(os.getenv("LLM_RATE_LIMITS") or "{}")
+    if not raw:
+        return None
+    return ProviderRateLimiter({key: RateLimit(**value) for key, value in raw.items()})
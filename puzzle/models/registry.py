@@ -0,0 +1,108 @@
+"""
+模型实例注册表
+
+按 (provider, model, temperature, streaming) 缓存模型实例，同一提供商的所有实例共享同一个 HTTP 连接池，
+避免每个请求都重新创建 openai 客户端、丢弃连接池并重新与提供商建立 TLS 连接。
+配置了 LLM_RATE_LIMITS 时，共享的 HTTP 客户端经过进程级的调度器发出请求（见 models.rate_limit）。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import httpx
+from langchain_openai.chat_models.base import BaseChatOpenAI
+
+from .rate_limit import ProviderRateLimiter, RateLimitedTransport, create_rate_limiter_from_env
+
+
+ModelKey = Tuple[Hashable, ...]
+
+
+class ModelRegistry:
+    """
+    有界、线程安全的模型实例注册表
+
+    Args:
+        max_size: 最多缓存的模型实例数量，超出后按 LRU 淘汰
+        max_connections: 每个提供商共享连接池的最大连接数
+        rate_limiter: 所有提供商共享的请求调度器，None 表示不限流
+    """
+
+    def __init__(
+        self,
+        max_size: int = 32,
+        max_connections: int = 20,
+        rate_limiter: Optional[ProviderRateLimiter] = None,
+    ):
+        self.max_size = max_size
+        self.max_connections = max_connections
+        self.rate_limiter = rate_limiter
+        self._models: "OrderedDict[ModelKey, BaseChatOpenAI]" = OrderedDict()
+        # 同步客户端按提供商共享；agent 节点均为同步调用，
+        # 而 httpx.AsyncClient 会绑定到创建时的事件循环，每个 agent 线程都有独立的事件循环，因此不共享异步客户端
+        self._http_clients: Dict[str, httpx.Client] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: ModelKey, factory: Callable[[httpx.Client], BaseChatOpenAI]) -> BaseChatOpenAI:
+        """
+        获取模型实例，不存在时调用 factory 创建
+
+        Args:
+            key: 实例 key，第一个元素必须是提供商名称
+            factory: 接收共享 HTTP 客户端并返回模型实例的工厂函数
+        """
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+
+            self.misses += 1
+            http_client = self._get_http_client_locked(str(key[0]))
+            model = factory(http_client)
+
+            self._models[key] = model
+            while len(self._models) > self.max_size:
+                # 被淘汰的实例可能仍在被运行中的会话使用，共享的连接池不随之关闭
+                self._models.popitem(last=False)
+
+            return model
+
+    def _get_http_client_locked(self, provider: str) -> httpx.Client:
+        client = self._http_clients.get(provider)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            )
+            if self.rate_limiter is None:
+                client = httpx.Client(limits=limits, follow_redirects=True)
+            else:
+                # 传入 transport 时 httpx.Client 不再使用 limits 参数，连接池限制设置在内层 transport 上
+                transport = RateLimitedTransport(httpx.HTTPTransport(limits=limits), self.rate_limiter, provider)
+                client = httpx.Client(transport=transport, follow_redirects=True)
+            self._http_clients[provider] = client
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "http_clients": len(self._http_clients),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def create_model_registry_from_env() -> ModelRegistry:
+    """从环境变量读取注册表配置"""
+    return ModelRegistry(
+        max_size=int(os.getenv("MODEL_REGISTRY_MAX_SIZE", "32")),
+        max_connections=int(os.getenv("MODEL_HTTP_MAX_CONNECTIONS", "20")),
+        rate_limiter=create_rate_limiter_from_env(),
+    )
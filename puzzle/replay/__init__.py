@@ -0,0 +1,11 @@
+from .cassette import Cassette, CassetteMissError
+from .models import ReplayChatModel
+from .tools import ReplayTool, install_replay_tools
+
+__all__ = [
+    "Cassette",
+    "CassetteMissError",
+    "ReplayChatModel",
+    "ReplayTool",
+    "install_replay_tools",
+]
@@ -0,0 +1,277 @@
+"""
+离线基准测试
+
+录制一次真实运行的模型返回与工具输出，之后不需要 API key 和网络即可反复回放完整的 MainAgent.graph，
+回放走与线上相同的事件映射、SSE 序列化、checkpoint 与广播路径，结果确定，可用于性能分析和 CI 回归测试。
+
+命令行用法:
+    # 录制（需要真实的模型与搜索配置）
+    python -m replay.benchmark record cassette.json --config config.json --news-text "..."
+
+    # 回放
+    python -m replay.benchmark run cassette.json --runs 5 --profile replay.prof --check
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import cProfile
+import statistics
+from typing import Any, List, Optional
+
+from pydantic import BaseModel
+
+from agents.main.graph import MainAgent
+from agents.main.early_stop import create_early_stop_policy_from_env
+from agents.checkpointer import BoundedMemorySaver
+from api.model import CreateAgentConfig
+from api.events import SSEFrame, decode_frame_data
+from api.result_cache import InFlightRun
+from api.check_point_delta import StreamProtocol
+from api.agent_service import stream_agent_events, get_model_instance_from_provider, get_light_model_name
+from utils.telemetry import SessionMetrics
+from .cassette import Cassette
+from .models import ReplayChatModel
+from .tools import install_replay_tools
+
+
+class BenchmarkRun(BaseModel):
+    run: int
+    build_time: float
+    wall_time: float
+    frames: int
+    frame_bytes: int
+    verdict: Optional[str] = None
+    error: Optional[str] = None
+    misses: List[str] = []
+    metrics: Optional[SessionMetrics] = None
+
+
+class BenchmarkSummary(BaseModel):
+    runs: int
+    wall_time_mean: float
+    wall_time_p50: float
+    wall_time_max: float
+    build_time_mean: float
+    frames: int
+    frame_bytes: int
+    verdict: Optional[str] = None
+    expected_verdict: Optional[str] = None
+    failed_runs: int
+    results: List[BenchmarkRun]
+
+
+class _CountingSubscriber:
+    """代替 SSESession 挂载到 InFlightRun 上，只统计收到的帧"""
+
+    def __init__(self):
+        self.is_queued = False
+        self.is_interrupted = False
+        self.frames = 0
+
+    def add_event(self, frame: SSEFrame) -> None:
+        self.frames += 1
+
+    def close(self) -> None:
+        pass
+
+
+def build_replay_agent(
+    config: CreateAgentConfig,
+    cassette: Cassette,
+    record: bool = False,
+    checkpointer: Any = None,
+) -> MainAgent:
+    """创建使用录制/回放模型与工具的 main agent，参数与线上的 build_main_agent 一致"""
+
+    def replay_model(agent_config: Any) -> ReplayChatModel:
+        delegate = None
+        if record:
+            delegate = get_model_instance_from_provider(
+                agent_config.model_provider,
+                agent_config.model_name,
+                agent_config.temperature,
+                agent_config.streaming,
+            )
+        return ReplayChatModel(
+            model=agent_config.model_name,
+            api_key="replay",
+            temperature=agent_config.temperature,
+            streaming=agent_config.streaming,
+            cassette=cassette,
+            delegate=delegate,
+        )
+
+    light_model_name = get_light_model_name(
+        config.searcher.model_provider, config.searcher.model_name, "searcher"
+    ) if config.searcher.cascade else None
+
+    main_agent = MainAgent(
+        model=replay_model(config.main_agent),
+        metadata_extract_model=replay_model(config.metadata_extractor),
+        search_model=replay_model(config.searcher),
+        max_retries=config.main_agent.max_retries,
+        verify_batch_size=config.main_agent.verify_batch_size,
+        early_stop_policy=create_early_stop_policy_from_env() if config.main_agent.early_stop else None,
+        max_search_tokens=config.searcher.max_search_tokens,
+        selected_tools=config.searcher.selected_tools,
+        search_light_model=replay_model(config.searcher.model_copy(update={"model_name": light_model_name}))
+        if light_model_name else None,
+        checkpointer=checkpointer,
+    )
+    install_replay_tools(main_agent, cassette, record)
+    # 录制与回放都需要完整的知识元检索与检索过程，不使用知识元定义缓存与核查点索引
+    main_agent.metadata_extract_agent.knowledge_store = None
+    main_agent.claim_index = None
+    return main_agent
+
+
+async def run_once(
+    cassette: Cassette,
+    config: CreateAgentConfig,
+    run: int = 0,
+    record: bool = False,
+    stream_protocol: StreamProtocol = "snapshot",
+    subscribers: int = 1,
+) -> BenchmarkRun:
+    """运行一次完整的核查，返回耗时与事件统计"""
+    if not record:
+        cassette.rewind()
+
+    thread_id = f"replay-{run}"
+    checkpointer = BoundedMemorySaver()
+
+    build_started_at = time.perf_counter()
+    main_agent = build_replay_agent(config, cassette, record, checkpointer)
+    build_time = time.perf_counter() - build_started_at
+
+    flight = InFlightRun(key=thread_id, job_id=thread_id)
+    for _ in range(subscribers):
+        flight.attach(_CountingSubscriber())  # type: ignore[arg-type]
+
+    result = BenchmarkRun(run=run, build_time=round(build_time, 4), wall_time=0, frames=0, frame_bytes=0)
+    started_at = time.perf_counter()
+    async for frame in stream_agent_events(
+        main_agent, cassette.news_text, config, thread_id, stream_protocol
+    ):
+        flight.publish(frame)
+        result.frames += 1
+        result.frame_bytes += len(frame.message.encode("utf-8"))
+
+        if frame.event == "write_fact_check_report_end":
+            result.verdict = (decode_frame_data(frame) or {}).get("verdict")
+        elif frame.event == "session_summary":
+            result.metrics = SessionMetrics(**decode_frame_data(frame))
+        elif frame.event == "error":
+            result.error = (decode_frame_data(frame) or {}).get("message")
+
+    result.wall_time = round(time.perf_counter() - started_at, 4)
+    result.misses = list(cassette.misses)
+    flight.close()
+    checkpointer.release_thread(thread_id, finished=True)
+    return result
+
+
+def record(cassette_path: str, config: CreateAgentConfig, news_text: str) -> BenchmarkRun:
+    """使用真实模型与工具运行一次并保存录制文件"""
+    cassette = Cassette(path=cassette_path, news_text=news_text, config=config.model_dump())
+    result = asyncio.run(run_once(cassette, config, record=True))
+    cassette.verdict = result.verdict
+    cassette.save()
+    return result
+
+
+def benchmark(
+    cassette: Cassette,
+    runs: int = 5,
+    stream_protocol: StreamProtocol = "snapshot",
+    subscribers: int = 1,
+) -> BenchmarkSummary:
+    """回放 runs 次并汇总结果"""
+    config = CreateAgentConfig(**cassette.config)
+
+    async def run_all() -> List[BenchmarkRun]:
+        return [
+            await run_once(cassette, config, run, stream_protocol=stream_protocol, subscribers=subscribers)
+            for run in range(runs)
+        ]
+
+    results = asyncio.run(run_all())
+    wall_times = [result.wall_time for result in results]
+    failed_runs = [
+        result for result in results
+        if result.error or result.misses or (cassette.verdict and result.verdict != cassette.verdict)
+    ]
+
+    return BenchmarkSummary(
+        runs=runs,
+        wall_time_mean=round(statistics.mean(wall_times), 4),
+        wall_time_p50=round(statistics.median(wall_times), 4),
+        wall_time_max=round(max(wall_times), 4),
+        build_time_mean=round(statistics.mean(result.build_time for result in results), 4),
+        frames=results[-1].frames,
+        frame_bytes=results[-1].frame_bytes,
+        verdict=results[-1].verdict,
+        expected_verdict=cassette.verdict,
+        failed_runs=len(failed_runs),
+        results=results,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="录制并离线回放核查过程，用于性能分析和回归测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="使用真实模型与工具运行一次并保存录制文件")
+    record_parser.add_argument("cassette", help="录制文件路径")
+    record_parser.add_argument("--config", required=True, help="CreateAgentConfig 的 JSON 文件")
+    news_group = record_parser.add_mutually_exclusive_group(required=True)
+    news_group.add_argument("--news-text", help="新闻文本")
+    news_group.add_argument("--news-file", help="新闻文本文件")
+
+    run_parser = subparsers.add_parser("run", help="离线回放录制文件")
+    run_parser.add_argument("cassette", help="录制文件路径")
+    run_parser.add_argument("--runs", type=int, default=5, help="回放次数")
+    run_parser.add_argument("--stream-protocol", choices=["snapshot", "delta"], default="snapshot")
+    run_parser.add_argument("--subscribers", type=int, default=1, help="每次运行挂载的订阅者数量")
+    run_parser.add_argument("--profile", help="将 cProfile 结果写入该文件")
+    run_parser.add_argument("--output", help="结果 JSON 文件，默认输出到标准输出")
+    run_parser.add_argument("--check", action="store_true", help="有运行出错、缺少录制数据或结论与录制不一致时返回非零状态")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = CreateAgentConfig(**json.load(f))
+        if args.news_file:
+            with open(args.news_file, "r", encoding="utf-8") as f:
+                news_text = f.read().strip()
+        else:
+            news_text = args.news_text
+        result = record(args.cassette, config, news_text)
+        print(result.model_dump_json(indent=2, exclude={"metrics"}))
+        return 1 if result.error else 0
+
+    cassette = Cassette.load(args.cassette)
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    summary = benchmark(cassette, args.runs, args.stream_protocol, args.subscribers)
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+
+    output = summary.model_dump_json(indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    return 1 if args.check and summary.failed_runs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
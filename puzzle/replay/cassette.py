@@ -0,0 +1,189 @@
+"""
+录制文件（cassette）
+
+按请求内容记录真实运行中的模型返回与工具输出，回放时按相同的请求内容取回：
+- 请求 key 为规范化后的请求内容的哈希，规范化时会去掉每次运行都会变化的 UUID（核查点与检索步骤 id），
+  以及 prompt 中的当前时间（各 prompt 模块在导入时写入精确到秒的时间，每个进程都不同）
+- 相同 key 的多次请求按录制顺序依次返回，并行执行的节点（如知识元检索）不依赖调用顺序
+"""
+
+import re
+import json
+import hashlib
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict
+
+
+# 2：请求 key 不再包含时间戳
+CASSETTE_VERSION = 2
+
+UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE)
+# get_current_time 的输出格式，如 "2025-03-21 08:30:00 星期五 UTC+0000"
+TIMESTAMP_PATTERN = re.compile(
+    r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?: 星期[一二三四五六日])?(?: [A-Za-z]*[+-]\d{4})?"
+)
+
+
+class CassetteMissError(KeyError):
+    """回放时找不到对应的录制数据"""
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return TIMESTAMP_PATTERN.sub("<time>", UUID_PATTERN.sub("<uuid>", value))
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _digest(payload: Any) -> str:
+    text = json.dumps(_normalize(payload), ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def llm_request_key(messages: Sequence[BaseMessage], **kwargs: Any) -> str:
+    """模型请求的 key：消息内容与工具调用，以及绑定的工具和输出格式"""
+    tools = kwargs.get("tools") or []
+    response_format = kwargs.get("response_format")
+    payload = {
+        "messages": [
+            {
+                "type": message.type,
+                "content": message.content,
+                "tool_calls": [
+                    {"name": call["name"], "args": call["args"]}
+                    for call in getattr(message, "tool_calls", None) or []
+                ],
+            }
+            for message in messages
+        ],
+        "tools": [
+            tool.get("function", {}).get("name", tool.get("name")) if isinstance(tool, dict) else str(tool)
+            for tool in tools
+        ],
+        "tool_choice": kwargs.get("tool_choice"),
+        "response_format": getattr(response_format, "__name__", response_format),
+    }
+    return _digest(payload)
+
+
+def tool_request_key(name: str, args: Dict[str, Any]) -> str:
+    return _digest({"name": name, "args": args})
+
+
+class Cassette:
+    """
+    一次核查运行的录制数据
+
+    Args:
+        path: 录制文件路径
+        news_text: 录制时核查的新闻文本
+        config: 录制时使用的 agent 配置（CreateAgentConfig 的 dict）
+        verdict: 录制时得到的核查结论，回放时用于检查结果是否一致
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        news_text: str = "",
+        config: Optional[Dict[str, Any]] = None,
+        verdict: Optional[str] = None,
+    ):
+        self.path = path
+        self.news_text = news_text
+        self.config = config or {}
+        self.verdict = verdict
+        self.llm: List[Dict[str, Any]] = []
+        self.tools: List[Dict[str, Any]] = []
+        self.misses: List[str] = []
+
+        self._llm_index: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._tool_index: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    # recording
+    def record_llm(self, key: str, messages: Sequence[BaseMessage], response: BaseMessage) -> None:
+        last_content = str(messages[-1].content) if messages else ""
+        with self._lock:
+            self.llm.append({
+                "key": key,
+                # 只保存最后一条消息的开头，便于排查回放失败的请求
+                "preview": last_content[:200],
+                "message": message_to_dict(response),
+            })
+
+    def record_tool(self, key: str, name: str, args: Dict[str, Any], output: Any) -> None:
+        try:
+            json.dumps(output, ensure_ascii=False)
+        except TypeError:
+            output = str(output)
+        with self._lock:
+            self.tools.append({"key": key, "name": name, "args": args, "output": output})
+
+    # replaying
+    def rewind(self) -> None:
+        """重置回放位置，同一份录制可以回放多次"""
+        with self._lock:
+            self._llm_index = defaultdict(deque)
+            for entry in self.llm:
+                self._llm_index[entry["key"]].append(entry)
+            self._tool_index = defaultdict(deque)
+            for entry in self.tools:
+                self._tool_index[entry["key"]].append(entry)
+            self.misses = []
+
+    def next_llm(self, key: str, preview: str = "") -> AIMessage:
+        entry = self._pop(self._llm_index, key, f"llm request {key[:12]} ({preview[:80]!r})")
+        return messages_from_dict([entry["message"]])[0]  # type: ignore[return-value]
+
+    def next_tool(self, key: str, name: str) -> Any:
+        return self._pop(self._tool_index, key, f"tool call {name} {key[:12]}")["output"]
+
+    def _pop(self, index: Dict[str, Deque[Dict[str, Any]]], key: str, description: str) -> Dict[str, Any]:
+        with self._lock:
+            entries = index.get(key)
+            if entries:
+                # 最后一条保留，相同请求超出录制次数时重复返回最后一次的结果
+                return entries.popleft() if len(entries) > 1 else entries[0]
+            self.misses.append(description)
+        raise CassetteMissError(f"No recorded response for {description}")
+
+    # persistence
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        if not path:
+            raise ValueError("Cassette path is not set")
+        with self._lock:
+            data = {
+                "version": CASSETTE_VERSION,
+                "news_text": self.news_text,
+                "config": self.config,
+                "verdict": self.verdict,
+                "llm": self.llm,
+                "tools": self.tools,
+            }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version: {data.get('version')}")
+
+        cassette = cls(
+            path=path,
+            news_text=data["news_text"],
+            config=data.get("config"),
+            verdict=data.get("verdict"),
+        )
+        cassette.llm = data["llm"]
+        cassette.tools = data["tools"]
+        cassette.rewind()
+        return cassette
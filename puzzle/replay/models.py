@@ -0,0 +1,140 @@
+"""
+录制与回放模型调用
+
+ReplayChatModel 继承 BaseChatOpenAI，可以直接传给各个 agent：
+- 录制：设置 delegate 为真实模型，转发请求并把返回写入 cassette
+- 回放：不设置 delegate，按请求内容从 cassette 取回返回，不访问网络
+"""
+
+import json
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from pydantic import ConfigDict, Field
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_openai.chat_models.base import BaseChatOpenAI
+
+from .cassette import Cassette, llm_request_key
+
+# 回放流式调用时，每个 chunk 的最大字符数
+REPLAY_CHUNK_CHARS = 64
+
+
+class ReplayChatModel(BaseChatOpenAI):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    cassette: Cassette = Field(exclude=True)
+    delegate: Optional[BaseChatModel] = Field(default=None, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat"
+
+    # sync
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = llm_request_key(messages, **kwargs)
+
+        if self.delegate is not None:
+            result = self.delegate._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self.cassette.record_llm(key, messages, result.generations[0].message)
+            return result
+
+        message = self.cassette.next_llm(key, str(messages[-1].content) if messages else "")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        key = llm_request_key(messages, **kwargs)
+
+        if self.delegate is not None:
+            merged: Optional[ChatGenerationChunk] = None
+            for chunk in self.delegate._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                merged = chunk if merged is None else merged + chunk
+                yield chunk
+            if merged is not None:
+                self.cassette.record_llm(key, messages, message_chunk_to_message(merged.message))
+            return
+
+        message = self.cassette.next_llm(key, str(messages[-1].content) if messages else "")
+        for chunk in _split_message(message):
+            if run_manager:
+                run_manager.on_llm_new_token(str(chunk.message.content), chunk=chunk)
+            yield chunk
+
+    # async
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = llm_request_key(messages, **kwargs)
+
+        if self.delegate is not None:
+            result = await self.delegate._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            self.cassette.record_llm(key, messages, result.generations[0].message)
+            return result
+
+        message = self.cassette.next_llm(key, str(messages[-1].content) if messages else "")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        key = llm_request_key(messages, **kwargs)
+
+        if self.delegate is not None:
+            merged: Optional[ChatGenerationChunk] = None
+            async for chunk in self.delegate._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                merged = chunk if merged is None else merged + chunk
+                yield chunk
+            if merged is not None:
+                self.cassette.record_llm(key, messages, message_chunk_to_message(merged.message))
+            return
+
+        message = self.cassette.next_llm(key, str(messages[-1].content) if messages else "")
+        for chunk in _split_message(message):
+            if run_manager:
+                await run_manager.on_llm_new_token(str(chunk.message.content), chunk=chunk)
+            yield chunk
+
+
+def _split_message(message: AIMessage) -> List[ChatGenerationChunk]:
+    """把录制的完整返回拆成流式 chunk：工具调用放在第一个 chunk，用量放在最后一个 chunk"""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    pieces = [content[i:i + REPLAY_CHUNK_CHARS] for i in range(0, len(content), REPLAY_CHUNK_CHARS)] or [""]
+    tool_call_chunks = [
+        {"name": call["name"], "args": json.dumps(call["args"], ensure_ascii=False), "id": call["id"], "index": index}
+        for index, call in enumerate(message.tool_calls)
+    ]
+
+    chunks = []
+    for index, piece in enumerate(pieces):
+        is_first, is_last = index == 0, index == len(pieces) - 1
+        chunks.append(ChatGenerationChunk(message=AIMessageChunk(
+            content=piece,
+            additional_kwargs=message.additional_kwargs if is_first else {},
+            tool_call_chunks=tool_call_chunks if is_first else [],
+            usage_metadata=message.usage_metadata if is_last else None,
+            response_metadata=message.response_metadata if is_last else {},
+            id=message.id,
+        )))
+    return chunks
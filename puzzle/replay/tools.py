@@ -0,0 +1,57 @@
+"""
+录制与回放工具调用
+
+ReplayTool 保留被包装工具的名称、描述和参数 schema，模型看到的工具定义与线上一致
+"""
+
+from typing import Any, Dict, Optional
+
+from pydantic import ConfigDict, Field
+from langchain_core.tools import BaseTool
+
+from agents.main.graph import MainAgent
+from .cassette import Cassette, tool_request_key
+
+
+class ReplayTool(BaseTool):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    cassette: Cassette = Field(exclude=True)
+    delegate: Optional[BaseTool] = Field(default=None, exclude=True)
+
+    def _run(self, *args: Any, run_manager: Any = None, **kwargs: Any) -> Any:
+        tool_args: Dict[str, Any] = dict(kwargs)
+        if args:
+            tool_args["__args__"] = list(args)
+        key = tool_request_key(self.name, tool_args)
+
+        if self.delegate is not None:
+            # 直接调用 run 而不是 invoke，不继承当前的回调配置，录制时不会多出一组嵌套的工具事件
+            output = self.delegate.run(args[0] if args and not kwargs else kwargs)
+            self.cassette.record_tool(key, self.name, tool_args, output)
+            return output
+
+        return self.cassette.next_tool(key, self.name)
+
+
+def wrap_tool(tool: BaseTool, cassette: Cassette, record: bool) -> ReplayTool:
+    return ReplayTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        cassette=cassette,
+        delegate=tool if record else None,
+    )
+
+
+def install_replay_tools(main_agent: MainAgent, cassette: Cassette, record: bool = False) -> None:
+    """把 main agent 下各子 agent 的工具替换为录制/回放工具"""
+    search_agent = main_agent.search_agent
+    search_agent.tools = [wrap_tool(tool, cassette, record) for tool in search_agent.tools]
+    search_agent.tools_by_name = {tool.name: tool for tool in search_agent.tools}
+
+    metadata_extract_agent = main_agent.metadata_extract_agent
+    metadata_extract_agent.tools = [wrap_tool(tool, cassette, record) for tool in metadata_extract_agent.tools]
+    metadata_extract_agent.model_with_tools = metadata_extract_agent.model.bind_tools(
+        tools=metadata_extract_agent.tools
+    )
@@ -0,0 +1,71 @@
+"""
+Shared fixtures for the tests
+"""
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from agents.main.graph import MainAgent
+from agents.metadata_extractor.graph import MetadataExtractAgentGraph
+from agents.searcher.graph import SearchAgentGraph
+from api.model import CreateAgentConfig, MainAgentConfig, MetadataExtractorConfig, SearcherConfig
+
+
+class FakeToolChatModel(FakeListChatModel):
+    """可以绑定工具的 FakeListChatModel，子 agent 创建时会调用 bind_tools"""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def make_agent_config() -> CreateAgentConfig:
+    """不校验模型名称的核查配置，跨进程的测试脚本也通过 tests.conftest 导入"""
+    return CreateAgentConfig.model_construct(
+        main_agent=MainAgentConfig.model_construct(model_name="m", model_provider="p", max_retries=1),
+        metadata_extractor=MetadataExtractorConfig.model_construct(model_name="m", model_provider="p"),
+        searcher=SearcherConfig.model_construct(
+            model_name="m", model_provider="p", max_search_tokens=6000, selected_tools=[]
+        ),
+    )
+
+
+@pytest.fixture
+def agent_config() -> CreateAgentConfig:
+    return make_agent_config()
+
+
+@pytest.fixture
+def tool_keys(monkeypatch):
+    # 默认工具在创建时检查 API key，测试不会发出请求
+    for name in ("GOOGLE_SEARCH_API_KEY", "GOOGLE_CX_ID", "TAVILY_API_KEY"):
+        monkeypatch.setenv(name, "test")
+
+
+@pytest.fixture
+def make_main_agent(tool_keys):
+    """通过构造函数创建 MainAgent，子 agent 使用不会被调用的假模型"""
+    def make(model=None, **kwargs) -> MainAgent:
+        kwargs.setdefault("selected_tools", [])
+        return MainAgent(
+            model=model or FakeToolChatModel(responses=[]),
+            metadata_extract_model=FakeToolChatModel(responses=[]),
+            search_model=FakeToolChatModel(responses=[]),
+            **kwargs,
+        )
+    return make
+
+
+@pytest.fixture
+def make_search_agent(tool_keys):
+    """通过构造函数创建 SearchAgentGraph"""
+    def make(model=None, **kwargs) -> SearchAgentGraph:
+        kwargs.setdefault("max_search_tokens", 100000)
+        return SearchAgentGraph(model=model or FakeToolChatModel(responses=[]), **kwargs)
+    return make
+
+
+@pytest.fixture
+def make_metadata_agent():
+    """通过构造函数创建 MetadataExtractAgentGraph"""
+    def make(model=None, **kwargs) -> MetadataExtractAgentGraph:
+        return MetadataExtractAgentGraph(model=model or FakeToolChatModel(responses=[]), **kwargs)
+    return make
@@ -0,0 +1,36 @@
+"""
+Test for the batch fact-check runner
+"""
+import asyncio
+
+from api import service
+from api.batch import BatchRun
+
+
+def test_batch_dedup_and_errors(monkeypatch, agent_config):
+    calls = []
+
+    async def fake_run_main_agent(news_text, config, thread_id, stream_protocol="snapshot", resume=False):
+        calls.append(news_text)
+        await asyncio.sleep(0.05)
+        if news_text == "bad":
+            yield {"event": "error", "data": {"message": "boom"}}
+            return
+        yield {"event": "write_fact_check_report_end", "data": {"report": f"report {news_text}", "verdict": "false"}}
+
+    monkeypatch.setattr(service, "run_main_agent", fake_run_main_agent)
+
+    batch_run = BatchRun(["batch a", "batch b", " batch  a ", "bad"], agent_config, max_concurrency=2)
+    results = {r.index: r for r in batch_run.results()}
+
+    assert sorted(results) == [0, 1, 2, 3]
+    # 规范化后相同的文本只核查一次
+    assert sorted(calls) == ["bad", "batch a", "batch b"]
+    assert results[2].duplicate_of == 0
+    assert results[2].report == "report batch a"
+    assert results[3].status == "error" and results[3].error == "boom"
+
+    # 第二个批次命中结果缓存
+    cached = list(BatchRun(["batch b"], agent_config).results())
+    assert cached[0].cached and cached[0].verdict == "false"
+    assert len(calls) == 3
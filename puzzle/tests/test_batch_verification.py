@@ -0,0 +1,92 @@
+"""
+Test for batched verification of retrieval results
+"""
+import json
+from typing import List
+
+from langchain_core.messages import AIMessage
+
+from agents.main.states import (
+    CheckPoint, FactCheckPlanState, RetrievalResult, RetrievalResultVerifications, RetrievalStep,
+)
+from agents.metadata_extractor.states import BasicMetadata, MetadataState
+from api.agent_service import map_graph_event
+
+
+class _ScriptedModel:
+    def __init__(self, responses: List[dict]):
+        self.responses = responses
+        self.prompts: List[str] = []
+
+    def invoke(self, messages):
+        self.prompts.append(messages[0].content)
+        return AIMessage(content=json.dumps(self.responses.pop(0)))
+
+
+def _state() -> FactCheckPlanState:
+    steps = [RetrievalStep(id=f"s{i}", purpose=f"purpose {i}", expected_source="官方网站") for i in range(3)]
+    return FactCheckPlanState(
+        news_text="news",
+        metadata=MetadataState(news_text="news", basic_metadata=BasicMetadata(news_type="政治新闻")),
+        check_points=[CheckPoint(id="cp", content="claim", is_verification_point=True, retrieval_step=steps)],
+    )
+
+
+def _with_result(state: FactCheckPlanState) -> FactCheckPlanState:
+    """模拟 invoke_search_agent 完成当前检索任务"""
+    step = state.check_points[0].retrieval_step[state.current_retrieval_task_index]  # type: ignore[index]
+    step.result = RetrievalResult(
+        check_point_id="cp", retrieval_step_id=step.id, summary=f"summary {step.id}", conclusion="c",
+    )
+    return state.model_copy(update={"retries": state.retries + 1})
+
+
+def test_batched_verification_with_per_step_fallback_and_retry(make_main_agent):
+    model = _ScriptedModel([
+        # 批量复核遗漏了 s2
+        {"items": [
+            {"retrieval_step_id": "s0", "reasoning": "ok", "verified": True},
+            {"retrieval_step_id": "s1", "reasoning": "weak", "verified": False, "updated_purpose": "new purpose"},
+        ]},
+        {"reasoning": "ok", "verified": True},
+        {"reasoning": "still weak", "verified": False},
+    ])
+    agent = make_main_agent(model, verify_batch_size=3)
+
+    state = _state()
+    for expected_index in (1, 2):
+        output = agent.evaluate_search_result(_with_result(state))
+        assert output["retrieval_decision"] == "defer" and output["current_retrieval_task_index"] == expected_index
+        state = state.model_copy(update=output)
+    assert not model.prompts
+
+    output = agent.evaluate_search_result(_with_result(state))
+    assert len(model.prompts) == 2 and "summary s0" in model.prompts[0] and "summary s2" in model.prompts[0]
+    assert output["retrieval_decision"] == "retry"
+    assert output["retry_queue"] == [1] and output["current_retrieval_task_index"] == 1
+    steps = output["check_points"][0].retrieval_step
+    assert [step.verification.verified for step in steps] == [True, False, True]
+    assert steps[1].purpose == "new purpose"
+
+    # s1 重试后仍未通过，超过最大重试次数，回到批量复核之后的进度，没有更多任务时完成检索
+    state = state.model_copy(update=output)
+    output = agent.evaluate_search_result(_with_result(state))
+    assert len(model.prompts) == 3
+    assert output["retrieval_decision"] == "finish" and output["retry_queue"] == []
+
+
+def test_batch_size_one_keeps_per_step_verification(make_main_agent):
+    model = _ScriptedModel([{"reasoning": "ok", "verified": True}])
+    agent = make_main_agent(model, verify_batch_size=1)
+
+    output = agent.evaluate_search_result(_with_result(_state()))
+    assert output["retrieval_decision"] == "continue" and output["current_retrieval_task_index"] == 1
+    assert len(model.prompts) == 1
+
+
+def test_batched_verification_event():
+    output = RetrievalResultVerifications.model_validate(
+        {"items": [{"retrieval_step_id": "s0", "reasoning": "ok", "verified": True}]}
+    )
+    event = map_graph_event("on_parser_end", "PydanticOutputParser", "evaluate_search_result", {"output": output})
+    assert event is not None and event.event == "evaluate_search_results_end"
@@ -0,0 +1,92 @@
+"""
+Test for the light-model cascade of the search agent
+"""
+import json
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from agents.metadata_extractor.states import BasicMetadata
+from agents.searcher.graph import SearchAgentGraph
+from agents.searcher.prompts import evaluate_current_status_strict_output_parser
+from agents.searcher.states import SearchAgentState, Status
+from api import agent_service
+from models.cascade import CascadeStats, ModelCascade
+
+
+def _status(action, confidence="high") -> str:
+    return json.dumps({"evaluation": "e", "next_step": "n", "action": action, "confidence": confidence})
+
+
+SEARCH = {"name": "search_baidu", "args": {"query": "q"}, "id": None, "type": "tool_call"}
+
+
+def _cascade(agent: SearchAgentGraph, light_outputs, stats):
+    return ModelCascade(
+        node="evaluate_current_status",
+        light_model=FakeListChatModel(responses=light_outputs),
+        model=FakeListChatModel(responses=[_status(SEARCH)] * len(light_outputs)),
+        parse=lambda message: evaluate_current_status_strict_output_parser.parse(str(message.content)),
+        should_escalate=agent._should_escalate_status,
+        stats=stats,
+    )
+
+
+def test_cascade_escalates_and_records_rates(make_search_agent):
+    stats = CascadeStats()
+    light_outputs = [
+        _status(SEARCH),  # 采用轻量模型的输出
+        _status("answer"),
+        _status(SEARCH, "low"),
+        _status({**SEARCH, "name": "unknown_tool"}),
+        "not json",
+    ]
+    cascade = _cascade(make_search_agent(), light_outputs, stats)
+
+    invocations = [cascade.invoke([]) for _ in light_outputs]
+    results = [result for _, result in invocations]
+    assert all(isinstance(result, Status) for result in results)
+    # 升级时返回两次调用的输出，最后一个为采用的输出
+    assert [len(responses) for responses, _ in invocations] == [1, 2, 2, 2, 2]
+    assert invocations[1][0][0].content == _status("answer")
+    assert results[1].action != "answer"  # 升级后采用配置模型的输出
+
+    assert stats.stats() == {
+        "evaluate_current_status_attempts": 5,
+        "evaluate_current_status_escalations": 4,
+        "evaluate_current_status_escalation_rate": 0.8,
+        "evaluate_current_status_escalations_answer": 1,
+        "evaluate_current_status_escalations_low_confidence": 1,
+        "evaluate_current_status_escalations_invalid_tool": 1,
+        "evaluate_current_status_escalations_parse_error": 1,
+    }
+
+
+def test_escalation_counts_tokens_of_both_calls(make_search_agent):
+    state = SearchAgentState(
+        check_point_id="1",
+        retrieval_step_id="s",
+        basic_metadata=BasicMetadata(news_type="科技"),
+        content="c",
+        purpose="p",
+        expected_source="e",
+    )
+
+    def usage(output, light_output=None):
+        agent = make_search_agent(
+            FakeListChatModel(responses=[output]),
+            light_model=FakeListChatModel(responses=[light_output]) if light_output else None,
+        )
+        agent.evaluate_current_status(state)
+        return agent.token_usage
+
+    # 升级时轻量模型与配置模型的调用都计入 token 用量
+    assert usage(_status(SEARCH), light_output=_status("answer")) == usage(_status(SEARCH)) + usage(_status("answer"))
+
+
+def test_light_model_name(monkeypatch):
+    monkeypatch.setitem(agent_service.MODEL_CONFIGS, "providers", {"qwen": {"light_models": ["qwen-turbo", "qwen-lite"]}})
+    monkeypatch.setitem(agent_service.MODEL_CONFIGS, "agent_restrictions", {"searcher": {"excluded": ["qwen-turbo"]}})
+
+    assert agent_service.get_light_model_name("qwen", "qwen-max", "searcher") == "qwen-lite"
+    assert agent_service.get_light_model_name("qwen", "qwen-lite", "searcher") is None
+    assert agent_service.get_light_model_name("openai", "gpt-4o", "searcher") is None
@@ -0,0 +1,67 @@
+"""
+Test for the delta encoding of check point updates
+"""
+from agents.main.states import CheckPoint, RetrievalStep, RetrievalResult, RetrievalResultVerification
+from api.check_point_delta import CheckPointTracker
+
+
+def _check_points():
+    return [
+        CheckPoint(
+            id="cp1",
+            content="statement",
+            is_verification_point=True,
+            retrieval_step=[
+                RetrievalStep(id="s1", purpose="p1", expected_source="e1"),
+                RetrievalStep(id="s2", purpose="p2", expected_source="e2"),
+            ],
+        )
+    ]
+
+
+def test_diff_only_changed_fields():
+    check_points = _check_points()
+    tracker = CheckPointTracker()
+    tracker.snapshot(check_points)
+
+    assert tracker.diff(check_points) == []
+
+    # 节点原地更新检索步骤
+    step = check_points[0].retrieval_step[0]
+    step.result = RetrievalResult(
+        check_point_id="cp1", retrieval_step_id="s1", summary="s", conclusion="c"
+    )
+    patches = tracker.diff(check_points)
+    assert len(patches) == 1
+    assert (patches[0].op, patches[0].retrieval_step_id, patches[0].path) == ("replace", "s1", "result")
+
+    step.verification = RetrievalResultVerification(reasoning="r", verified=False)
+    step.purpose = "p1 updated"
+    patches = tracker.diff(check_points)
+    assert {p.path for p in patches} == {"verification", "purpose"}
+
+    # 已发送过的内容不会重复发送
+    assert tracker.diff(check_points) == []
+
+
+def test_new_step_is_added():
+    check_points = _check_points()
+    tracker = CheckPointTracker()
+    tracker.snapshot(check_points)
+
+    check_points[0].retrieval_step.append(RetrievalStep(id="s3", purpose="p3", expected_source="e3"))
+    patches = tracker.diff(check_points)
+    assert [(p.op, p.retrieval_step_id) for p in patches] == [("add", "s3")]
+
+
+def test_skipped_step_is_sent():
+    check_points = _check_points()
+    tracker = CheckPointTracker()
+    tracker.snapshot(check_points)
+
+    # 提前结束策略跳过剩余的检索步骤
+    check_points[0].retrieval_step[1].skipped = "verdict already decided"
+    patches = tracker.diff(check_points)
+    assert [(p.op, p.retrieval_step_id, p.path, p.value) for p in patches] == [
+        ("replace", "s2", "skipped", "verdict already decided")
+    ]
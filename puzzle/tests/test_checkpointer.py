@@ -0,0 +1,94 @@
+"""
+Test for the checkpointer backend selection
+"""
+import asyncio
+
+import pytest
+from langgraph.checkpoint.memory import MemorySaver
+
+from agents.checkpointer import BoundedMemorySaver, open_checkpointer, get_memory_saver
+
+
+custom_saver = MemorySaver()
+
+
+def custom_factory():
+    return custom_saver
+
+
+async def _open():
+    async with open_checkpointer() as checkpointer:
+        return checkpointer
+
+
+def test_memory_backend_is_shared(monkeypatch):
+    monkeypatch.setenv("CHECKPOINTER_BACKEND", "memory")
+    assert asyncio.run(_open()) is get_memory_saver()
+    assert asyncio.run(_open()) is asyncio.run(_open())
+
+
+def test_custom_backend(monkeypatch):
+    monkeypatch.setenv("CHECKPOINTER_BACKEND", f"{__name__}:custom_factory")
+    assert asyncio.run(_open()) is custom_saver
+
+
+def test_unknown_backend(monkeypatch):
+    monkeypatch.setenv("CHECKPOINTER_BACKEND", "redis")
+    with pytest.raises(ValueError):
+        asyncio.run(_open())
+
+
+def _run_counter_graph(saver, thread_id: str, steps: int = 5):
+    from typing import TypedDict
+    from langgraph.graph import StateGraph, START, END
+
+    class State(TypedDict):
+        count: int
+        payload: str
+
+    def step(state: State):
+        return {"count": state["count"] + 1, "payload": "x" * 1000}
+
+    def route(state: State):
+        return END if state["count"] >= steps else "step"
+
+    builder = StateGraph(State)
+    builder.add_node("step", step)
+    builder.add_edge(START, "step")
+    builder.add_conditional_edges("step", route)
+    graph = builder.compile(checkpointer=saver)
+    graph.invoke({"count": 0, "payload": ""}, {"configurable": {"thread_id": thread_id}})
+    return graph
+
+
+def test_bounded_memory_saver_keeps_latest_checkpoint():
+    saver = BoundedMemorySaver()
+    graph = _run_counter_graph(saver, "t1")
+
+    config = {"configurable": {"thread_id": "t1"}}
+    assert graph.get_state(config).values["count"] == 5
+    assert len(list(saver.list(config))) == 1
+    assert saver.stats()["bytes"] > 0
+
+    saver.release_thread("t1", finished=True)
+    assert saver.stats() == {"threads": 0, "bytes": 0, "max_bytes": saver.max_bytes, "evicted_threads": 0}
+    assert not saver.blobs and not saver.writes
+
+
+def test_bounded_memory_saver_evicts_lru_and_released_threads():
+    saver = BoundedMemorySaver(max_bytes=0, inactive_ttl=0)
+    _run_counter_graph(saver, "t1")
+    per_thread = saver.stats()["bytes"]
+
+    saver.max_bytes = int(per_thread * 2.5)
+    _run_counter_graph(saver, "t2")
+    _run_counter_graph(saver, "t3")
+    assert saver.stats()["threads"] == 2
+    assert saver.get_tuple({"configurable": {"thread_id": "t1"}}) is None
+    assert saver.evicted_threads == 1
+
+    # 中断的会话超过 inactive_ttl 后被淘汰
+    saver.release_thread("t2", finished=False)
+    _run_counter_graph(saver, "t4")
+    assert saver.get_tuple({"configurable": {"thread_id": "t2"}}) is None
+    assert saver.get_tuple({"configurable": {"thread_id": "t3"}}) is not None
@@ -0,0 +1,101 @@
+"""
+Test for the cross-session claim index and retrieval result reuse
+"""
+import time
+
+from agents.main.claim_index import ClaimIndex, negations, shingles
+from agents.main.states import CheckPoint, FactCheckPlanState, RetrievalResult, RetrievalStep
+from agents.metadata_extractor.states import BasicMetadata, MetadataState
+from agents.searcher.states import Evidence
+from api.agent_service import map_graph_event
+
+
+CLAIM = "美国国会于2024年3月通过了新的F-1学生签证法案，要求留学生每年重新申请签证。"
+REWORDED = "美国国会在2024年3月通过新的F-1学生签证法案，要求留学生每年重新申请签证"
+PURPOSE = "查找美国国会关于F-1签证法案的官方记录"
+
+
+def _result() -> RetrievalResult:
+    return RetrievalResult(
+        check_point_id="old-cp",
+        retrieval_step_id="old-step",
+        summary="国会网站没有相关法案",
+        conclusion="该说法不实",
+        evidences=[Evidence(
+            content="congress.gov 上没有相关法案",
+            source={"Congress.gov": "https://www.congress.gov"},
+            reasoning="官方记录不存在",
+            relationship="contradict",
+        )],
+    )
+
+
+def test_claim_index_matches_reworded_claims():
+    assert "美 国" in shingles("美国，国会") and "f 1" in shingles("F-1 Visa")
+
+    index = ClaimIndex(path=":memory:", windows={"突发": 0.05})
+    index.add(CLAIM, PURPOSE, "政治新闻", _result())
+
+    match = index.lookup(REWORDED, PURPOSE, "政治新闻", "cp", "step")
+    assert match is not None and match.similarity >= 0.7
+    assert match.matched_content == CLAIM
+    assert match.result.reused and match.result.retrieval_step_id == "step"
+    assert match.result.evidences[0].relationship == "contradict"
+
+    # 不同的说法、数字不同或检索目的不同时不复用
+    assert index.lookup(CLAIM.replace("2024", "2023"), PURPOSE, "政治新闻", "cp", "step") is None
+    assert index.lookup("欧盟议会通过了新的数字市场法案，要求科技公司开放应用商店。", PURPOSE, "政治新闻", "cp", "step") is None
+    assert index.lookup(CLAIM, "查找留学生对法案的评论与采访", "政治新闻", "cp", "step") is None
+
+    # 时效性强的新闻类型使用更短的复用窗口
+    time.sleep(0.1)
+    assert index.lookup(CLAIM, PURPOSE, "突发新闻", "cp", "step") is None
+    assert index.stats() == {"entries": 1, "hits": 1, "misses": 4}
+
+
+def test_claim_index_rejects_opposite_polarity():
+    assert negations("He didn’t sign it") == negations("He did not sign it") == ["not"]
+
+    index = ClaimIndex(path=":memory:")
+    index.add(CLAIM, PURPOSE, "政治新闻", _result())
+    negated = CLAIM.replace("通过了", "没有通过")
+    assert index.lookup(negated, PURPOSE, "政治新闻", "cp", "step") is None
+
+    index.add(negated, PURPOSE, "政治新闻", _result())
+    match = index.lookup(negated.rstrip("。"), PURPOSE, "政治新闻", "cp", "step")
+    assert match is not None and match.matched_content == negated
+
+
+class _FailingSearchAgent:
+    @property
+    def graph(self):
+        raise AssertionError("search agent should not run")
+
+
+def test_invoke_search_agent_reuses_indexed_result(make_main_agent):
+    index = ClaimIndex(path=":memory:")
+    index.add(CLAIM, PURPOSE, "政治新闻", _result())
+
+    agent = make_main_agent(claim_index=index)
+    agent.search_agent = _FailingSearchAgent()  # type: ignore[assignment]
+
+    state = FactCheckPlanState(
+        news_text="news",
+        metadata=MetadataState(news_text="news", basic_metadata=BasicMetadata(news_type="政治新闻")),
+        check_points=[CheckPoint(
+            id="cp",
+            content=REWORDED,
+            is_verification_point=True,
+            retrieval_step=[RetrievalStep(id="step", purpose=PURPOSE, expected_source="官方网站")],
+        )],
+    )
+    output = agent.invoke_search_agent(state)
+
+    result = output["check_points"][0].retrieval_step[0].result
+    assert result.reused and result.conclusion == "该说法不实"
+    assert output["retries"] == 1
+
+    match = agent.reuse_retrieval_result(agent._get_current_retrieval_task(state))  # type: ignore[arg-type]
+    event = map_graph_event("on_chain_end", "reuse_retrieval_result", "invoke_search_agent", {"output": match})
+    assert event is not None and event.event == "reuse_retrieval_result"
+    assert map_graph_event("on_chain_end", "reuse_retrieval_result", "invoke_search_agent", {"output": None}) is None
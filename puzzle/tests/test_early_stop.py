@@ -0,0 +1,85 @@
+"""
+Test for early termination of retrieval once the verdict is decided
+"""
+import json
+from typing import Callable, List, Optional
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agents.main.early_stop import EarlyStopPolicy
+from agents.main.graph import MainAgent
+from agents.main.states import CheckPoint, FactCheckPlanState, RetrievalResult, RetrievalStep
+from agents.metadata_extractor.states import BasicMetadata, MetadataState
+from agents.searcher.states import Evidence
+
+
+class _VerifyingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return AIMessage(content=json.dumps({"reasoning": "ok", "verified": True}))
+
+
+def _check_point(id: str, priority: Optional[str]) -> CheckPoint:
+    return CheckPoint(
+        id=id, content=f"claim {id}", is_verification_point=True, priority=priority,  # type: ignore[arg-type]
+        retrieval_step=[RetrievalStep(id=f"{id}-s", purpose="p", expected_source="官方网站")],
+    )
+
+
+def _contradicted(state: FactCheckPlanState, relationship: str = "contradict") -> FactCheckPlanState:
+    step = state.check_points[0].retrieval_step[0]  # type: ignore[index]
+    step.result = RetrievalResult(
+        check_point_id=state.check_points[0].id, retrieval_step_id=step.id, summary="s", conclusion="不实",
+        evidences=[Evidence(
+            content="官方通报否认", source={"官网": "https://www.gov.cn/a"}, reasoning="r", relationship=relationship,  # type: ignore[arg-type]
+        )],
+    )
+    return state.model_copy(update={"retries": 1})
+
+
+@pytest.fixture
+def make_agent(make_main_agent) -> Callable[[Optional[EarlyStopPolicy]], MainAgent]:
+    return lambda policy: make_main_agent(_VerifyingModel(), early_stop_policy=policy)
+
+
+def _state(check_points: List[CheckPoint]) -> FactCheckPlanState:
+    return FactCheckPlanState(
+        news_text="news",
+        metadata=MetadataState(news_text="news", basic_metadata=BasicMetadata(news_type="社会新闻")),
+        check_points=check_points,
+    )
+
+
+def test_skips_low_priority_steps_after_decisive_contradiction(make_agent):
+    state = _contradicted(_state([_check_point("a", "high"), _check_point("b", "low"), _check_point("c", "high")]))
+    output = make_agent(EarlyStopPolicy()).evaluate_search_result(state)
+
+    assert output["retrieval_decision"] == "continue" and output["current_retrieval_task_index"] == 2
+    skipped = [cp.retrieval_step[0].skipped for cp in output["check_points"]]
+    assert skipped[0] is None and skipped[2] is None and "claim a" in skipped[1]
+
+    # 剩余的检索步骤全部被跳过时直接撰写报告
+    state = _contradicted(_state([_check_point("a", "high"), _check_point("b", "medium")]))
+    output = make_agent(EarlyStopPolicy()).evaluate_search_result(state)
+    assert output["retrieval_decision"] == "early_stop"
+
+    check_points, _ = state.model_copy(update={"check_points": output["check_points"]}).serialize_check_points_for_report()
+    assert check_points[1]["retrieval_step"][0]["skipped"]
+
+
+def test_no_early_stop_without_policy_or_decisive_result(make_agent):
+    check_points = lambda: [_check_point("a", "high"), _check_point("b", "low")]  # noqa: E731
+
+    output = make_agent(None).evaluate_search_result(_contradicted(_state(check_points())))
+    assert output["retrieval_decision"] == "continue" and output["current_retrieval_task_index"] == 1
+
+    output = make_agent(EarlyStopPolicy()).evaluate_search_result(_contradicted(_state(check_points()), "support"))
+    assert output["retrieval_decision"] == "continue"
+    assert output["check_points"][1].retrieval_step[0].skipped is None
+
+    output = make_agent(EarlyStopPolicy(min_sources=2)).evaluate_search_result(_contradicted(_state(check_points())))
+    assert output["retrieval_decision"] == "continue"
@@ -0,0 +1,125 @@
+"""
+Test for SSE frame serialization, tool output truncation and graph event mapping
+"""
+import json
+
+import pytest
+from langchain_core.runnables.utils import _RootEventFilter
+
+from api import agent_service
+from api.events import ToolEnd, ToolEndData, TaskComplete, encode_event
+from api.agent_service import EVENT_INCLUDE_NAMES, EVENT_INCLUDE_TYPES, map_graph_event, truncate_tool_output
+
+
+def _frame_data(message: str):
+    event_line, data_line, *_ = message.split("\n")
+    return event_line[len("event: "):], json.loads(data_line[len("data: "):])
+
+
+def test_encode_event():
+    frame = encode_event(ToolEnd(data=ToolEndData(tool_name="search_baidu", output_str="中文")))
+    assert frame.event == "tool_end"
+    assert frame.message.endswith("\n\n")
+    assert "中文" in frame.message
+    assert _frame_data(frame.message) == ("tool_end", {"tool_name": "search_baidu", "output_str": "中文"})
+
+    # 没有 data 的事件与字典形式的事件
+    assert _frame_data(encode_event(TaskComplete()).message) == ("task_complete", {})
+    assert _frame_data(encode_event({"event": "agent_start", "data": {"message": "hi"}}).message) == (
+        "agent_start",
+        {"message": "hi"},
+    )
+
+    # 已经是帧时原样返回
+    assert encode_event(frame) is frame
+
+
+def test_truncate_tool_output():
+    assert truncate_tool_output("short", max_chars=100) == "short"
+    assert truncate_tool_output("x" * 1000, max_chars=0) == "x" * 1000
+
+    text = truncate_tool_output("x" * 1000, max_chars=100)
+    assert text.startswith("x" * 100)
+    assert "900" in text
+
+    # JSON 输出截断后仍然可以被前端解析
+    results = [{"title": f"t{i}", "snippet": "y" * 2000} for i in range(20)]
+    truncated = truncate_tool_output(json.dumps(results), max_chars=3000)
+    parsed = json.loads(truncated)
+    assert len(truncated) <= 3000
+    assert 0 < len(parsed) < 20
+    assert parsed[0]["title"] == "t0"
+
+
+# 原来 elif 分支处理的所有事件：(kind, name, node, run_type) -> 应匹配的 EVENT_HANDLERS 条目
+BASELINE_EVENTS = [
+    (("on_chain_start", "check_if_news_text", "check_if_news_text", "chain"), ("on_chain_start", "check_if_news_text", None)),
+    (("on_chain_end", "check_if_news_text", "check_if_news_text", "chain"), ("on_chain_end", "check_if_news_text", None)),
+    *[
+        ((kind, name, "invoke_metadata_extract_agent", "chain"), (kind, name, "invoke_metadata_extract_agent"))
+        for kind in ("on_chain_start", "on_chain_end")
+        for name in ("extract_basic_metadata", "extract_knowledge", "retrieve_knowledge")
+    ],
+    (("on_chain_start", "extract_check_point", "extract_check_point", "chain"), ("on_chain_start", "extract_check_point", None)),
+    (("on_chain_end", "extract_check_point", "extract_check_point", "chain"), ("on_chain_end", "extract_check_point", None)),
+    (("on_chain_start", "__start__", "invoke_search_agent", "chain"), ("on_chain_start", "__start__", "invoke_search_agent")),
+    *[
+        ((kind, name, "invoke_search_agent", "chain"), (kind, name, "invoke_search_agent"))
+        for kind in ("on_chain_start", "on_chain_end")
+        for name in ("evaluate_current_status", "generate_answer")
+    ],
+    (("on_chain_start", "evaluate_search_result", "evaluate_search_result", "chain"), ("on_chain_start", "evaluate_search_result", None)),
+    (("on_parser_end", "SafeParse", "evaluate_search_result", "parser"), ("on_parser_end", None, "evaluate_search_result")),
+    (("on_chain_end", "should_retry_or_continue", "evaluate_search_result", "chain"), ("on_chain_end", "should_retry_or_continue", None)),
+    (("on_chain_start", "write_fact_check_report", "write_fact_check_report", "chain"), ("on_chain_start", "write_fact_check_report", None)),
+    (("on_chain_end", "write_fact_check_report", "write_fact_check_report", "chain"), ("on_chain_end", "write_fact_check_report", None)),
+    (("on_tool_start", "search_baidu", "invoke_search_agent", "tool"), ("on_tool_start", None, None)),
+    (("on_tool_end", "read_webpage", "invoke_search_agent", "tool"), ("on_tool_end", None, None)),
+]
+
+
+@pytest.fixture
+def matched_handler(monkeypatch):
+    """将每个事件构造函数替换为返回自身 key 的函数，map_graph_event 返回匹配到的条目"""
+    monkeypatch.setattr(agent_service, "EVENT_HANDLERS", {
+        key: (lambda key: lambda name, data: key)(key) for key in agent_service.EVENT_HANDLERS
+    })
+    return lambda kind, name, node: map_graph_event(kind, name, node, {})
+
+
+@pytest.mark.parametrize("event, handler_key", BASELINE_EVENTS)
+def test_baseline_events_are_subscribed_and_mapped(event, handler_key, matched_handler):
+    kind, name, node, run_type = event
+    # astream_events 按 include_names 或 include_types 其中之一订阅事件
+    event_filter = _RootEventFilter(include_names=EVENT_INCLUDE_NAMES, include_types=EVENT_INCLUDE_TYPES)
+    assert event_filter.include_event({"event": kind, "name": name}, run_type)  # type: ignore[arg-type]
+    assert matched_handler(kind, name, node) == handler_key
+
+
+def test_node_specific_entries_take_precedence(monkeypatch, matched_handler):
+    # 节点限定的条目不匹配其他节点中的同名事件
+    assert matched_handler("on_chain_start", "extract_basic_metadata", "other_node") is None
+    assert matched_handler("on_parser_end", "SafeParse", "check_if_news_text") is None
+
+    monkeypatch.setitem(agent_service.EVENT_HANDLERS, ("on_chain_start", None, "invoke_search_agent"), lambda name, data: "wildcard")
+    assert matched_handler("on_chain_start", "evaluate_current_status", "invoke_search_agent") == (
+        "on_chain_start", "evaluate_current_status", "invoke_search_agent"
+    )
+    assert matched_handler("on_chain_start", "reuse_retrieval_result", "invoke_search_agent") == "wildcard"
+
+
+def test_unsubscribed_events_are_filtered():
+    event_filter = _RootEventFilter(include_names=EVENT_INCLUDE_NAMES, include_types=EVENT_INCLUDE_TYPES)
+    assert not event_filter.include_event({"event": "on_chat_model_stream", "name": "ChatOpenAI"}, "chat_model")  # type: ignore[arg-type]
+    assert not event_filter.include_event({"event": "on_chain_stream", "name": "LangGraph"}, "chain")  # type: ignore[arg-type]
+
+
+def test_map_graph_event_builds_events():
+    event = map_graph_event("on_chain_start", "check_if_news_text", "check_if_news_text", {})
+    assert event is not None and event.event == "check_if_news_text_start"
+
+    event = map_graph_event("on_tool_start", "search_baidu", "invoke_search_agent", {"input": {"query": "新闻"}})
+    assert event is not None and event.event == "tool_start"
+    assert json.loads(event.data.input_str) == {"query": "新闻"}
+
+    assert map_graph_event("on_chain_start", "unknown_node", "", {}) is None
@@ -0,0 +1,76 @@
+"""
+Test for evidence canonicalization, deduplication and id-referenced prompts
+"""
+import json
+
+from agents.main.states import CheckPoint, FactCheckPlanState, RetrievalResult, RetrievalStep
+from agents.searcher.evidence_store import EvidenceStore, canonicalize_url, merge_evidences, serialize_statuses_for_llm
+from agents.searcher.prompts import evaluate_current_status_output_parser
+from agents.searcher.states import Evidence, Status
+
+
+QUOTE = "国家统计局数据显示，2024年全国粮食总产量达到14130亿斤，比上年增长1.6%。"
+
+
+def _evidence(content: str, url: str, name: str = "统计局") -> Evidence:
+    return Evidence(content=content, source={name: url}, reasoning="官方数据", relationship="support")
+
+
+def test_canonicalize_url():
+    assert canonicalize_url("http://WWW.Stats.gov.cn/sj/zxfb/?utm_source=x&spm=1#top") == "https://stats.gov.cn/sj/zxfb"
+    assert canonicalize_url("https://www.google.com/url?q=https%3A%2F%2Fwww.stats.gov.cn%2Fsj%2F&sa=U") == "https://stats.gov.cn/sj"
+    assert canonicalize_url("https://example.com/a?b=2&a=1") == "https://example.com/a?a=1&b=2"
+
+
+def test_merge_evidences_collapses_duplicates_with_stable_ids():
+    first = _evidence(QUOTE, "https://www.stats.gov.cn/sj/zxfb/")
+    evidences = merge_evidences([], [first])
+    evidence_id = evidences[0].id
+    assert evidence_id and evidence_id.startswith("ev_")
+
+    evidences = merge_evidences(evidences, [
+        # 相同来源（跟踪参数不同）的相同片段
+        _evidence(QUOTE, "http://stats.gov.cn/sj/zxfb?utm_source=weibo"),
+        # 百度跳转链接中的相同片段，只有标点不同
+        _evidence(QUOTE.replace("，", ",").replace("。", ""), "http://www.baidu.com/link?url=abc", "百度"),
+        # 同一来源中包含该片段的更长片段
+        _evidence(QUOTE + "其中夏粮产量2990亿斤。", "https://stats.gov.cn/sj/zxfb"),
+        _evidence("世界粮农组织预计全球谷物产量将创新高。", "https://www.fao.org/news"),
+    ])
+
+    assert len(evidences) == 2
+    merged = evidences[0]
+    assert merged.id == evidence_id
+    assert merged.content.endswith("其中夏粮产量2990亿斤。")
+    assert list(merged.source.values()) == ["https://stats.gov.cn/sj/zxfb", "https://baidu.com/link?url=abc"]
+
+    # 再次合并时 id 保持不变
+    assert [e.id for e in merge_evidences(evidences, [first])] == [e.id for e in evidences]
+
+
+def test_prompts_reference_evidence_by_id():
+    schema = json.loads(evaluate_current_status_output_parser.get_format_instructions().split("```")[1])
+    assert "id" not in schema["$defs"]["Evidence"]["properties"]
+
+    evidence = _evidence(QUOTE, "https://www.stats.gov.cn/sj/zxfb/")
+    store = EvidenceStore(merge_evidences([], [evidence]))
+    status = Status(new_evidence=[evidence], evaluation="ok", next_step="answer", action="answer")
+    serialized = serialize_statuses_for_llm([status], store)
+    assert "new_evidence" not in serialized[0] and serialized[0]["new_evidence_ids"] == [store.items()[0].id]
+
+    result = RetrievalResult(
+        check_point_id="cp", retrieval_step_id="s1", summary="s", conclusion="c",
+        evidences=merge_evidences([], [evidence]),
+    )
+    state = FactCheckPlanState(news_text="news", check_points=[CheckPoint(
+        id="cp", content="claim", is_verification_point=True,
+        retrieval_step=[
+            RetrievalStep(id="s1", purpose="p1", expected_source="e", result=result),
+            RetrievalStep(id="s2", purpose="p2", expected_source="e", result=result.model_copy(update={"retrieval_step_id": "s2"})),
+        ],
+    )])
+    check_points, evidences = state.serialize_check_points_for_report()
+    assert len(evidences) == 1
+    steps = check_points[0]["retrieval_step"]
+    assert steps[0]["result"]["evidence_ids"] == steps[1]["result"]["evidence_ids"] == [evidences[0]["id"]]
+    assert json.dumps(check_points, ensure_ascii=False).count(QUOTE) == 0
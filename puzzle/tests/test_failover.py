@@ -0,0 +1,146 @@
+"""
+Test for LLM failover and hedged requests
+"""
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from api import agent_service
+from api.model import MetadataExtractorConfig
+from models.failover import FailoverChatModel, FailoverStats, LatencyTracker
+
+
+class FakeProviderModel(BaseChatModel):
+    model_name: str
+    reply: str = "ok"
+    delay: float = 0.0
+    fail: bool = False
+    calls: int = 0
+    chunks_sent: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-provider"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.model_name} unavailable")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.model_name} unavailable")
+        for char in self.reply:
+            self.chunks_sent += 1
+            yield ChatGenerationChunk(message=AIMessageChunk(content=char))
+            time.sleep(0.01)
+
+
+def _failover(models, **kwargs) -> FailoverChatModel:
+    return FailoverChatModel(models=models, tracker=LatencyTracker(), stats=FailoverStats(), **kwargs)
+
+
+def test_fails_over_to_next_model():
+    primary = FakeProviderModel(model_name="primary", fail=True)
+    backup = FakeProviderModel(model_name="backup", reply="from backup")
+    model = _failover([primary, backup])
+
+    assert model.invoke([HumanMessage(content="hi")]).content == "from backup"
+    assert "".join(str(chunk.content) for chunk in model.stream([HumanMessage(content="hi")])) == "from backup"
+    assert model.stats.stats()["failovers"] == 2
+    assert model.stats.stats()["errors"] == 2
+
+
+def test_raises_last_error_when_all_models_fail():
+    model = _failover([
+        FakeProviderModel(model_name="primary", fail=True),
+        FakeProviderModel(model_name="backup", fail=True),
+    ])
+    try:
+        model.invoke([HumanMessage(content="hi")])
+    except ConnectionError as e:
+        assert "backup" in str(e)
+    else:
+        raise AssertionError("expected ConnectionError")
+
+
+def test_hedges_slow_request_after_latency_percentile():
+    primary = FakeProviderModel(model_name="primary", reply="slow", delay=1.0)
+    backup = FakeProviderModel(model_name="backup", reply="fast")
+    model = _failover([primary, backup], hedge=True, hedge_min_samples=5, hedge_min_delay=0.05)
+
+    # 样本不足时不对冲
+    assert model.hedge_delay(primary) is None
+    for _ in range(5):
+        model.tracker.record("fake-provider:primary", 0.1)
+    assert model.hedge_delay(primary) == 0.1
+
+    started = time.perf_counter()
+    assert model.invoke([HumanMessage(content="hi")]).content == "fast"
+    assert time.perf_counter() - started < 0.8
+    stats = model.stats.stats()
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+
+    # 流式调用采用先返回第一个 chunk 的请求，另一个请求在下一个 chunk 时停止
+    primary.delay = 0.3
+    assert "".join(str(chunk.content) for chunk in model.stream([HumanMessage(content="hi")])) == "fast"
+    time.sleep(0.4)
+    assert primary.chunks_sent <= 1
+
+
+def test_role_model_uses_fallbacks_from_env(monkeypatch):
+    def fake_instance(provider, model, temperature=0.0, streaming=True):
+        return FakeProviderModel(model_name=model)
+
+    monkeypatch.setattr(agent_service, "get_model_instance_from_provider", fake_instance)
+    config = MetadataExtractorConfig(model_provider="qwen", model_name="qwen-plus")
+
+    monkeypatch.delenv("LLM_FALLBACKS", raising=False)
+    assert isinstance(agent_service.get_role_model("metadata_extractor", config), FakeProviderModel)
+
+    monkeypatch.setenv("LLM_FALLBACKS", '{"metadata_extractor": ["deepseek:deepseek-chat", "qwen:qwen-plus"]}')
+    model = agent_service.get_role_model("metadata_extractor", config)
+    assert isinstance(model, FailoverChatModel)
+    assert [m.model_name for m in model.models] == ["qwen-plus", "deepseek-chat"]
+
+
+class FakeToolModel(FakeProviderModel):
+    """按绑定的第一个工具返回固定参数的工具调用"""
+    tool_args: dict = {}
+
+    def bind_tools(self, tools, **kwargs):
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError(f"{self.model_name} unavailable")
+        name = kwargs["tools"][0]["function"]["name"]
+        message = AIMessage(content="", tool_calls=[{"name": name, "args": self.tool_args, "id": "call_1"}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def test_bound_tools_and_structured_output_fail_over(monkeypatch):
+    from agents.metadata_extractor.graph import MetadataExtractAgentGraph
+    from agents.metadata_extractor.states import BasicMetadata, MetadataState
+
+    monkeypatch.setenv("KNOWLEDGE_CACHE_ENABLED", "false")
+    primary = FakeToolModel(model_name="primary", fail=True)
+    backup = FakeToolModel(model_name="backup", tool_args={"news_type": "科技", "who": ["NASA"]})
+    model = _failover([primary, backup])
+
+    # metadata extractor 在初始化时绑定工具，节点中使用结构化输出
+    agent = MetadataExtractAgentGraph(model=model)
+    assert agent.model_with_tools.invoke([HumanMessage(content="hi")]).tool_calls[0]["name"] == "search_wikipedia"
+
+    result = agent.extract_basic_metadata(MetadataState(news_text="NASA 发布新闻"))
+    assert result["basic_metadata"] == BasicMetadata(news_type="科技", who=["NASA"])
+    assert primary.calls == 2 and backup.calls == 2
@@ -0,0 +1,56 @@
+"""
+Test for the incremental JSON field extractor and streamed report generation
+"""
+import json
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from agents.main.states import FactCheckPlanState
+from api.agent_service import map_graph_event
+from utils.json_stream import JsonFieldExtractor
+
+
+REPORT = '# 核查 "F-1" 签证\n结论：不实 😀 \\ 完'
+
+
+def _output() -> str:
+    body = json.dumps({"nested": {"report": "ignored"}, "report": REPORT, "verdict": "false"})
+    return f"```json\n{body}\n```"
+
+
+def test_extractor_decodes_split_escapes():
+    extractor = JsonFieldExtractor(["report", "verdict"])
+    deltas = [extractor.feed(char) for char in _output()]
+
+    assert "".join(delta.get("report", "") for delta in deltas) == REPORT
+    assert extractor.values == {"report": REPORT, "verdict": "false"}
+    assert extractor.is_complete("report") and extractor.is_complete("verdict")
+
+
+class _CustomEvents(BaseCallbackHandler):
+    def __init__(self):
+        self.events = []
+
+    def on_custom_event(self, name, data, **kwargs):
+        self.events.append((name, data))
+
+
+def test_write_fact_check_report_streams_deltas(make_main_agent):
+    agent = make_main_agent(GenericFakeChatModel(messages=iter([AIMessage(content=_output())])))
+
+    handler = _CustomEvents()
+    output = RunnableLambda(agent.write_fact_check_report).invoke(
+        FactCheckPlanState(news_text="news"), config={"callbacks": [handler]}
+    )
+
+    assert output["result"].report == REPORT and output["result"].verdict == "false"
+    assert len(handler.events) > 2
+    assert "".join(data["delta"] for _, data in handler.events) == REPORT
+    assert [data["verdict"] for _, data in handler.events if data["verdict"]] == ["false"]
+
+    name, data = handler.events[0]
+    event = map_graph_event("on_custom_event", name, "write_fact_check_report", data)
+    assert event is not None and event.event == "write_fact_check_report_delta"
@@ -0,0 +1,76 @@
+"""
+Test for the knowledge-term definition cache used by the metadata extractor
+"""
+import time
+from typing import Callable
+
+import pytest
+
+from agents.metadata_extractor.graph import MetadataExtractAgentGraph
+from agents.metadata_extractor.knowledge_store import KnowledgeStore
+from agents.metadata_extractor.states import Knowledge
+from agents.metadata_extractor.warmup import warm_up
+
+
+class FakeRetriever:
+    def __init__(self):
+        self.calls = []
+
+    def retrieve_term(self, knowledge: Knowledge) -> Knowledge:
+        self.calls.append(knowledge.term)
+        if knowledge.term == "unknown":
+            return knowledge.model_copy(update={"description": "None"})
+        # 检索 agent 可能改写名称，缓存仍以提取出的名称为 key
+        return Knowledge(term=knowledge.term.upper(), category=knowledge.category, description=f"{knowledge.term} def", source="https://wiki")
+
+
+@pytest.fixture
+def make_agent(make_metadata_agent) -> Callable[[KnowledgeStore], MetadataExtractAgentGraph]:
+    def make(store: KnowledgeStore) -> MetadataExtractAgentGraph:
+        agent = make_metadata_agent(knowledge_store=store)
+        retriever = FakeRetriever()
+        agent.retrieve_term = retriever.retrieve_term  # type: ignore[method-assign]
+        return agent
+    return make
+
+
+def test_retrieve_knowledge_uses_store(make_agent):
+    store = KnowledgeStore(path=":memory:")
+    agent = make_agent(store)
+
+    first = agent.retrieve_knowledge(Knowledge(term="F-1 visa", category="签证"))["retrieved_knowledges"][0]
+    # 全角、大小写与空白不同的同一知识元命中缓存，返回的名称保持不变
+    second = agent.retrieve_knowledge(Knowledge(term="Ｆ-1  Visa", category="签证"))["retrieved_knowledges"][0]
+    agent.retrieve_knowledge(Knowledge(term="unknown", category="签证"))
+    agent.retrieve_knowledge(Knowledge(term="unknown", category="签证"))
+
+    assert agent.retrieve_term.__self__.calls == ["F-1 visa", "unknown", "unknown"]  # type: ignore[attr-defined]
+    assert first.term == "F-1 VISA"
+    assert second.term == "Ｆ-1  Visa" and second.description == "F-1 visa def"
+    assert store.stats() == {"entries": 1, "hits": 1, "misses": 3, "stale": 0}
+
+    # 不同类别或语言是不同的条目
+    assert store.get("F-1 visa", "法律") is None
+    assert store.get("F-1 visa", "签证", language="zh") is None
+
+
+def test_store_ttl_and_warm_up():
+    store = KnowledgeStore(path=":memory:", ttl=0.05)
+    retriever = FakeRetriever()
+    terms = [
+        Knowledge(term="美国国会", category="机构", description="美国的立法机关", source="https://zh.wikipedia.org"),
+        Knowledge(term="H-1B", category="签证"),
+    ]
+
+    summary = warm_up(store, terms, agent=retriever)
+    assert summary["imported"] == 1 and summary["retrieved"] == 1
+    assert store.get("美国国会", "机构").language == "zh"  # type: ignore[union-attr]
+
+    # 未过期的条目不重新检索
+    warm_up(store, terms, agent=retriever)
+    assert retriever.calls == ["H-1B"]
+
+    time.sleep(0.1)
+    assert store.get("H-1B", "签证") is None
+    warm_up(store, terms, agent=retriever)
+    assert retriever.calls == ["H-1B", "H-1B"]
@@ -0,0 +1,67 @@
+"""
+Test for the exact-match LLM response cache
+"""
+import time
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from models.llm_cache import SQLiteLLMCache
+from utils.telemetry import TelemetryCallback
+
+
+class CountingChat(BaseChatModel):
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "counting"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        usage = {"input_tokens": 10, "output_tokens": 2, "total_tokens": 12}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"answer {self.calls}", usage_metadata=usage))])
+
+
+def test_llm_cache_hit_skips_model_and_ignores_message_ids(tmp_path):
+    cache = SQLiteLLMCache(path=str(tmp_path / "cache.sqlite"))
+    model = CountingChat(cache=cache)
+    telemetry = TelemetryCallback("s1")
+
+    first = model.invoke([HumanMessage(content="是新闻吗？", id="a")])
+    second = model.invoke([HumanMessage(content="是新闻吗？", id="b")], {"callbacks": [telemetry]})
+    third = model.invoke([HumanMessage(content="另一段文本")])
+
+    assert model.calls == 2
+    assert first.content == second.content == "answer 1"
+    assert third.content == "answer 2"
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 2, "evictions": 0}
+
+    # 命中缓存的调用单独计数，不计入 token
+    summary = telemetry.summary()
+    assert summary.llm_cache_hits == 1
+    assert summary.input_tokens == 0
+
+    # 重新打开同一个文件时保留已缓存的条目
+    assert SQLiteLLMCache(path=str(tmp_path / "cache.sqlite")).stats()["entries"] == 2
+
+
+def test_llm_cache_ttl_and_size_bound():
+    cache = SQLiteLLMCache(path=":memory:", ttl=0.05, max_entries=2)
+    model = CountingChat(cache=cache)
+
+    for text in ["a", "b", "c"]:
+        model.invoke(text)
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+
+    # "a" 最早被淘汰，"c" 仍然命中
+    model.invoke("c")
+    assert model.calls == 3
+    model.invoke("a")
+    assert model.calls == 4
+
+    time.sleep(0.1)
+    model.invoke("c")
+    assert model.calls == 5
@@ -0,0 +1,40 @@
+"""
+Test for the load-test stub agent and report
+"""
+import asyncio
+
+from loadtest import stub_agent
+from loadtest.generator import SessionResult, percentile, summarize
+from api.events import decode_frame_data
+
+
+def test_stub_agent_follows_timeline(monkeypatch):
+    monkeypatch.setattr(stub_agent, "STUB_AGENT_TIME_SCALE", 0)
+
+    async def collect():
+        return [frame async for frame in stub_agent.run_stub_agent("news", None, "thread")]
+
+    frames = asyncio.run(collect())
+    timeline = stub_agent.build_timeline()
+    assert [frame.event for frame in frames] == [event for event, _, _ in timeline]
+
+    report = decode_frame_data(frames[-1])
+    assert report["verdict"] == "false" and len(report["report"]) == timeline[-1][2]
+    assert all("emitted_at" in decode_frame_data(frame) for frame in frames)
+
+
+def test_summarize():
+    results = [
+        SessionResult(index=0, start_status=200, events_status=200, events=10, latencies=[0.1, 0.2], completed=True, duration=2),
+        SessionResult(index=1, start_status=200, events_status=409, error="unavailable"),
+        SessionResult(index=2, start_status=429, error="queue full"),
+    ]
+    summary = summarize(results, elapsed=2, baseline_memory=100, peak_memory=400, final_memory=150, peak_active=3)
+
+    assert summary["completed"] == 1
+    assert summary["conflict_rate"] == round(1 / 3, 4)
+    assert summary["rejected_rate"] == round(1 / 3, 4)
+    assert summary["start_status"] == {200: 2, 429: 1}
+    assert summary["memory"]["per_session_bytes"] == 100
+    assert summary["throughput"]["events_per_second"] == 5
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
@@ -0,0 +1,75 @@
+"""
+Test for the model instance registry
+"""
+import json
+
+import httpx
+
+from api.agent_service import create_model_instance
+from models.registry import ModelRegistry
+
+
+def test_instances_are_reused_and_evicted():
+    registry = ModelRegistry(max_size=2)
+    created = []
+
+    def factory(client):
+        created.append(client)
+        return object()
+
+    first = registry.get(("qwen", "qwen-max", 0.0, True), factory)  # type: ignore[arg-type]
+    assert registry.get(("qwen", "qwen-max", 0.0, True), factory) is first  # type: ignore[arg-type]
+    assert len(created) == 1
+
+    registry.get(("qwen", "qwen-plus", 0.0, True), factory)  # type: ignore[arg-type]
+    registry.get(("qwen", "qwen-turbo", 0.0, True), factory)  # type: ignore[arg-type]
+    # 超出容量后淘汰最久未使用的实例
+    assert registry.get(("qwen", "qwen-max", 0.0, True), factory) is not first  # type: ignore[arg-type]
+    assert registry.stats() == {"models": 2, "http_clients": 1, "hits": 1, "misses": 4}
+
+
+def test_http_client_is_shared_per_provider():
+    registry = ModelRegistry()
+    clients = {}
+
+    def factory(name):
+        def create(client):
+            clients[name] = client
+            return object()
+        return create
+
+    registry.get(("qwen", "qwen-max", 0.0, True), factory("qwen-max"))  # type: ignore[arg-type]
+    registry.get(("qwen", "qwen-plus", 0.7, False), factory("qwen-plus"))  # type: ignore[arg-type]
+    registry.get(("deepseek", "deepseek-chat", 0.0, True), factory("deepseek-chat"))  # type: ignore[arg-type]
+
+    assert clients["qwen-max"] is clients["qwen-plus"]
+    assert clients["qwen-max"] is not clients["deepseek-chat"]
+
+
+def _sse(*chunks) -> bytes:
+    return b"".join(f"data: {json.dumps(chunk)}\n\n".encode() for chunk in chunks) + b"data: [DONE]\n\n"
+
+
+def test_streamed_usage_is_kept_with_shared_client(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        base = {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o"}
+        body = _sse(
+            {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": "hi"}, "finish_reason": None}]},
+            {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]},
+            {**base, "choices": [], "usage": {"prompt_tokens": 12, "completion_tokens": 1, "total_tokens": 13}},
+        )
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body)
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    model = create_model_instance("openai", "gpt-4o", http_client=client)
+
+    message = None
+    for chunk in model.stream("hello"):
+        message = chunk if message is None else message + chunk
+
+    assert requests[0]["stream_options"] == {"include_usage": True}
+    assert message is not None and message.usage_metadata["total_tokens"] == 13
@@ -0,0 +1,70 @@
+"""
+Test for the cache-friendly prompt prefix of the search agent loop
+"""
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from agents.metadata_extractor.states import BasicMetadata
+from agents.searcher.graph import SearchAgentGraph
+from agents.searcher.states import SearchAgentState, Status
+from utils import compact_tool_schema
+
+
+@pytest.fixture(autouse=True)
+def _tool_keys(monkeypatch):
+    # 默认工具在创建时检查 API key，测试只读取工具定义，不会发出请求
+    for name in ("GOOGLE_SEARCH_API_KEY", "GOOGLE_CX_ID", "TAVILY_API_KEY"):
+        monkeypatch.setenv(name, "test")
+
+
+class RecordingChatModel(FakeListChatModel):
+    received: list = []
+
+    def invoke(self, input, config=None, **kwargs):
+        self.received.append([message.content for message in input])
+        return super().invoke(input, config, **kwargs)
+
+
+def _state(content: str, **kwargs) -> SearchAgentState:
+    return SearchAgentState(
+        check_point_id="1",
+        retrieval_step_id=f"step-{content}",
+        basic_metadata=BasicMetadata(news_type="科技", who=["NASA"]),
+        content=content,
+        purpose="核实",
+        expected_source="官方网站",
+        **kwargs,
+    )
+
+
+def test_static_prefix_is_identical_across_calls_and_steps():
+    status = json.dumps({
+        "evaluation": "e", "next_step": "n",
+        "action": {"name": "search_baidu", "args": {"query": "q"}, "id": None, "type": "tool_call"},
+    })
+    model = RecordingChatModel(responses=[status] * 3, received=[])
+    agent = SearchAgentGraph(model=model, max_search_tokens=100000)
+
+    agent.evaluate_current_status(_state("a"))
+    agent.evaluate_current_status(_state("a", latest_tool_result="result", statuses=[Status.model_validate_json(status)]))
+    agent.evaluate_current_status(_state("b"))
+
+    first, second, third = model.received
+    # 工具说明与指令对所有检索步骤相同，检索步骤内的部分在同一步骤的调用间相同
+    assert first[0] == second[0] == third[0]
+    assert first[1] == second[1] != third[1]
+    assert first[2] != second[2]
+    assert "Current time" not in first[0] and "NASA" in first[1]
+
+
+def test_compact_tool_schema_lists_every_parameter_once():
+    agent = SearchAgentGraph(model=FakeListChatModel(responses=[]), max_search_tokens=100000)
+    schema = compact_tool_schema(agent.tools)
+
+    assert "  - query: string (required) 搜索关键词" in schema
+    assert "  - num: integer = 10 " in schema
+    assert "  - dateRestrict: string " in schema
+    assert "anyOf" not in schema and "Args:" not in schema
+    assert schema == compact_tool_schema(agent.tools)
@@ -0,0 +1,123 @@
+"""
+Test for the process-wide provider request scheduler
+"""
+import json
+import threading
+import time
+
+import httpx
+
+from models.rate_limit import (
+    ProviderRateLimiter,
+    RateLimit,
+    RateLimitedTransport,
+    estimate_request,
+    parse_retry_after,
+)
+from models.registry import ModelRegistry
+
+
+def _body(model="qwen-max", content="hello", max_tokens=100) -> bytes:
+    return json.dumps({"model": model, "messages": [{"role": "user", "content": content}], "max_tokens": max_tokens}).encode()
+
+
+def test_estimate_request_and_retry_after():
+    model, tokens = estimate_request(_body())
+    assert model == "qwen-max" and 100 < tokens < 110
+    assert estimate_request(b"not json")[0] is None
+
+    assert parse_retry_after(httpx.Headers({"retry-after": "3"})) == 3
+    assert parse_retry_after(httpx.Headers({"retry-after-ms": "250"})) == 0.25
+    assert parse_retry_after(httpx.Headers({})) > 0
+
+
+def test_concurrency_limit_queues_in_arrival_order():
+    limiter = ProviderRateLimiter({"qwen": RateLimit(max_concurrency=1)})
+    first = limiter.acquire("qwen", "qwen-max", 10)
+    order = []
+
+    def worker(name):
+        lease = limiter.acquire("qwen", "qwen-plus", 10)
+        order.append(name)
+        lease.release()
+
+    threads = []
+    for name in ("a", "b"):
+        thread = threading.Thread(target=worker, args=(name,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.05)
+
+    stats = limiter.stats()
+    assert stats["waiting"] == 2 and stats["in_flight"] == 1
+    first.release()
+    for thread in threads:
+        thread.join(timeout=2)
+    assert order == ["a", "b"]
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_tpm_budget_and_model_pause():
+    limiter = ProviderRateLimiter({"qwen:qwen-max": RateLimit(tpm=100)})
+    limiter.acquire("qwen", "qwen-max", 80).release()
+    # 窗口内剩余的 token 不足，需要等到第一个请求移出窗口
+    budget = limiter._budgets["qwen:qwen-max"]
+    assert budget.wait_time(30, time.monotonic()) > 50
+    assert budget.wait_time(20, time.monotonic()) == 0
+    # 其他模型不受影响
+    limiter.acquire("qwen", "qwen-plus", 1000).release()
+
+    limiter.pause("qwen", "qwen-plus", 0.2)
+    started = time.monotonic()
+    limiter.acquire("qwen", "qwen-plus", 1).release()
+    assert time.monotonic() - started >= 0.15
+    assert limiter.stats()["qwen_qwen_plus_throttled"] == 1
+
+
+def test_transport_honors_retry_after_and_releases_on_close():
+    limiter = ProviderRateLimiter({"deepseek": RateLimit(max_concurrency=1)})
+    responses = [
+        httpx.Response(429, headers={"retry-after": "0.2"}, stream=httpx.ByteStream(b"{}")),
+        httpx.Response(200, stream=httpx.ByteStream(b"{}")),
+    ]
+    sent_at = []
+
+    def handler(request):
+        sent_at.append(time.monotonic())
+        return responses.pop(0)
+
+    client = httpx.Client(transport=RateLimitedTransport(httpx.MockTransport(handler), limiter, "deepseek"))
+    assert client.post("https://api.example.com/v1/chat/completions", content=_body("deepseek-chat")).status_code == 429
+    assert limiter.stats()["in_flight"] == 0
+    assert client.post("https://api.example.com/v1/chat/completions", content=_body("deepseek-chat")).status_code == 200
+    assert sent_at[1] - sent_at[0] >= 0.15
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_registry_wraps_shared_client():
+    limiter = ProviderRateLimiter({})
+    registry = ModelRegistry(rate_limiter=limiter)
+    clients = []
+
+    def factory(client):
+        clients.append(client)
+        return object()
+
+    registry.get(("qwen", "qwen-max", 0.0, True), factory)  # type: ignore[arg-type]
+    assert isinstance(clients[0]._transport, RateLimitedTransport)
+
+
+def test_paused_model_does_not_block_other_models():
+    limiter = ProviderRateLimiter({})
+    limiter.pause("qwen", "qwen-max", 2)
+    waiter = threading.Thread(target=lambda: limiter.acquire("qwen", "qwen-max", 10).release())
+    waiter.start()
+    time.sleep(0.05)
+
+    # 排队中的 qwen-max 请求只被自身的暂停挡住，不占用提供商队列的队首
+    started = time.monotonic()
+    limiter.acquire("qwen", "qwen-turbo", 10).release()
+    assert time.monotonic() - started < 0.5
+    assert limiter.stats()["qwen_qwen_max_waiting"] == 1
+    waiter.join(timeout=5)
+    assert limiter.stats()["in_flight"] == 0
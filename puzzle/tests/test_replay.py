@@ -0,0 +1,135 @@
+"""
+Test for the offline record/replay layer
+"""
+import uuid
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from replay import Cassette, CassetteMissError, ReplayChatModel, ReplayTool
+
+
+class ScriptedChat(BaseChatModel):
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        content = f"answer {self.calls}: {messages[-1].content}"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(
+            content=content,
+            usage_metadata={"input_tokens": 5, "output_tokens": 2, "total_tokens": 7},
+        ))])
+
+
+@tool
+def lookup(query: str) -> str:
+    """lookup"""
+    return f"result for {query}"
+
+
+def _replay_model(cassette, delegate=None, streaming=False):
+    return ReplayChatModel(model="fake", api_key="replay", streaming=streaming, cassette=cassette, delegate=delegate)
+
+
+def _replay_tool(cassette, delegate=None):
+    return ReplayTool(
+        name=lookup.name, description=lookup.description, args_schema=lookup.args_schema,
+        cassette=cassette, delegate=delegate,
+    )
+
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    cassette = Cassette(path=path, news_text="news", config={}, verdict="false")
+    delegate = ScriptedChat()
+
+    # 核查点 id 每次运行都不同，不应影响请求 key
+    recorded = [
+        _replay_model(cassette, delegate).invoke(f"check {uuid.uuid4()}").content,
+        _replay_model(cassette, delegate).invoke("same").content,
+        _replay_model(cassette, delegate).invoke("same").content,
+    ]
+    recorded_tool = _replay_tool(cassette, lookup).invoke({"query": "bill"})
+    cassette.save()
+
+    replayed_cassette = Cassette.load(path)
+    assert replayed_cassette.verdict == "false"
+    replayed = [
+        _replay_model(replayed_cassette).invoke(f"check {uuid.uuid4()}").content,
+        _replay_model(replayed_cassette).invoke("same").content,
+        # 流式回放返回与录制相同的内容与用量
+        "".join(chunk.content for chunk in _replay_model(replayed_cassette, streaming=True).stream("same")),
+    ]
+    assert replayed == recorded
+    assert delegate.calls == 3
+    assert _replay_tool(replayed_cassette).invoke({"query": "bill"}) == recorded_tool
+
+    message = _replay_model(replayed_cassette).invoke([HumanMessage(content="same")])
+    assert message.usage_metadata["input_tokens"] == 5
+
+    with pytest.raises(CassetteMissError):
+        _replay_model(replayed_cassette).invoke("never recorded")
+    assert len(replayed_cassette.misses) == 1
+
+    replayed_cassette.rewind()
+    assert _replay_model(replayed_cassette).invoke("same").content == recorded[1]
+
+
+# 在独立的进程中录制或回放真实的 main agent graph，各 prompt 模块的 current_time 在每个进程中都不同
+CROSS_PROCESS_SCRIPT = """
+import json, sys
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from agents.main import prompts
+from replay import Cassette
+from replay.benchmark import build_replay_agent
+from tests.conftest import make_agent_config
+
+mode, path = sys.argv[1], sys.argv[2]
+config = make_agent_config()
+cassette = Cassette(path=path, news_text="今天天气不错") if mode == "record" else Cassette.load(path)
+agent = build_replay_agent(config, cassette)
+if mode == "record":
+    agent.metadata_extract_model.delegate = FakeListChatModel(
+        responses=[json.dumps({"result": False, "reason": "not a news story"})]
+    )
+state = agent.graph.invoke({"news_text": cassette.news_text}, {"configurable": {"thread_id": "t"}})
+if mode == "record":
+    cassette.save()
+print(json.dumps({"current_time": prompts.current_time, "reason": state["is_news_text"].reason, "misses": cassette.misses}))
+"""
+
+
+def test_replay_across_processes(tmp_path, monkeypatch):
+    import json
+    import os
+    import subprocess
+    import sys
+    import time
+
+    # 构建 search agent 需要的 API key，回放不会访问网络
+    for name in ("GOOGLE_SEARCH_API_KEY", "GOOGLE_CX_ID", "TAVILY_API_KEY"):
+        monkeypatch.setenv(name, os.getenv(name) or "replay")
+    monkeypatch.setenv("KNOWLEDGE_CACHE_ENABLED", "false")
+    path = str(tmp_path / "cassette.json")
+
+    def run(mode):
+        output = subprocess.run(
+            [sys.executable, "-c", CROSS_PROCESS_SCRIPT, mode, path],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.dirname(__file__)),
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    recorded = run("record")
+    time.sleep(1.1)
+    replayed = run("replay")
+
+    assert recorded["current_time"] != replayed["current_time"]
+    assert replayed["reason"] == recorded["reason"] == "not a news story"
+    assert replayed["misses"] == []
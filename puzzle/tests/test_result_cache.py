@@ -0,0 +1,179 @@
+"""
+Test for the result cache and the in-flight run registry
+"""
+import asyncio
+import threading
+import time
+
+from api import service
+from api.events import TaskComplete, encode_event
+from api.result_cache import InFlightRegistry, InFlightRun, ResultCache, make_cache_key
+
+
+class _Subscriber:
+    def __init__(self):
+        self.events = []
+        self.is_queued = False
+        self.is_interrupted = False
+        self.is_closed = False
+
+    def add_event(self, event_data):
+        self.events.append(encode_event(event_data).event)
+
+    def close(self):
+        self.is_closed = True
+
+
+def _wait_until(condition, timeout: float = 5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return
+        time.sleep(0.01)
+    raise TimeoutError("condition was not met")
+
+
+def test_resume_skips_cache_and_in_flight_runs(monkeypatch, agent_config):
+    calls = []
+
+    async def fake_run_main_agent(news_text, config, thread_id, stream_protocol="snapshot", resume=False):
+        calls.append((thread_id, resume))
+        yield {"event": "write_fact_check_report_end", "data": {"report": "partial", "verdict": "false"}}
+
+    monkeypatch.setattr(service, "run_main_agent", fake_run_main_agent)
+    monkeypatch.setattr(service, "result_cache", ResultCache())
+
+    key = make_cache_key("resume text", agent_config, stream_protocol="snapshot")
+    cached_events = [encode_event(TaskComplete())]
+    service.result_cache.put(key, cached_events)
+    # 相同请求的另一个任务正在运行
+    other, _ = service.in_flight_runs.get_or_create(key, job_id="other-session")
+
+    try:
+        session_id = service.start_agent("resume text", agent_config, resume_session_id="resumed-session")
+        assert session_id == "resumed-session"
+        _wait_until(lambda: calls and service.in_flight_runs.get_by_job(session_id) is None)
+    finally:
+        service.in_flight_runs.remove(other)
+        service.close_session("resumed-session")
+
+    # 恢复的会话运行自己的 thread，不回放缓存也不挂载到其他任务上
+    assert calls == [("resumed-session", True)]
+    assert other.subscribers == []
+    # 不完整的事件记录不会覆盖缓存
+    assert service.result_cache.get(key).events == cached_events
+
+
+def test_result_cache_ttl_and_lru():
+    cache = ResultCache(ttl=3600, max_entries=2)
+    cache.put("a", [])
+    cache.put("b", [])
+    assert cache.get("a") is not None
+    # 容量已满时淘汰最久未使用的 b
+    cache.put("c", [])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats() == {"entries": 2, "hits": 3, "misses": 1}
+
+    cache = ResultCache(ttl=0.05)
+    cache.put("a", [])
+    time.sleep(0.1)
+    assert cache.get("a") is None and cache.stats()["entries"] == 0
+
+    # ttl 为 0 时关闭缓存
+    cache = ResultCache(ttl=0)
+    cache.put("a", [])
+    assert cache.get("a") is None
+
+
+def test_in_flight_run_attach_publish_close():
+    run = InFlightRun(key="k", job_id="j")
+    first = _Subscriber()
+    run.attach(first)
+    run.publish({"event": "agent_start", "data": {}})
+    run.publish({"event": "heartbeat", "data": {}})
+
+    # 后挂载的会话补发已产生的事件，临时事件不写入事件记录
+    second = _Subscriber()
+    run.attach(second)
+    assert first.events == ["agent_start", "heartbeat"]
+    assert second.events == ["agent_start"]
+    assert [frame.event for frame in run.events] == ["agent_start"]
+
+    run.publish({"event": "error", "data": {"message": "boom"}})
+    assert run.has_error and second.events == ["agent_start", "error"]
+
+    assert run.detach(first) == 1
+    first.is_interrupted = True
+    assert not run.is_abandoned()
+    run.close()
+    assert second.is_closed and not first.is_closed
+
+
+def test_registry_attaches_before_removal():
+    registry = InFlightRegistry()
+    first, second = _Subscriber(), _Subscriber()
+    run, is_new_run = registry.get_or_create("k", job_id="j1", subscriber=first)
+    same, is_same_new = registry.get_or_create("k", job_id="j2", subscriber=second)
+    assert is_new_run and not is_same_new and same is run
+    assert run.subscribers == [first, second]
+
+    # 任务结束时先移除再关闭，之后的请求创建新任务而不是挂载到已关闭的任务上
+    registry.remove(run)
+    run.close()
+    late = _Subscriber()
+    new_run, is_new_run = registry.get_or_create("k", job_id="j3", subscriber=late)
+    assert is_new_run and new_run is not run and new_run.subscribers == [late]
+    assert first.is_closed and second.is_closed and not late.is_closed
+
+
+def test_identical_requests_share_one_run(monkeypatch, agent_config):
+    calls = []
+    release = threading.Event()
+
+    async def fake_run_main_agent(news_text, config, thread_id, stream_protocol="snapshot", resume=False):
+        calls.append(thread_id)
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        yield {"event": "write_fact_check_report_end", "data": {"report": "r", "verdict": "false"}}
+
+    monkeypatch.setattr(service, "run_main_agent", fake_run_main_agent)
+    monkeypatch.setattr(service, "result_cache", ResultCache())
+
+    first = service.start_agent("singleflight text", agent_config)
+    _wait_until(lambda: calls)
+    second = service.start_agent(" singleflight  text ", agent_config)
+    try:
+        flight = service.in_flight_runs.get_by_job(first)
+        assert flight is not None and len(flight.subscribers) == 2
+        assert service.active_sessions[second]["flight"] is flight
+    finally:
+        release.set()
+    _wait_until(lambda: service.in_flight_runs.get_by_job(first) is None)
+    assert calls == [first]
+
+    # 完成后相同的请求命中缓存
+    key = make_cache_key("singleflight text", agent_config, stream_protocol="snapshot")
+    assert service.result_cache.get(key) is not None
+    for session_id in (first, second):
+        service.close_session(session_id)
+
+
+def test_cache_hit_replays_without_a_thread(monkeypatch, agent_config):
+    monkeypatch.setattr(service, "result_cache", ResultCache())
+    key = make_cache_key("cached text", agent_config, stream_protocol="snapshot")
+    service.result_cache.put(key, [encode_event(TaskComplete())])
+
+    threads_before = threading.active_count()
+    session_id = service.start_agent("cached text", agent_config)
+    try:
+        assert threading.active_count() == threads_before
+        sse_session = service.active_sessions[session_id]["sse_session"]
+        # 客户端连接后取完缓存的事件，事件流自行结束
+        frames = [frame for frame in sse_session._event_stream() if frame]
+        assert [frame.split("\n")[0] for frame in frames] == [
+            "event: heartbeat", "event: task_complete", "event: stream_closed"
+        ]
+        assert not sse_session.is_running
+    finally:
+        service.close_session(session_id)
@@ -0,0 +1,98 @@
+"""
+Test for the local JSON repair stage of SafeParse
+"""
+import json
+from typing import List, Literal, Optional
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from pydantic import BaseModel
+
+from agents.main.prompts import evaluate_search_result_output_parser
+from utils.json_repair import repair_json
+from utils.safe_parse import SafeParse, safe_parse_stats
+
+
+class Item(BaseModel):
+    name: str
+    relationship: Literal["support", "contradict"]
+
+
+class Report(BaseModel):
+    verdict: str
+    score: Optional[int] = None
+    items: List[Item]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('```json\n{"a": [1, 2,], }\n```', {"a": [1, 2]}),
+    ('Here is the result: {"a": "b"} Hope it helps.', {"a": "b"}),
+    ('{"a": True, "b": None, "c": "line\nbreak"}', {"a": True, "b": None, "c": "line\nbreak"}),
+    # 结尾缺少闭合的括号
+    ('{"a": {"b": [1, 2]', {"a": {"b": [1, 2]}}),
+    ('{"a": ["x", "y"], "b": "z"', {"a": ["x", "y"], "b": "z"}),
+    # 被截断的输出不在本地修复
+    ('{"verdict": "false", "report": "The claim is fals', None),
+    ('{"items": [{"a": 1}, {"a": 2}, {"a"', None),
+    ('{"a": {"b": [1, 2', None),
+    ('{"a": 1, "b": {"c"', None),
+    ('{"a": 1,', None),
+    ("no json here", None),
+])
+def test_repair_json(text, expected):
+    assert repair_json(text) == expected
+
+
+def test_safe_parse_repairs_locally_before_calling_the_model():
+    parser = SafeParse(PydanticOutputParser(pydantic_object=Report))
+    fixer = FakeListChatModel(responses=[])
+    before = safe_parse_stats.stats()
+
+    text = '```json\n{"properties": {"verdict": "false", "score": "3", "items": {"name": 1, "relationship": "Contradict"},}}\n```'
+    report = parser.parse(text, llm=fixer)
+    assert report == Report(verdict="false", score=3, items=[Item(name="1", relationship="contradict")])
+
+    after = safe_parse_stats.stats()
+    assert after["repaired"] == before["repaired"] + 1
+    assert after["llm_fixed"] == before["llm_fixed"]
+
+
+def test_truncated_output_is_fixed_by_the_model():
+    parser = SafeParse(PydanticOutputParser(pydantic_object=Report))
+    fixed = json.dumps({"verdict": "false", "items": [{"name": "a", "relationship": "support"}]})
+    before = safe_parse_stats.stats()
+
+    report = parser.parse('{"verdict": "false", "items": [{"name": "a", "relationship": "supp', llm=FakeListChatModel(responses=[fixed]))
+    assert report.items[0].relationship == "support"
+    after = safe_parse_stats.stats()
+    assert after["repaired"] == before["repaired"]
+    assert after["llm_fixed"] == before["llm_fixed"] + 1
+
+
+def test_safe_parse_falls_back_to_the_session_model():
+    parser = SafeParse(PydanticOutputParser(pydantic_object=Report))
+    fixed = json.dumps({"verdict": "true", "items": []})
+    before = safe_parse_stats.stats()
+
+    report = parser.parse("The news is true.", llm=FakeListChatModel(responses=[fixed]))
+    assert report.verdict == "true"
+    assert safe_parse_stats.stats()["llm_fixed"] == before["llm_fixed"] + 1
+
+
+def test_constructor_model_takes_precedence_over_the_session_model():
+    fixed = json.dumps({"verdict": "true", "items": []})
+    parser = SafeParse(PydanticOutputParser(pydantic_object=Report), llm=FakeListChatModel(responses=[fixed]))
+    session_model = FakeListChatModel(responses=[])
+
+    assert parser.parse("The news is true.", llm=session_model).verdict == "true"
+    # invoke 不能传入模型，with_llm 返回使用会话模型修复的解析器
+    assert parser.with_llm(session_model).invoke("The news is true.").verdict == "true"
+
+
+def test_main_agent_parsers_fix_with_the_session_model():
+    fixed = json.dumps({"reasoning": "ok", "verified": True})
+    session_model = FakeListChatModel(responses=[fixed])
+    result = evaluate_search_result_output_parser.with_llm(session_model).invoke(AIMessage(content="looks verified"))
+    assert result.verified
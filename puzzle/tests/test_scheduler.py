@@ -0,0 +1,68 @@
+"""
+Test for the agent scheduler admission control
+"""
+import threading
+import time
+
+import pytest
+
+from api.scheduler import AgentScheduler, QueueFullException
+
+
+def _wait_until_idle(scheduler: AgentScheduler, timeout: float = 5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        stats = scheduler.stats()
+        if stats["running"] == 0 and stats["queued"] == 0:
+            return
+        time.sleep(0.01)
+    raise TimeoutError("scheduler did not become idle")
+
+
+def _blocking_job(release: threading.Event, started: list, job_id: str):
+    started.append(job_id)
+    release.wait(timeout=5)
+
+
+def test_queue_and_fairness():
+    release = threading.Event()
+    started: list = []
+    updates: dict = {}
+
+    scheduler = AgentScheduler(
+        max_concurrency=1,
+        max_queue_size=4,
+        max_queued_per_client=2,
+        on_queue_update=lambda job_id, position, eta: updates.__setitem__(job_id, position),
+    )
+
+    assert scheduler.submit("a1", "client-a", _blocking_job, release, started, "a1") == 0
+    assert scheduler.submit("a2", "client-a", _blocking_job, release, started, "a2") == 1
+    assert scheduler.submit("a3", "client-a", _blocking_job, release, started, "a3") == 2
+    # client-b 后到，但轮转出队会排在 client-a 的第二个排队任务之前
+    assert scheduler.submit("b1", "client-b", _blocking_job, release, started, "b1") == 2
+    assert updates["a3"] == 3
+
+    with pytest.raises(QueueFullException):
+        scheduler.submit("a4", "client-a", _blocking_job, release, started, "a4")
+
+    assert scheduler.cancel("a3")
+    assert scheduler.stats()["queued"] == 2
+
+    release.set()
+    _wait_until_idle(scheduler)
+    assert started == ["a1", "a2", "b1"]
+
+
+def test_queue_full():
+    release = threading.Event()
+    scheduler = AgentScheduler(max_concurrency=1, max_queue_size=1)
+
+    scheduler.submit("1", "a", release.wait, 5)
+    scheduler.submit("2", "b", release.wait, 5)
+    with pytest.raises(QueueFullException) as e:
+        scheduler.submit("3", "c", release.wait, 5)
+    assert e.value.retry_after >= 1
+
+    release.set()
+    _wait_until_idle(scheduler)
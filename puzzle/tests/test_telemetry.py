@@ -0,0 +1,106 @@
+"""
+Test for the per-node telemetry callback and the /metrics rendering
+"""
+import asyncio
+from typing import TypedDict
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult, LLMResult
+from langchain_core.tools import tool
+from langgraph.graph import StateGraph, START, END
+
+from utils.telemetry import TelemetryCallback, extract_usage
+from api.metrics import MetricsRegistry
+
+
+@tool
+def lookup(query: str) -> str:
+    """lookup"""
+    return query.upper()
+
+
+USAGE = {
+    "input_tokens": 12, "output_tokens": 3, "total_tokens": 15,
+    "input_token_details": {"cache_read": 8},
+}
+
+
+class FakeStreamingChat(BaseChatModel):
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="hello world", usage_metadata=USAGE))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for text in ["hello", " world"]:
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+        # 与 OpenAI 兼容接口一样，用量在最后一个 chunk 中返回
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=USAGE))
+
+
+def _build_graph():
+    model = FakeStreamingChat()
+
+    class State(TypedDict):
+        answer: str
+
+    async def ask(state: State):
+        chunks = [chunk async for chunk in model.astream("hi")]
+        return {"answer": "".join(chunk.content for chunk in chunks)}
+
+    def search(state: State):
+        return {"answer": lookup.invoke({"query": state["answer"]})}
+
+    builder = StateGraph(State)
+    builder.add_node("ask", ask)
+    builder.add_node("search", search)
+    builder.add_edge(START, "ask")
+    builder.add_edge("ask", "search")
+    builder.add_edge("search", END)
+    return builder.compile()
+
+
+def test_telemetry_records_per_node_metrics():
+    telemetry = TelemetryCallback("s1")
+    result = asyncio.run(_build_graph().ainvoke({"answer": ""}, {"callbacks": [telemetry]}))
+    telemetry.finish()
+
+    assert result["answer"] == "HELLO WORLD"
+    summary = telemetry.summary()
+    nodes = {node.node: node for node in summary.nodes}
+    assert list(nodes) == ["ask", "search"]
+
+    assert nodes["ask"].calls == 1
+    assert nodes["ask"].llm_calls == 1
+    assert nodes["ask"].llm_ttft is not None
+    assert (nodes["ask"].input_tokens, nodes["ask"].output_tokens, nodes["ask"].cached_tokens) == (12, 3, 8)
+    assert nodes["ask"].cache_hits == 1
+
+    assert nodes["search"].tool_calls == 1
+    assert nodes["search"].llm_calls == 0
+    assert summary.input_tokens == 12 and summary.tool_calls == 1
+
+    registry = MetricsRegistry()
+    registry.record_session(telemetry, "completed")
+    registry.register_stats("queue", lambda: {"running": 2, "name": "ignored"})
+    text = registry.render()
+    assert 'puzzle_sessions_total{status="completed"} 1' in text
+    assert 'puzzle_llm_input_tokens_total{node="ask"} 12' in text
+    assert 'puzzle_tool_calls_total{node="search"} 1' in text
+    assert "puzzle_queue_running 2" in text
+    assert "ignored" not in text
+
+
+def test_extract_usage_reads_deepseek_prompt_cache_hits():
+    response = LLMResult(
+        generations=[[ChatGeneration(message=AIMessage(content="ok"))]],
+        llm_output={"token_usage": {"prompt_tokens": 100, "completion_tokens": 5, "prompt_cache_hit_tokens": 64}},
+    )
+    usage = extract_usage(response)
+    assert (usage.input_tokens, usage.output_tokens, usage.cached_tokens) == (100, 5, 64)
@@ -0,0 +1,74 @@
+"""
+Test for the offline Wikipedia index and the SearchWikipediaTool fallback
+"""
+import json
+
+from tools.search_wikipedia.local_index import LocalWikipediaIndex, iter_dump_pages
+from tools.search_wikipedia.tool import SearchWikipediaTool
+
+
+ABSTRACT_XML = """<feed>
+<doc><title>Wikipedia: F-1 visa</title><url>https://en.wikipedia.org/wiki/F-1_visa</url>
+<abstract>An F-1 visa is a non-immigrant student visa issued by the United States.</abstract></doc>
+<doc><title>Wikipedia: United States Congress</title><url>https://en.wikipedia.org/wiki/United_States_Congress</url>
+<abstract>The United States Congress is the legislature of the federal government of the United States.</abstract></doc>
+</feed>
+"""
+
+
+def _build(tmp_path) -> LocalWikipediaIndex:
+    zh_dump = tmp_path / "zhwiki.jsonl"
+    zh_dump.write_text("\n".join(json.dumps(record, ensure_ascii=False) for record in [
+        {"id": "1", "url": "https://zh.wikipedia.org/wiki?curid=1", "title": "美国国会",
+         "text": "美国国会\n\n美国国会是美国联邦政府的立法机构，由参议院和众议院组成。\n\n历史\n国会成立于1789年。"},
+        {"id": "2", "url": "https://zh.wikipedia.org/wiki?curid=2", "title": "美国",
+         "text": "美利坚合众国是位于北美洲的联邦共和国。"},
+    ]), encoding="utf-8")
+    en_dump = tmp_path / "enwiki-abstract.xml"
+    en_dump.write_text(ABSTRACT_XML, encoding="utf-8")
+
+    index = LocalWikipediaIndex(str(tmp_path / "wiki.sqlite"))
+    assert index.add_pages("zh", iter_dump_pages(str(zh_dump))) == 2
+    assert index.add_pages("en", iter_dump_pages(str(en_dump))) == 2
+    return index
+
+
+def test_local_index_serves_wikipedia_actions(tmp_path):
+    index = _build(tmp_path)
+
+    assert [page["title"] for page in index.search_title("美国", language="zh")] == ["美国", "美国国会"]
+    assert index.search_title("f-1 VISA", language="en")[0]["key"] == "F-1_visa"
+
+    content = index.search_content("立法机构", language="zh")
+    assert content[0]["title"] == "美国国会" and "立法机构" in content[0]["snippet"]
+    assert index.search_content("legislature federal", language="en")[0]["title"] == "United States Congress"
+
+    page = index.get_page("United_States_Congress", language="en")
+    assert page is not None and page["definition"].startswith("The United States Congress")
+    assert index.get_page("美国国会", language="zh")["definition"].startswith("美国国会是")  # type: ignore[index]
+    assert index.get_page("不存在", language="zh") is None
+
+    # 重新导入时覆盖同名词条
+    index.add_pages("zh", [{"title": "美国", "definition": "更新后的定义"}])
+    assert index.get_page("美国", language="zh")["definition"] == "更新后的定义"  # type: ignore[index]
+    assert index.stats()["pages"] == {"zh": 2, "en": 2}
+
+
+def test_tool_falls_back_to_online_api(tmp_path):
+    index = _build(tmp_path)
+    requested = []
+
+    tool = SearchWikipediaTool(local_index=index)
+    tool.__dict__["_make_request"] = lambda url: requested.append(url) or {"pages": []}
+
+    assert json.loads(tool.invoke({"action": "get_page", "query": "美国国会", "language": "zh"}))["title"] == "美国国会"
+    assert requested == []
+
+    # 本地没有结果或本地没有该语言时请求维基百科 API
+    tool.invoke({"action": "search_by_titles", "query": "不存在的词条", "language": "zh"})
+    tool.invoke({"action": "search_by_titles", "query": "Congrès", "language": "fr"})
+    assert len(requested) == 2
+
+    offline_tool = SearchWikipediaTool(local_index=index, online_fallback=False)
+    result = json.loads(offline_tool.invoke({"action": "get_page", "query": "不存在", "language": "zh"}))
+    assert "error" in result
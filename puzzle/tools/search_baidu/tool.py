@@ -177,10 +177,12 @@ class SearchBaiduTool(BaseTool):
                 title_element = result.select_one('h3[class*="c-title"] a') or result.select_one('h3 a')
                 title = title_element.get_text().strip() if title_element else None
                 
-                # URL - 百度使用了重定向链接，提取 href
+                # URL - 百度使用了重定向链接，提取 href；结果容器的 mu 属性通常是原始链接，优先使用
                 url = None
                 if title_element and title_element.has_attr('href'):
                     url = title_element['href']
+                if result.get('mu'):
+                    url = result['mu']
                 
                 # 提取摘要 - 使用包含 "content-right" 的类名
                 snippet_element = result.select_one('span[class*="content-right"]')
@@ -225,6 +227,8 @@ class SearchBaiduTool(BaseTool):
                 url = None
                 if title_element and title_element.has_attr('href'):
                     url = title_element['href']
+                if container.get('mu'):
+                    url = container['mu']
                 
                 # 摘要检查 - 尝试多种可能的选择器
                 snippet_element = (
@@ -0,0 +1,382 @@
+"""
+本地维基百科索引
+
+把维基百科导出数据中的词条摘要与开头段落写入 SQLite FTS5 全文索引（trigram 分词，中英文均可检索），
+SearchWikipediaTool 优先从本地索引返回 search_by_titles、search_by_content 与 get_page 的结果，
+本地没有结果时再请求 api.wikimedia.org。
+
+构建索引：
+    python -m tools.search_wikipedia.local_index build wiki.sqlite zhwiki.jsonl --language zh
+    python -m tools.search_wikipedia.local_index build wiki.sqlite enwiki-latest-abstract.xml.gz --language en
+
+支持的导出格式：
+- .jsonl：WikiExtractor 的 JSON 输出（id、url、title、text），或已整理好的 title、description、definition
+- .xml：维基百科摘要导出（*-abstract.xml）
+以上文件均可以是 .gz 或 .bz2 压缩文件
+"""
+
+import os
+import re
+import sys
+import bz2
+import gzip
+import json
+import time
+import sqlite3
+import argparse
+import threading
+import unicodedata
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Set
+
+
+# 每个词条保存的定义的最大字符数
+DEFAULT_MAX_DEFINITION_CHARS = 1200
+# 内容检索返回的摘要前后保留的字符数
+SNIPPET_CHARS = 80
+# trigram 分词要求检索词至少 3 个字符，更短的检索词使用 LIKE
+TRIGRAM_MIN_CHARS = 3
+
+
+def normalize_title(title: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", title).replace("_", " ").casefold().split())
+
+
+def _fts_query(query: str) -> Optional[str]:
+    terms = [term for term in query.split() if len(term) >= TRIGRAM_MIN_CHARS]
+    if not terms:
+        return None
+    return " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _snippet(text: str, query: str) -> str:
+    position = text.casefold().find(query.split()[0].casefold()) if query.split() else -1
+    start = max(0, position - SNIPPET_CHARS) if position >= 0 else 0
+    snippet = text[start:start + SNIPPET_CHARS * 2 + len(query)]
+    return ("…" if start else "") + snippet + ("…" if start + len(snippet) < len(text) else "")
+
+
+def _page_url(language: str, title: str) -> str:
+    return f"https://{language}.wikipedia.org/wiki/{title.replace(' ', '_')}"
+
+
+class LocalWikipediaIndex:
+    """
+    基于 SQLite FTS5 的本地维基百科索引
+
+    Args:
+        path: 索引文件路径
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # 工具在多个线程中并行调用，共用一个连接并由锁保证串行访问；查询均在毫秒以内
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY,
+                language TEXT NOT NULL,
+                title TEXT NOT NULL,
+                title_key TEXT NOT NULL,
+                description TEXT NOT NULL DEFAULT '',
+                definition TEXT NOT NULL DEFAULT '',
+                url TEXT
+            );
+            CREATE UNIQUE INDEX IF NOT EXISTS pages_title ON pages (language, title_key);
+            CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+                title, definition, content='pages', content_rowid='id', tokenize='trigram'
+            );
+            """
+        )
+        self._languages = self._load_languages()
+
+    def _load_languages(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT DISTINCT language FROM pages")}
+
+    @property
+    def languages(self) -> Set[str]:
+        return set(self._languages)
+
+    def has_language(self, language: str) -> bool:
+        return language in self._languages
+
+    # building
+    def add_pages(self, language: str, pages: Iterable[Dict[str, Any]], batch_size: int = 5000) -> int:
+        """
+        写入词条，相同语言下标题相同的词条会被覆盖
+
+        Args:
+            pages: 包含 title、definition，可选 description、url 的字典
+        """
+        count = 0
+        batch: List[tuple] = []
+
+        def flush() -> None:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                for row in batch:
+                    existing = self._conn.execute(
+                        "SELECT id, title, definition FROM pages WHERE language = ? AND title_key = ?",
+                        (language, row[1]),
+                    ).fetchone()
+                    if existing is not None:
+                        self._conn.execute(
+                            "INSERT INTO pages_fts (pages_fts, rowid, title, definition) VALUES ('delete', ?, ?, ?)",
+                            existing,
+                        )
+                        self._conn.execute("DELETE FROM pages WHERE id = ?", (existing[0],))
+                    cursor = self._conn.execute(
+                        "INSERT INTO pages (language, title, title_key, description, definition, url) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (language, *row),
+                    )
+                    self._conn.execute(
+                        "INSERT INTO pages_fts (rowid, title, definition) VALUES (?, ?, ?)",
+                        (cursor.lastrowid, row[0], row[3]),
+                    )
+                self._conn.execute("COMMIT")
+            batch.clear()
+
+        for page in pages:
+            title = (page.get("title") or "").strip()
+            definition = (page.get("definition") or "").strip()
+            if not title or not definition:
+                continue
+            batch.append((
+                title,
+                normalize_title(title),
+                (page.get("description") or "").strip(),
+                definition,
+                page.get("url") or _page_url(language, title),
+            ))
+            count += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+
+        if count:
+            self._languages.add(language)
+        return count
+
+    def optimize(self) -> None:
+        with self._lock:
+            self._conn.execute("INSERT INTO pages_fts (pages_fts) VALUES ('optimize')")
+            self._conn.execute("VACUUM")
+
+    # queries
+    def search_title(self, query: str, limit: int = 5, language: str = "zh") -> List[Dict[str, Any]]:
+        """标题检索：完全匹配优先，其次是前缀匹配，最后是标题全文检索"""
+        key = normalize_title(query)
+        if not key:
+            return []
+
+        rows: List[tuple] = []
+        with self._lock:
+            rows += self._conn.execute(
+                "SELECT id, title, description FROM pages WHERE language = ? AND title_key = ?",
+                (language, key),
+            ).fetchall()
+            rows += self._conn.execute(
+                "SELECT id, title, description FROM pages WHERE language = ? AND title_key > ? AND title_key < ? "
+                "ORDER BY length(title_key) LIMIT ?",
+                (language, key, key + "\uffff", limit),
+            ).fetchall()
+            fts_query = _fts_query(key)
+            if fts_query is not None:
+                rows += self._conn.execute(
+                    "SELECT p.id, p.title, p.description FROM pages_fts f JOIN pages p ON p.id = f.rowid "
+                    "WHERE pages_fts MATCH ? AND p.language = ? ORDER BY bm25(pages_fts, 10.0, 1.0) LIMIT ?",
+                    ("title : (" + fts_query + ")", language, limit),
+                ).fetchall()
+
+        results, seen = [], set()
+        for page_id, title, description in rows:
+            if page_id in seen:
+                continue
+            seen.add(page_id)
+            results.append({
+                "pageid": page_id,
+                "key": title.replace(" ", "_"),
+                "title": title,
+                "description": description,
+            })
+        return results[:limit]
+
+    def search_content(self, query: str, limit: int = 5, language: str = "zh") -> List[Dict[str, Any]]:
+        """内容检索：在标题与定义中全文检索，标题命中的权重更高"""
+        query = " ".join(unicodedata.normalize("NFKC", query).split())
+        if not query:
+            return []
+
+        fts_query = _fts_query(query)
+        with self._lock:
+            if fts_query is not None:
+                rows = self._conn.execute(
+                    "SELECT p.id, p.title, p.description, p.definition FROM pages_fts f JOIN pages p ON p.id = f.rowid "
+                    "WHERE pages_fts MATCH ? AND p.language = ? ORDER BY bm25(pages_fts, 10.0, 1.0) LIMIT ?",
+                    (fts_query, language, limit),
+                ).fetchall()
+            else:
+                pattern = f"%{query}%"
+                rows = self._conn.execute(
+                    "SELECT id, title, description, definition FROM pages "
+                    "WHERE language = ? AND (title LIKE ? OR definition LIKE ?) LIMIT ?",
+                    (language, pattern, pattern, limit),
+                ).fetchall()
+
+        return [
+            {
+                "pageid": page_id,
+                "key": title.replace(" ", "_"),
+                "title": title,
+                "description": description,
+                "snippet": _snippet(definition, query),
+            }
+            for page_id, title, description, definition in rows
+        ]
+
+    def get_page(self, title: str, language: str = "zh") -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, title, definition, url FROM pages WHERE language = ? AND title_key = ?",
+                (language, normalize_title(title)),
+            ).fetchone()
+        if row is None:
+            return None
+        page_id, page_title, definition, url = row
+        return {
+            "pageid": page_id,
+            "key": page_title.replace(" ", "_"),
+            "title": page_title,
+            "definition": definition,
+            "url": url,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT language, COUNT(*) FROM pages GROUP BY language").fetchall())
+        return {"pages": counts, "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+
+# dump parsing
+def _open_dump(path: str) -> IO[bytes]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def lead_paragraphs(text: str, max_chars: int = DEFAULT_MAX_DEFINITION_CHARS) -> str:
+    """取正文开头的段落作为定义，跳过空行与过短的段落"""
+    lead: List[str] = []
+    length = 0
+    for paragraph in text.split("\n"):
+        paragraph = re.sub(r"\s+", " ", paragraph).strip()
+        if len(paragraph) < 10 or paragraph.startswith(("Section::", "==")):
+            continue
+        lead.append(paragraph)
+        length += len(paragraph)
+        if length >= max_chars:
+            break
+    return " ".join(lead)[:max_chars]
+
+
+def iter_jsonl_pages(path: str, max_chars: int = DEFAULT_MAX_DEFINITION_CHARS) -> Iterator[Dict[str, Any]]:
+    with _open_dump(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            definition = record.get("definition") or lead_paragraphs(record.get("text", ""), max_chars)
+            yield {
+                "title": record.get("title"),
+                "description": record.get("description"),
+                "definition": definition[:max_chars],
+                "url": record.get("url"),
+            }
+
+
+def iter_abstract_pages(path: str, max_chars: int = DEFAULT_MAX_DEFINITION_CHARS) -> Iterator[Dict[str, Any]]:
+    with _open_dump(path) as f:
+        for _, element in ET.iterparse(f, events=("end",)):
+            if element.tag != "doc":
+                continue
+            title = element.findtext("title") or ""
+            yield {
+                "title": title.split(":", 1)[1].strip() if title.startswith("Wikipedia:") else title,
+                "definition": (element.findtext("abstract") or "")[:max_chars],
+                "url": element.findtext("url"),
+            }
+            element.clear()
+
+
+def iter_dump_pages(path: str, max_chars: int = DEFAULT_MAX_DEFINITION_CHARS) -> Iterator[Dict[str, Any]]:
+    name = re.sub(r"\.(gz|bz2)$", "", path)
+    if name.endswith(".xml"):
+        return iter_abstract_pages(path, max_chars)
+    return iter_jsonl_pages(path, max_chars)
+
+
+_local_index: Optional[LocalWikipediaIndex] = None
+_local_index_lock = threading.Lock()
+
+
+def get_local_wikipedia_index() -> Optional[LocalWikipediaIndex]:
+    """进程内共享的本地索引，未设置 WIKIPEDIA_INDEX_PATH 或文件不存在时返回 None"""
+    global _local_index
+    path = os.getenv("WIKIPEDIA_INDEX_PATH", "").strip()
+    if not path or not os.path.exists(path):
+        return None
+    if _local_index is None:
+        with _local_index_lock:
+            if _local_index is None:
+                _local_index = LocalWikipediaIndex(path)
+    return _local_index
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="本地维基百科索引")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="从导出数据构建或更新索引")
+    build.add_argument("index", help="索引文件路径")
+    build.add_argument("dumps", nargs="+", help="导出文件（.jsonl / .xml，可压缩）")
+    build.add_argument("--language", required=True, help="导出数据的语言，如 zh、en")
+    build.add_argument("--max-chars", type=int, default=DEFAULT_MAX_DEFINITION_CHARS, help="每个词条保存的定义的最大字符数")
+
+    query = subparsers.add_parser("query", help="检索索引")
+    query.add_argument("index")
+    query.add_argument("action", choices=["search_by_titles", "search_by_content", "get_page"])
+    query.add_argument("query")
+    query.add_argument("--language", default="zh")
+    query.add_argument("--limit", type=int, default=5)
+
+    args = parser.parse_args(argv)
+    index = LocalWikipediaIndex(args.index)
+
+    if args.command == "build":
+        started_at = time.perf_counter()
+        for dump in args.dumps:
+            count = index.add_pages(args.language, iter_dump_pages(dump, args.max_chars))
+            print(f"{dump}: {count} pages", file=sys.stderr)
+        index.optimize()
+        print(json.dumps({**index.stats(), "elapsed": round(time.perf_counter() - started_at, 2)}, ensure_ascii=False))
+        return 0
+
+    if args.action == "search_by_titles":
+        result: Any = index.search_title(args.query, args.limit, args.language)
+    elif args.action == "search_by_content":
+        result = index.search_content(args.query, args.limit, args.language)
+    else:
+        result = index.get_page(args.query, args.language)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,8 +9,11 @@ from langchain_core.tools import ToolException
 import time
 import json
 import re
+import os
 from bs4 import BeautifulSoup
 
+from .local_index import LocalWikipediaIndex, get_local_wikipedia_index
+
 
 WikipediaSearchAction = Literal[
     "search_by_titles",
@@ -63,12 +66,24 @@ class SearchWikipediaTool(BaseTool):
 
     session: Any = None
     base_url: str = "https://api.wikimedia.org/core/v1/wikipedia"
+    # 本地索引（WIKIPEDIA_INDEX_PATH），本地没有结果时是否请求维基百科 API
+    local_index: Optional[LocalWikipediaIndex] = None
+    online_fallback: bool = True
 
     def __init__(self, **data):
         """初始化维基百科工具"""
+        data.setdefault("local_index", get_local_wikipedia_index())
+        data.setdefault("online_fallback", os.getenv("WIKIPEDIA_ONLINE_FALLBACK", "true").lower() == "true")
         super().__init__(**data)
         self.session = self._create_session()
 
+    def _use_local(self, language: str) -> bool:
+        return self.local_index is not None and self.local_index.has_language(language)
+
+    def _check_online_fallback(self) -> None:
+        if not self.online_fallback:
+            raise ToolException("本地维基百科索引中没有找到结果")
+
     def _create_session(self) -> requests.Session:
         """创建带有重试机制的会话"""
         session = requests.Session()
@@ -127,6 +142,12 @@ class SearchWikipediaTool(BaseTool):
         Returns:
             搜索结果列表
         """
+        if self._use_local(language):
+            local_result = self.local_index.search_content(query, limit, language)  # type: ignore[union-attr]
+            if local_result:
+                return local_result
+            self._check_online_fallback()
+
         url = f"{self.base_url}/{language}/search/page?q={query}&limit={limit}"
         result = self._make_request(url)
 
@@ -158,6 +179,12 @@ class SearchWikipediaTool(BaseTool):
         Returns:
             标题搜索结果列表
         """
+        if self._use_local(language):
+            local_result = self.local_index.search_title(query, limit, language)  # type: ignore[union-attr]
+            if local_result:
+                return local_result
+            self._check_online_fallback()
+
         url = f"{self.base_url}/{language}/search/title?q={query}&limit={limit}"
 
         result = self._make_request(url)
@@ -225,6 +252,12 @@ class SearchWikipediaTool(BaseTool):
         Returns:
             页面内容
         """
+        if self._use_local(language):
+            local_page = self.local_index.get_page(title, language)  # type: ignore[union-attr]
+            if local_page is not None:
+                return local_page
+            self._check_online_fallback()
+
         url = f"{self.base_url}/{language}/page/{title.replace(' ', '_')}/with_html"
 
         try:
@@ -6,6 +6,7 @@ from .count_tokens import count_tokens
 from .view_graph import view_graph
 from .singleton import singleton
 from .safe_parse import SafeParse
+from .tool_schema import compact_tool_schema
 
 __all__ = [
     "get_env",
@@ -17,4 +18,5 @@ __all__ = [
     "view_graph",
     "singleton",
     "SafeParse",
+    "compact_tool_schema",
 ]
\ No newline at end of file
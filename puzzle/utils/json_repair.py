@@ -0,0 +1,200 @@
+"""
+本地 JSON 修复
+
+模型输出无法解析的原因大多是格式问题：代码块标记、JSON 前后的说明文字、多余的逗号、
+Python 风格的 True/False/None、结尾缺少闭合的括号，或者字段值的类型与 schema 略有出入。
+这些问题不需要再调用一次模型，repair_json 在本地修复 JSON 文本，coerce_to_model 再按 pydantic 模型的字段类型调整取值。
+
+被 max_tokens 截断的输出（结尾在字符串、数字、键或逗号之后）不在本地修复：补全后虽然能够解析，
+但会丢失被截断的内容，这类输出交给模型修复。
+"""
+
+import json
+import re
+import typing
+from typing import Any, List, Optional, Type
+
+from pydantic import BaseModel
+
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _extract_json_text(text: str) -> Optional[str]:
+    """去掉代码块标记与 JSON 之前的文字，返回从第一个 { 或 [ 开始的文本"""
+    for match in _FENCE.finditer(text):
+        if "{" in match.group(1) or "[" in match.group(1):
+            text = match.group(1)
+            break
+
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        return None
+    return text[min(starts):]
+
+
+def _repair(text: str) -> Optional[str]:
+    """
+    逐字符修复 JSON 文本并补全结尾缺少的括号
+
+    只有结尾是一个完整的值（闭合的字符串值、括号或 true/false/null）时才补全括号，
+    输出可能被截断时返回 None
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    escape = False
+    # 对象中冒号之后等待值，此时闭合的字符串是值而不是键
+    after_colon = False
+    # 最后一个 token 是否为完整的值
+    complete = False
+    index = 0
+
+    while index < len(text):
+        char = text[index]
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+                complete = after_colon or not stack or stack[-1] == "]"
+                after_colon = False
+            elif char == "\n":
+                char = "\\n"
+            out.append(char)
+            index += 1
+            continue
+
+        if char.isspace():
+            out.append(char)
+            index += 1
+            continue
+
+        complete = False
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            # 去掉闭合括号前多余的逗号
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(char)
+            complete = True
+            after_colon = False
+            if not stack:
+                break
+            index += 1
+            continue
+        elif char == ":":
+            after_colon = True
+        elif char == ",":
+            after_colon = False
+        elif char.isalpha():
+            word = re.match(r"[A-Za-z]+", text[index:]).group(0)  # type: ignore[union-attr]
+            literal = _PYTHON_LITERALS.get(word, word)
+            out.append(literal)
+            complete = literal in ("true", "false", "null")
+            after_colon = False
+            index += len(word)
+            continue
+        else:
+            after_colon = False
+        out.append(char)
+        index += 1
+
+    if stack and not complete:
+        return None
+    return "".join(out).rstrip() + "".join(reversed(stack))
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """
+    在本地修复并解析模型输出中的 JSON
+
+    Returns:
+        解析得到的对象，无法修复或输出可能被截断时返回 None
+    """
+    json_text = _extract_json_text(text)
+    if json_text is None:
+        return None
+
+    decoder = json.JSONDecoder(strict=False)
+    try:
+        # raw_decode 忽略 JSON 之后的说明文字
+        return decoder.raw_decode(json_text)[0]
+    except json.JSONDecodeError:
+        pass
+
+    repaired = _repair(json_text)
+    if repaired is None:
+        return None
+    try:
+        return decoder.raw_decode(repaired)[0]
+    except json.JSONDecodeError:
+        return None
+
+
+def _coerce(value: Any, annotation: Any) -> Any:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin is typing.Annotated:
+        return _coerce(value, args[0])
+    if origin is typing.Union:
+        options = [arg for arg in args if arg is not type(None)]
+        if value is None or len(options) != 1:
+            return value
+        return _coerce(value, options[0])
+    if origin is typing.Literal:
+        if value in args:
+            return value
+        if isinstance(value, str):
+            # 大小写或首尾空白与允许的取值不一致
+            for allowed in args:
+                if isinstance(allowed, str) and allowed.lower() == value.strip().lower():
+                    return allowed
+        return value
+    if origin in (list, List):
+        if value is None:
+            return value
+        items = value if isinstance(value, list) else [value]
+        return [_coerce(item, args[0]) for item in items] if args else items
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return coerce_to_model(value, annotation)
+    if annotation is str and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if annotation in (int, float) and isinstance(value, str):
+        try:
+            return annotation(value.strip())
+        except ValueError:
+            return value
+    return value
+
+
+def coerce_to_model(data: Any, model: Type[BaseModel]) -> Any:
+    """
+    按 pydantic 模型的字段类型调整解析出的数据：展开模型照抄 schema 时包裹的 properties，
+    单个值包装为列表，数字转为字符串，Literal 忽略大小写。无法调整的值保持原样，交给 pydantic 校验
+    """
+    if not isinstance(data, dict):
+        return data
+
+    fields = model.model_fields
+    if "properties" in data and "properties" not in fields and isinstance(data["properties"], dict):
+        if not any(name in data for name in fields):
+            data = data["properties"]
+
+    coerced = dict(data)
+    for name, field in fields.items():
+        key = field.alias or name
+        if key in coerced:
+            coerced[key] = _coerce(coerced[key], field.annotation)
+    return coerced
@@ -0,0 +1,147 @@
+"""
+流式 JSON 字段提取
+
+模型按 PydanticOutputParser 的格式输出 JSON 时，字符串字段的值要等整个输出结束才能被解析。
+JsonFieldExtractor 逐块读取模型输出，增量解码顶层对象中指定字符串字段的值，
+使 report 这类长字段在生成过程中就可以推送给客户端。
+
+- 忽略第一个 "{" 之前的内容（如 ```json 代码块标记）
+- 转义序列（包括 \\uXXXX 与代理对）被拆分到多个块中时，等待转义序列完整后再解码
+- 只提取顶层对象的字符串字段，嵌套对象中的同名字段与非字符串值被忽略
+"""
+
+from typing import Dict, Iterable, Optional
+
+
+_SIMPLE_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class JsonFieldExtractor:
+    """
+    增量提取顶层 JSON 对象中的字符串字段
+
+    Args:
+        fields: 要提取的字段名
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = set(fields)
+        self.values: Dict[str, str] = {}
+        self._completed: set = set()
+
+        self._depth = 0
+        self._in_string = False
+        self._expect_key = False
+        # 当前字符串的用途："key" 为顶层对象的字段名，"value" 为要提取的字段值，None 为其他字符串
+        self._string_role: Optional[str] = None
+        self._key = ""
+        self._current_key: Optional[str] = None
+        self._escape: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+
+    def is_complete(self, field: str) -> bool:
+        """字段的字符串值是否已经结束"""
+        return field in self._completed
+
+    def feed(self, chunk: str) -> Dict[str, str]:
+        """
+        读取一块模型输出
+
+        Returns:
+            本块中新解码的字段内容，只包含有新内容的字段
+        """
+        deltas: Dict[str, str] = {}
+        for char in chunk:
+            decoded = self._feed_char(char)
+            if decoded and self._current_key is not None:
+                deltas[self._current_key] = deltas.get(self._current_key, "") + decoded
+
+        for field, delta in deltas.items():
+            self.values[field] = self.values.get(field, "") + delta
+        return deltas
+
+    # internals
+    def _feed_char(self, char: str) -> str:
+        if self._in_string:
+            return self._feed_string_char(char)
+
+        if char in "{[":
+            self._depth += 1
+            self._expect_key = self._depth == 1 and char == "{"
+        elif char in "}]":
+            self._depth = max(0, self._depth - 1)
+        elif char == '"' and self._depth > 0:
+            self._in_string = True
+            if self._depth == 1 and self._expect_key:
+                self._string_role = "key"
+                self._key = ""
+            elif self._depth == 1 and self._current_key in self.fields:
+                self._string_role = "value"
+            else:
+                self._string_role = None
+        elif char == ":" and self._depth == 1:
+            self._expect_key = False
+        elif char == "," and self._depth == 1:
+            self._expect_key = True
+            self._current_key = None
+        return ""
+
+    def _feed_string_char(self, char: str) -> str:
+        if self._escape is not None:
+            return self._emit(self._feed_escape(char))
+
+        if char == "\\":
+            self._escape = ""
+            return ""
+
+        if char == '"':
+            self._in_string = False
+            if self._string_role == "key":
+                self._current_key = self._key
+            elif self._string_role == "value":
+                self._completed.add(self._current_key)  # type: ignore[arg-type]
+            self._string_role = None
+            return ""
+
+        return self._emit(char)
+
+    def _feed_escape(self, char: str) -> str:
+        """读取转义序列的一个字符，转义序列完整时返回解码后的字符"""
+        escape = self._escape + char  # type: ignore[operator]
+        if not escape.startswith("u"):
+            self._escape = None
+            return _SIMPLE_ESCAPES.get(char, char)
+        if len(escape) < 5:
+            self._escape = escape
+            return ""
+
+        self._escape = None
+        try:
+            code = int(escape[1:], 16)
+        except ValueError:
+            return ""
+
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+            return ""
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            high, self._high_surrogate = self._high_surrogate, None
+            return chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00))
+        return chr(code)
+
+    def _emit(self, text: str) -> str:
+        if self._string_role == "key":
+            self._key += text
+            return ""
+        if self._string_role == "value":
+            return text
+        return ""
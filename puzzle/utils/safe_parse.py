@@ -1,50 +1,141 @@
-from typing import Any, TypeVar, Generic
+import os
+import json
+import threading
+from typing import Any, Dict, Optional, TypeVar, Generic
 
 from langchain.output_parsers import OutputFixingParser
-from langchain_core.output_parsers import BaseOutputParser
-from langchain_openai import ChatOpenAI
+from langchain_core.language_models import BaseChatModel
+from langchain_core.output_parsers import BaseOutputParser, PydanticOutputParser
+
+from .json_repair import coerce_to_model, repair_json
 
 T = TypeVar('T')
 
+
+class SafeParseStats:
+    """
+    各阶段的解析次数
+
+    parsed: 原样解析成功
+    repaired: 本地修复后解析成功
+    llm_fixed: 经过模型修复后解析成功
+    failed: 模型修复后仍然失败
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {"parsed": 0, "repaired": 0, "llm_fixed": 0, "failed": 0}
+
+    def increment(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+safe_parse_stats = SafeParseStats()
+
+_default_llm: Optional[BaseChatModel] = None
+_default_llm_lock = threading.Lock()
+
+
+def _get_default_llm() -> BaseChatModel:
+    """调用方没有传入模型时使用的修复模型，第一次需要时才创建"""
+    global _default_llm
+    if _default_llm is None:
+        with _default_llm_lock:
+            if _default_llm is None:
+                from langchain_openai import ChatOpenAI
+                _default_llm = ChatOpenAI(model=os.getenv("SAFE_PARSE_FIXER_MODEL", "gpt-4o-mini"), temperature=0)
+    return _default_llm
+
+
 class SafeParse(BaseOutputParser[T], Generic[T]):
     """
     安全解析模型输出 Wrapper
-    
+
+    解析失败时先在本地修复（代码块标记、多余的逗号、未闭合的括号、按 schema 调整字段类型），
+    仍然失败时才交给 OutputFixingParser 调用模型修复
+
     Args:
         parser: 解析器
         error_message: 错误信息
-        llm: 模型
+        llm: 模型修复使用的模型，优先于 parse 传入的模型，都为 None 时使用 SAFE_PARSE_FIXER_MODEL
         max_retries: 最大重试次数
     """
-    
+
     def __init__(
-        self, 
-        parser: BaseOutputParser[T], 
+        self,
+        parser: BaseOutputParser[T],
         error_message: str = "❌ 模型输出解析失败，正在重试...",
-        llm: ChatOpenAI = ChatOpenAI(model="gpt-4o-mini", temperature=0),
+        llm: Optional[BaseChatModel] = None,
         max_retries: int = 3,
-    ):  
+    ):
         super().__init__()
         self._parser = parser
         self._error_message = error_message
         self._llm = llm
         self._max_retries = max_retries
 
-    def parse(self, text: str) -> T:
+    def with_llm(self, llm: Optional[BaseChatModel]) -> "SafeParse[T]":
+        """
+        返回使用 llm 修复的解析器，用于只能通过 invoke 调用（需要 parser 事件）的场景；
+        构造时指定的模型仍然优先
+        """
+        return SafeParse(
+            self._parser,
+            error_message=self._error_message,
+            llm=self._llm or llm,
+            max_retries=self._max_retries,
+        )
+
+    def parse(self, text: str, llm: Optional[BaseChatModel] = None) -> T:
+        """
+        Args:
+            text: 模型输出
+            llm: 模型修复使用的模型，通常为当前会话的模型
+        """
         try:
-            return self._parser.parse(text)
+            result = self._parser.parse(text)
+            safe_parse_stats.increment("parsed")
+            return result
         except Exception:
-            print(self._error_message)
-            return OutputFixingParser.from_llm(
+            pass
+
+        repaired = self._repair(text)
+        if repaired is not None:
+            safe_parse_stats.increment("repaired")
+            return repaired
+
+        try:
+            result = OutputFixingParser.from_llm(
                 parser=self._parser,
-                llm=self._llm,
+                llm=self._llm or llm or _get_default_llm(),
                 max_retries=self._max_retries,
             ).parse(text)
-    
+        except Exception:
+            safe_parse_stats.increment("failed")
+            raise
+        safe_parse_stats.increment("llm_fixed")
+        return result
+
+    def _repair(self, text: str) -> Optional[T]:
+        data = repair_json(text)
+        if data is None:
+            return None
+        if isinstance(self._parser, PydanticOutputParser):
+            data = coerce_to_model(data, self._parser.pydantic_object)
+        try:
+            return self._parser.parse(json.dumps(data, ensure_ascii=False))
+        except Exception:
+            return None
+
     def get_format_instructions(self) -> str:
         """Instructions on how the LLM output should be formatted."""
         return self._parser.get_format_instructions()
-    
+
     @property
     def _type(self) -> str:
         """Return the output parser type for serialization."""
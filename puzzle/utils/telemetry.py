@@ -0,0 +1,319 @@
+"""
+核查过程的耗时与 token 统计
+
+TelemetryCallback 作为 LangChain 回调挂载到整个 graph 的运行配置上，
+回调会沿着子图、模型与工具调用向下传递，按所在节点（metadata 中的 langgraph_node）记录：
+- 节点的执行次数与墙钟时间
+- 模型调用次数、首 token 延迟、总耗时，以及输入、输出和命中缓存的 token 数
+- 工具调用次数与耗时
+- 命中本地模型响应缓存（models.llm_cache）的调用次数，这些调用不计入 token 数
+"""
+
+import time
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from models.llm_cache import is_cache_hit
+
+
+class NodeMetrics(BaseModel):
+    node: str
+    calls: int = 0
+    wall_time: float = 0
+    llm_calls: int = 0
+    llm_time: float = 0
+    # 流式调用的平均首 token 延迟，没有流式调用时为 None
+    llm_ttft: Optional[float] = None
+    tool_calls: int = 0
+    tool_time: float = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    # 命中提供商提示词缓存的输入 token 数，以及命中缓存的调用次数
+    cached_tokens: int = 0
+    cache_hits: int = 0
+    # 命中本地模型响应缓存、没有实际请求模型的调用次数
+    llm_cache_hits: int = 0
+
+
+class SessionMetrics(BaseModel):
+    session_id: str
+    wall_time: float
+    llm_calls: int
+    tool_calls: int
+    input_tokens: int
+    output_tokens: int
+    cached_tokens: int
+    llm_cache_hits: int = 0
+    nodes: List[NodeMetrics]
+
+
+@dataclass
+class NodeTotals:
+    """单个节点的累计统计，进程级的汇总也复用该结构"""
+    calls: int = 0
+    wall_time: float = 0
+    llm_calls: int = 0
+    llm_time: float = 0
+    ttft_sum: float = 0
+    ttft_count: int = 0
+    tool_calls: int = 0
+    tool_time: float = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    cache_hits: int = 0
+    llm_cache_hits: int = 0
+
+    def merge(self, other: "NodeTotals") -> None:
+        for name in self.__dataclass_fields__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def to_metrics(self, node: str) -> NodeMetrics:
+        return NodeMetrics(
+            node=node,
+            calls=self.calls,
+            wall_time=round(self.wall_time, 3),
+            llm_calls=self.llm_calls,
+            llm_time=round(self.llm_time, 3),
+            llm_ttft=round(self.ttft_sum / self.ttft_count, 3) if self.ttft_count else None,
+            tool_calls=self.tool_calls,
+            tool_time=round(self.tool_time, 3),
+            input_tokens=self.input_tokens,
+            output_tokens=self.output_tokens,
+            cached_tokens=self.cached_tokens,
+            cache_hits=self.cache_hits,
+            llm_cache_hits=self.llm_cache_hits,
+        )
+
+
+@dataclass
+class _PendingRun:
+    node: str
+    started_at: float
+    first_token_at: Optional[float] = None
+
+
+@dataclass
+class _Usage:
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    llm_cache_hit: bool = False
+
+
+def extract_usage(response: LLMResult) -> _Usage:
+    """从模型返回中读取 token 用量，优先使用 usage_metadata，其次是 OpenAI 兼容接口的 token_usage"""
+    usage = _Usage()
+
+    # 命中本地缓存时返回的是缓存中的原始用量，实际没有消耗 token
+    if any(is_cache_hit(generations) for generations in response.generations):
+        return _Usage(llm_cache_hit=True)
+
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            usage_metadata = getattr(message, "usage_metadata", None)
+            if not usage_metadata:
+                continue
+            usage.input_tokens += usage_metadata.get("input_tokens", 0) or 0
+            usage.output_tokens += usage_metadata.get("output_tokens", 0) or 0
+            details = usage_metadata.get("input_token_details") or {}
+            usage.cached_tokens += details.get("cache_read", 0) or 0
+
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage.input_tokens or usage.output_tokens:
+        # DeepSeek 的缓存命中数不在 prompt_tokens_details 中，usage_metadata 不包含
+        usage.cached_tokens = usage.cached_tokens or _provider_cached_tokens(token_usage)
+        return usage
+
+    usage.input_tokens = token_usage.get("prompt_tokens", 0) or 0
+    usage.output_tokens = token_usage.get("completion_tokens", 0) or 0
+    usage.cached_tokens = _provider_cached_tokens(token_usage)
+    return usage
+
+
+def _provider_cached_tokens(token_usage: Dict[str, Any]) -> int:
+    """OpenAI 兼容接口的 prompt_tokens_details.cached_tokens，或 DeepSeek 的 prompt_cache_hit_tokens"""
+    details = token_usage.get("prompt_tokens_details") or {}
+    return details.get("cached_tokens") or token_usage.get("prompt_cache_hit_tokens") or 0
+
+
+class TelemetryCallback(BaseCallbackHandler):
+    """
+    单次核查会话的统计回调
+
+    Args:
+        session_id: 会话 id
+    """
+
+    # 在产生事件的线程中同步执行，不需要经过线程池，也保证了同一次调用的回调按顺序到达
+    run_inline = True
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+        self._nodes: Dict[str, NodeTotals] = {}
+        self._node_runs: Dict[UUID, _PendingRun] = {}
+        self._llm_runs: Dict[UUID, _PendingRun] = {}
+        self._tool_runs: Dict[UUID, _PendingRun] = {}
+        self._lock = threading.Lock()
+
+    # nodes
+    def on_chain_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        # 只统计节点本身，不统计节点内部的其他 chain 以及 LangGraph 内部的 __start__ 等节点
+        if node and not node.startswith("__") and kwargs.get("name") == node:
+            with self._lock:
+                self._node_runs[run_id] = _PendingRun(node=node, started_at=time.time())
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_node(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_node(run_id)
+
+    # llms
+    def on_chat_model_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        messages: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start_llm(run_id, metadata)
+
+    def on_llm_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start_llm(run_id, metadata)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        pending = self._llm_runs.get(run_id)
+        if pending is not None and pending.first_token_at is None:
+            pending.first_token_at = time.time()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_llm(run_id, extract_usage(response))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_llm(run_id, _Usage())
+
+    # tools
+    def on_tool_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        input_str: str,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        node = (metadata or {}).get("langgraph_node") or "unknown"
+        with self._lock:
+            self._tool_runs[run_id] = _PendingRun(node=node, started_at=time.time())
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_tool(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_tool(run_id)
+
+    # summary
+    def finish(self) -> None:
+        if self.finished_at is None:
+            self.finished_at = time.time()
+
+    def node_totals(self) -> Dict[str, NodeTotals]:
+        with self._lock:
+            return {node: replace(totals) for node, totals in self._nodes.items()}
+
+    def summary(self) -> SessionMetrics:
+        """当前会话的统计汇总，节点按首次执行的顺序排列"""
+        with self._lock:
+            nodes = [accumulator.to_metrics(node) for node, accumulator in self._nodes.items()]
+
+        return SessionMetrics(
+            session_id=self.session_id,
+            wall_time=round((self.finished_at or time.time()) - self.started_at, 3),
+            llm_calls=sum(node.llm_calls for node in nodes),
+            tool_calls=sum(node.tool_calls for node in nodes),
+            input_tokens=sum(node.input_tokens for node in nodes),
+            output_tokens=sum(node.output_tokens for node in nodes),
+            cached_tokens=sum(node.cached_tokens for node in nodes),
+            llm_cache_hits=sum(node.llm_cache_hits for node in nodes),
+            nodes=nodes,
+        )
+
+    # internals
+    def _node(self, node: str) -> NodeTotals:
+        accumulator = self._nodes.get(node)
+        if accumulator is None:
+            accumulator = self._nodes[node] = NodeTotals()
+        return accumulator
+
+    def _finish_node(self, run_id: UUID) -> None:
+        with self._lock:
+            pending = self._node_runs.pop(run_id, None)
+            if pending is None:
+                return
+            accumulator = self._node(pending.node)
+            accumulator.calls += 1
+            accumulator.wall_time += time.time() - pending.started_at
+
+    def _start_llm(self, run_id: UUID, metadata: Optional[Dict[str, Any]]) -> None:
+        node = (metadata or {}).get("langgraph_node") or "unknown"
+        with self._lock:
+            self._llm_runs[run_id] = _PendingRun(node=node, started_at=time.time())
+
+    def _finish_llm(self, run_id: UUID, usage: _Usage) -> None:
+        now = time.time()
+        with self._lock:
+            pending = self._llm_runs.pop(run_id, None)
+            if pending is None:
+                return
+            accumulator = self._node(pending.node)
+            accumulator.llm_calls += 1
+            accumulator.llm_time += now - pending.started_at
+            if pending.first_token_at is not None:
+                accumulator.ttft_sum += pending.first_token_at - pending.started_at
+                accumulator.ttft_count += 1
+            accumulator.input_tokens += usage.input_tokens
+            accumulator.output_tokens += usage.output_tokens
+            accumulator.cached_tokens += usage.cached_tokens
+            if usage.cached_tokens:
+                accumulator.cache_hits += 1
+            if usage.llm_cache_hit:
+                accumulator.llm_cache_hits += 1
+
+    def _finish_tool(self, run_id: UUID) -> None:
+        with self._lock:
+            pending = self._tool_runs.pop(run_id, None)
+            if pending is None:
+                return
+            accumulator = self._node(pending.node)
+            accumulator.tool_calls += 1
+            accumulator.tool_time += time.time() - pending.started_at
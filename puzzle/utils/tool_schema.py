@@ -0,0 +1,57 @@
+"""
+紧凑的工具说明
+
+convert_to_openai_tool 输出的 JSON Schema 中，每个可选参数都展开为 anyOf/null/default 结构，
+search_google_official 的约 20 个 CSE 参数单独就有 2000 多个字符。写入 prompt 的工具说明只需要
+参数名、类型、默认值与说明，每个参数压缩为一行。输出只取决于工具定义，相同的工具列表总是得到相同的文本。
+"""
+
+import json
+from typing import Any, Dict, List, Sequence
+
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+def _param_type(schema: Dict[str, Any]) -> str:
+    if "enum" in schema:
+        return " | ".join(json.dumps(value, ensure_ascii=False) for value in schema["enum"])
+    if "anyOf" in schema:
+        types = [_param_type(option) for option in schema["anyOf"] if option.get("type") != "null"]
+        return " | ".join(types) or "null"
+    if schema.get("type") == "array":
+        return f"{_param_type(schema.get('items', {}))}[]"
+    return schema.get("type", "any")
+
+
+def _description(function: Dict[str, Any]) -> str:
+    """工具说明，去掉 docstring 中与参数列表重复的 Args/Returns 等段落，续行缩进到工具条目下"""
+    description = function.get("description", "").split("\n\nArgs:")[0].strip()
+    return "\n  ".join(line.strip() for line in description.splitlines())
+
+
+def compact_tool_schema(tools: Sequence[BaseTool]) -> str:
+    """
+    工具说明，每个工具一段：
+
+    - tool_name: 工具说明
+      - param: type (required) 参数说明
+      - param: type = default 参数说明
+    """
+    lines: List[str] = []
+    for tool in tools:
+        function = convert_to_openai_tool(tool)["function"]
+        lines.append(f"- {function['name']}: {_description(function)}")
+
+        parameters = function.get("parameters", {})
+        required = set(parameters.get("required", []))
+        for name, schema in parameters.get("properties", {}).items():
+            line = f"  - {name}: {_param_type(schema)}"
+            if name in required:
+                line += " (required)"
+            elif schema.get("default") is not None:
+                line += f" = {json.dumps(schema['default'], ensure_ascii=False)}"
+            if schema.get("description"):
+                line += f" {schema['description'].strip()}"
+            lines.append(line)
+    return "\n".join(lines)
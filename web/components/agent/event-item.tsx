@@ -159,6 +159,8 @@ export const EventItem = ({ event, isLastEvent }: EventItemProps) => {
           'force_continue': 'Exceeded Maximum Retrieval Retry Count, Force to Continue to Next Retrieval',
           'retry': 'Retry Current Retrieval',
           'finish': 'Finish All Retrieval Tasks',
+          'defer': 'Defer Verification, Continue to Next Retrieval',
+          'early_stop': 'Verdict Already Decided, Skip Remaining Retrieval',
         }
         return `LLM Decision: ${decisionMap[decisionData?.decision] || ''}`;
       case 'task_complete':
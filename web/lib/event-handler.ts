@@ -76,6 +76,10 @@ export function setupEventSource(
   // Start timeout checker - check every 10 seconds
   const timeoutCheckerId = setInterval(checkForTimeout, 10000);
   
+  // Report streamed by write_fact_check_report_delta events
+  let streamedReport = '';
+  let streamedVerdict: Verdict | undefined;
+
   // Add time update logic for all event types
   const setupEventTypeListener = (eventType: EventType) => {
     eventSource.addEventListener(eventType, (event) => {
@@ -88,6 +92,15 @@ export function setupEventSource(
 
       try {
         const data = JSON.parse(event.data);
+
+        // Report deltas update the result in place instead of being added to the event log
+        if (eventType === 'write_fact_check_report_delta') {
+          streamedReport += data.delta ?? '';
+          streamedVerdict = data.verdict ?? streamedVerdict;
+          setResult(streamedReport, streamedVerdict as Verdict);
+          return;
+        }
+
         addEvent({ event: eventType, data });
         
         if (eventType === 'write_fact_check_report_end') {
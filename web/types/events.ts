@@ -1,5 +1,6 @@
 export type EventType =
     | 'agent_start'
+    | 'queued'
     | 'check_if_news_text_start'
     | 'check_if_news_text_end'
     | 'extract_basic_metadata_start'
@@ -10,35 +11,40 @@ export type EventType =
     | 'retrieve_knowledge_end'
     | 'extract_check_point_start'
     | 'extract_check_point_end'
+    | 'check_points_delta'
     | 'search_agent_start'
     | 'evaluate_current_status_start'
     | 'evaluate_current_status_end'
     | 'generate_answer_start'
     | 'generate_answer_end'
+    | 'reuse_retrieval_result'
     | 'evaluate_search_result_start'
     | 'evaluate_search_result_end'
+    | 'evaluate_search_results_end'
     | 'llm_decision'
     | 'write_fact_check_report_start'
+    | 'write_fact_check_report_delta'
     | 'write_fact_check_report_end'
     | 'tool_start'
     | 'tool_end'
+    | 'session_summary'
     | 'task_complete'
     | 'task_interrupted'
     | 'error'
     | 'stream_closed';
 export const eventTypes: EventType[] = [
-    'agent_start',
+    'agent_start', 'queued',
     'check_if_news_text_start', 'check_if_news_text_end',
-    'extract_check_point_start', 'extract_check_point_end',
+    'extract_check_point_start', 'extract_check_point_end', 'check_points_delta',
     'extract_basic_metadata_start', 'extract_basic_metadata_end',
     'extract_knowledge_start', 'extract_knowledge_end',
     'retrieve_knowledge_start', 'retrieve_knowledge_end',
     'search_agent_start', 'evaluate_current_status_start', 'evaluate_current_status_end',
     'tool_start', 'tool_end',
-    'generate_answer_start', 'generate_answer_end',
-    'evaluate_search_result_start', 'evaluate_search_result_end',
-    'write_fact_check_report_start', 'write_fact_check_report_end',
-    'llm_decision', 'task_complete', 'task_interrupted',
+    'generate_answer_start', 'generate_answer_end', 'reuse_retrieval_result',
+    'evaluate_search_result_start', 'evaluate_search_result_end', 'evaluate_search_results_end',
+    'write_fact_check_report_start', 'write_fact_check_report_delta', 'write_fact_check_report_end',
+    'llm_decision', 'session_summary', 'task_complete', 'task_interrupted',
     'error',
 ];
 
@@ -48,6 +54,11 @@ export interface Event<T=any> {
     data?: T;
 }
 
+export interface QueuedData {
+    position: number;
+    eta_seconds?: number;
+}
+
 // IsNewsText interface
 export interface IsNewsText {
     result: boolean;
@@ -61,6 +72,7 @@ export interface RetrievalStep {
     expected_source: string;
     result?: RetrievalResult;
     verification?: RetrievalResultVerification;
+    skipped?: string;
 }
 
 export interface CheckPoint {
@@ -68,9 +80,20 @@ export interface CheckPoint {
     content: string;
     is_verification_point: boolean;
     importance?: string;
+    priority?: 'high' | 'medium' | 'low';
     retrieval_step?: RetrievalStep[];
 }
 
+// stream_protocol 为 delta 时，extract_check_point_end 之后核查点的更新以增量形式发送
+export interface CheckPointPatch {
+    op: 'add' | 'replace';
+    check_point_id: string;
+    retrieval_step_id: string;
+    // 被替换的检索步骤字段，op 为 add 时为空，value 为完整的检索步骤
+    path?: 'purpose' | 'expected_source' | 'result' | 'verification' | 'skipped';
+    value: any;
+}
+
 // Metadata Extractor Events
 export interface BasicMetadata {
     news_type: string;
@@ -100,9 +123,11 @@ export interface Status {
     missing_information: string;
     new_evidence: Evidence[];
     next_step: string;
+    confidence?: 'high' | 'medium' | 'low';
 }
 
 export interface Evidence {
+    id?: string;
     content: string;
     source: Record<string, string>;
     reasoning: string;
@@ -117,7 +142,20 @@ export interface RetrievalResult extends SearchResult {
     check_point_id: string;
     retrieval_step_id: string;
     evidences: Evidence[];
+    reused?: boolean;
+}
+
+// 复用的已核查条目（reuse_retrieval_result）
+export interface ClaimMatch {
+    content: string;
+    purpose: string;
+    matched_content: string;
+    matched_purpose: string;
+    similarity: number;
+    indexed_at: number;
+    result: RetrievalResult;
 }
+
 export interface RetrievalResultVerification {
     reasoning: string;
     verified?: boolean;
@@ -125,6 +163,21 @@ export interface RetrievalResultVerification {
     updated_expected_source?: string;
 }
 
+// 批量复核多个检索步骤的结果（evaluate_search_results_end）
+export interface RetrievalStepVerification extends RetrievalResultVerification {
+    retrieval_step_id: string;
+}
+
+export interface RetrievalResultVerifications {
+    items: RetrievalStepVerification[];
+}
+
+// Incremental report content (write_fact_check_report_delta)
+export interface FactCheckReportDeltaData {
+    delta: string;
+    verdict?: string | null;
+}
+
 export interface ToolStartData {
     tool_name: string;
     input_str: string;
@@ -145,6 +198,34 @@ export interface FactCheckResultData {
     verdict: "true" | "mostly-true" | "mostly-false" | "false" | "no-enough-evidence";
 }
 
+export interface NodeMetrics {
+    node: string;
+    calls: number;
+    wall_time: number;
+    llm_calls: number;
+    llm_time: number;
+    llm_ttft?: number;
+    tool_calls: number;
+    tool_time: number;
+    input_tokens: number;
+    output_tokens: number;
+    cached_tokens: number;
+    cache_hits: number;
+    llm_cache_hits: number;
+}
+
+export interface SessionMetrics {
+    session_id: string;
+    wall_time: number;
+    llm_calls: number;
+    tool_calls: number;
+    input_tokens: number;
+    output_tokens: number;
+    cached_tokens: number;
+    llm_cache_hits: number;
+    nodes: NodeMetrics[];
+}
+
 export interface TaskCompleteData {
     message: string;
     result: any; // This could be further typed if the structure is consistent